@@ -4,30 +4,28 @@ from flask_login import LoginManager
 from flask_mail import Mail
 from flask_wtf.csrf import CSRFProtect
 import os
+from app.database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 mail = Mail()
 csrf = CSRFProtect()
 
-def create_app():
+def create_app(config_name=None):
     app = Flask(__name__)
     
     # Determine environment
-    if os.environ.get('FLASK_ENV') == 'production' or os.environ.get('RENDER'):
+    if config_name:
+        from config import config
+        app.config.from_object(config[config_name])
+    elif os.environ.get('FLASK_ENV') == 'production' or os.environ.get('RENDER'):
         app.config.from_object('config.ProductionConfig')
     else:
         app.config.from_object('config.DevelopmentConfig')
     
-    # Handle database URL
-    database_url = os.environ.get('DATABASE_URL')
-    if database_url and database_url.startswith('postgres://'):
-        database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-        print(f"✅ Using PostgreSQL: {database_url[:20]}...")
-    else:
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///roomsy.db'
-        print("✅ Using SQLite fallback")
+    # Database URL and connection pool settings (configs such as TestingConfig may set their own URL)
+    from app.database import configure_database
+    configure_database(app)
     
     # Initialize extensions
     db.init_app(app)
@@ -39,26 +37,77 @@ def create_app():
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
     
+    # Send read-only pages to the replica database when one is configured
+    from app.database import init_replica
+    init_replica(app)
+    
     # Import and register blueprints
     from app.routes.auth import auth_bp
     from app.routes.main import main_bp
     from app.routes.owner import owner_bp
     from app.routes.booking import booking_bp
     from app.routes.health import health_bp
+    from app.routes.media import media_bp
+    from app.routes.assets import assets_bp
+    from app.routes.api import api_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
     app.register_blueprint(owner_bp)
     app.register_blueprint(booking_bp)
     app.register_blueprint(health_bp)
+    app.register_blueprint(media_bp)
+    app.register_blueprint(assets_bp)
+    app.register_blueprint(api_bp)
+    
+    # Latency, SQL and template timings for /metrics (registered first so cached responses are timed too)
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # Log statements over SLOW_QUERY_THRESHOLD_MS with their EXPLAIN plans
+    from app.utils.slow_queries import init_slow_query_log
+    init_slow_query_log(app)
+    
+    # Count queries per request and flag N+1 patterns (debug/testing)
+    from app.utils.query_budget import init_query_budget
+    init_query_budget(app)
+    
+    # Cache anonymous listing and apartment pages
+    from app.utils.cache import init_cache
+    init_cache(app)
+    
+    # Stored apartment images and their resized variants
+    from app.utils.images import image_url
+    app.add_template_global(image_url)
+    
+    # Fingerprinted CSS/JS built by `flask build-assets`
+    from app.utils.assets import asset_url
+    app.add_template_global(asset_url)
+    
+    # Deliver queued emails from the web process when configured to
+    from app.utils.outbox import init_outbox
+    init_outbox(app)
+    
+    # Compress HTML/JSON responses as they stream out
+    from app.utils.compression import init_compression
+    init_compression(app)
+    
+    # Register CLI commands (flask migrate, flask check-query-plans, ...)
+    from app.commands import register_commands
+    register_commands(app)
     
-    # Create database tables
-    with app.app_context():
-        try:
-            db.create_all()
-            print("✅ Database tables created successfully")
-        except Exception as e:
-            print(f"⚠️ Database error: {e}")
-            print("Continuing without database for now")
+    # Bring the database schema up to date (production runs `flask migrate` at deploy time instead)
+    if app.config['AUTO_MIGRATE']:
+        with app.app_context():
+            try:
+                from app.migrations import upgrade
+                upgrade(db.engine)
+                print("✅ Database tables created successfully")
+            except Exception as e:
+                print(f"⚠️ Database error: {e}")
+                print("Continuing without database for now")
+            
+            from app.database import release_startup_connections
+            release_startup_connections(db.engine)
     
     return app
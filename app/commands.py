@@ -0,0 +1,142 @@
+"""
+Flask CLI commands for Roomsy
+Run with `flask --app run <command>`
+"""
+
+import click
+from app import db
+
+def register_commands(app):
+    """Attach the Roomsy CLI commands to the app"""
+
+    @app.cli.command('migrate')
+    def migrate_command():
+        """Apply pending schema migrations"""
+        from app.migrations import upgrade
+
+        applied = upgrade(db.engine)
+        if applied:
+            click.echo(f"✅ Applied migrations: {', '.join(str(version) for version in applied)}")
+        else:
+            click.echo("✅ Database schema is up to date")
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """EXPLAIN every route's queries and fail on sequential scans"""
+        from app.utils.explain import check_route_plans
+
+        problems = check_route_plans(app)
+        for route, statement, tables in problems:
+            click.echo(f"❌ {route} scans {', '.join(tables)}:\n   {' '.join(statement.split())}")
+        if problems:
+            raise SystemExit(1)
+        click.echo("✅ No sequential scans in route queries")
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Fingerprint and pre-compress the CSS and JavaScript"""
+        from app.utils.assets import build_assets
+
+        manifest = build_assets()
+        for source, hashed in sorted(manifest.items()):
+            click.echo(f"   {source} -> {hashed}")
+        click.echo(f"✅ Built {len(manifest)} assets")
+
+    @app.cli.command('rebuild-availability')
+    @click.option('--apartment-id', type=int, default=None, help='Only rebuild one apartment')
+    def rebuild_availability_command(apartment_id):
+        """Recompute the availability calendar from active bookings"""
+        from app.utils.availability import rebuild_calendar
+
+        with db.engine.begin() as connection:
+            months = rebuild_calendar(connection, apartment_id)
+        click.echo(f"✅ Rebuilt {months} apartment-months of availability")
+
+    @app.cli.command('import-apartments')
+    @click.argument('file', type=click.File('rb'))
+    @click.option('--owner', 'owner_email', required=True, help='Email of the owner the listings belong to')
+    @click.option('--format', 'format', type=click.Choice(['csv', 'ndjson']), default=None,
+                  help='File format (default: from the file extension)')
+    @click.option('--chunk-size', type=int, default=None, help='Rows per INSERT batch (default IMPORT_CHUNK_SIZE)')
+    @click.option('--report', type=click.File('w'), default=None, help='Write rejected rows to this CSV file')
+    def import_apartments_command(file, owner_email, format, chunk_size, report):
+        """Bulk-import apartments from a CSV or NDJSON file"""
+        import csv
+        from app.models.user import User
+        from app.utils.cache import invalidate_listings
+        from app.utils.listings import detect_format, import_apartments, iter_rows
+
+        owner = User.query.filter_by(email=owner_email).first()
+        if owner is None or not owner.is_owner:
+            click.echo(f"❌ {owner_email} is not an owner account")
+            raise SystemExit(1)
+
+        writer = csv.writer(report) if report else None
+        if writer:
+            writer.writerow(['line', 'errors'])
+
+        def on_error(line, errors):
+            if writer:
+                writer.writerow([line, '; '.join(errors)])
+            else:
+                click.echo(f"   line {line}: {'; '.join(errors)}")
+
+        rows = iter_rows(file, format or detect_format(file.name))
+        summary = import_apartments(
+            rows, owner.id, chunk_size or app.config['IMPORT_CHUNK_SIZE'], on_error=on_error
+        )
+        if summary['imported']:
+            invalidate_listings()
+        click.echo(f"✅ Imported {summary['imported']} of {summary['rows']} apartments")
+        if summary['failed']:
+            click.echo(f"❌ Rejected {summary['failed']} rows" + (f", see {report.name}" if report else ''))
+
+    @app.cli.command('generate-data')
+    @click.option('--seed', type=int, default=42, help='Same seed and sizes, same dataset')
+    @click.option('--users', type=int, default=1000, help='Generated users, owners included')
+    @click.option('--apartments', type=int, default=200, help='Generated apartments')
+    @click.option('--images', 'images_per_apartment', type=float, default=3.0, help='Average image rows per apartment (no files are written)')
+    @click.option('--owner-share', type=float, default=0.05, help='Share of the users that are owners')
+    @click.option('--booking-density', type=float, default=0.6, help='Average share of nights booked')
+    @click.option('--history-years', type=float, default=3, help='How far back listings and stays go')
+    @click.option('--as-of', type=click.DateTime(['%Y-%m-%d']), default=None, help='Date treated as today')
+    @click.option('--chunk-size', type=int, default=1000, help='Apartments or users per transaction')
+    @click.option('--workers', type=int, default=4, help='Chunks inserted in parallel (PostgreSQL only)')
+    @click.option('--prefix', default=None, help='Username prefix of the generated accounts (default gen<seed>)')
+    @click.option('--password', default='password123', help='Password of every generated account')
+    def generate_data_command(as_of, **options):
+        """Add a seeded synthetic dataset; re-running with larger sizes only adds the missing rows"""
+        from app.utils.cache import invalidate_listings
+        from app.utils.synthetic import generate_dataset
+
+        summary = generate_dataset(db.engine, as_of=as_of.date() if as_of else None, log=click.echo, **options)
+        if summary['apartments']:
+            invalidate_listings()
+        click.echo(
+            f"📊 Added {summary['users']} users, {summary['apartments']} apartments, "
+            f"{summary['images']} images and {summary['bookings']} bookings"
+        )
+
+    @app.cli.command('outbox-worker')
+    @click.option('--threads', type=int, default=None, help='Sender threads (default OUTBOX_WORKER_THREADS)')
+    @click.option('--batch-size', type=int, default=None, help='Emails per SMTP connection')
+    @click.option('--once', is_flag=True, help='Send one batch and exit')
+    def outbox_worker_command(threads, batch_size, once):
+        """Deliver queued emails from the outbox"""
+        from app.utils.outbox import OutboxWorker, process_batch, queue_depth
+
+        if once:
+            handled = process_batch(batch_size)
+            click.echo(f"✅ Processed {handled} emails, queue: {queue_depth()}")
+            return
+
+        worker = OutboxWorker(app, threads=threads, batch_size=batch_size).start()
+        click.echo(f"📬 Outbox worker running with {worker.threads} threads (Ctrl+C to stop)")
+        try:
+            while True:
+                worker.stop_event.wait(60)
+                with app.app_context():
+                    click.echo(f"📊 Outbox queue: {queue_depth()}")
+                    db.session.remove()
+        except KeyboardInterrupt:
+            worker.stop(timeout=30)
@@ -1,65 +1,271 @@
 """
 Database connection handler for Roomsy app
-Supports multiple PostgreSQL drivers and fallback to SQLite
+Resolves the database URL and the connection pool settings that
+Flask-SQLAlchemy uses to build the app's engines. Connections come from
+InstrumentedQueuePool, which records how long checkouts take, how far the
+pool overflows and how often it runs out (reported at /health/db-pool).
+
+With DATABASE_REPLICA_URL set, RoutingSession sends the reads of the
+REPLICA_ENDPOINTS to the replica. Everything else, and every read for a few
+seconds after the visitor's own write, goes to the primary; so do all reads
+while the replica cannot be reached.
 """
 
 import os
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import OperationalError
+import threading
+import time
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql import Select
 
-def get_database_url():
+SQLITE_FALLBACK = 'sqlite:///roomsy.db'
+
+# Per-process pool counters, read by /health/db-pool
+stats = {
+    'checkouts': 0,
+    'checkout_seconds': 0.0,
+    'max_checkout_seconds': 0.0,
+    'saturated': 0,
+    'timeouts': 0,
+    'max_overflow_used': 0,
+}
+stats_lock = threading.Lock()
+
+def _record_checkout(seconds, saturated, overflow=0, timed_out=False):
+    with stats_lock:
+        if timed_out:
+            stats['timeouts'] += 1
+        else:
+            stats['checkouts'] += 1
+        stats['checkout_seconds'] += seconds
+        stats['max_checkout_seconds'] = max(stats['max_checkout_seconds'], seconds)
+        if saturated:
+            stats['saturated'] += 1
+        stats['max_overflow_used'] = max(stats['max_overflow_used'], overflow)
+
+class InstrumentedQueuePool(QueuePool):
+    """A QueuePool that records checkout time, overflow and exhaustion"""
+
+    def _do_get(self):
+        # Every connection (including overflow) is in use: this checkout has to wait
+        saturated = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            _record_checkout(time.perf_counter() - started, saturated, timed_out=True)
+            raise
+        _record_checkout(time.perf_counter() - started, saturated, max(self.overflow(), 0))
+        return connection
+
+def _psycopg2_available():
+    try:
+        import psycopg2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def normalize_database_url(database_url):
     """
-    Get database URL with fallback handling
-    Returns a valid SQLAlchemy database URL
+    Make a provider's database URL usable by SQLAlchemy
+    Render hands out postgres:// URLs, which SQLAlchemy no longer accepts;
+    without psycopg2 installed the pg8000 driver is selected explicitly.
     """
-    database_url = os.environ.get('DATABASE_URL')
-    
-    if not database_url:
-        print("No DATABASE_URL found, using SQLite fallback")
-        return 'sqlite:///roomsy.db'
-    
-    # Fix Render PostgreSQL URL format
     if database_url.startswith('postgres://'):
         database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        print(f"Converted postgres:// to postgresql://")
-    
-    # Test the connection
-    try:
-        engine = create_engine(database_url, echo=False)
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-            print("✅ Database connection successful")
-            return database_url
-    except Exception as e:
-        print(f"❌ Database connection failed: {e}")
-        print("Falling back to SQLite")
-        return 'sqlite:///roomsy.db'
-
-def create_database_engine():
+    if database_url.startswith('postgresql://') and not _psycopg2_available():
+        database_url = database_url.replace('postgresql://', 'postgresql+pg8000://', 1)
+    return database_url
+
+def get_database_url():
+    """Get the database URL from DATABASE_URL, or None when it is not set"""
+    database_url = os.environ.get('DATABASE_URL')
+    return normalize_database_url(database_url) if database_url else None
+
+def pool_size(config):
     """
-    Create database engine with proper error handling
+    Connections each process keeps open
+    One per request thread (WEB_THREADS) plus the in-process outbox senders,
+    unless DB_POOL_SIZE sets it explicitly.
     """
-    database_url = get_database_url()
-    
-    try:
-        if database_url.startswith('postgresql://'):
-            # Try to use pg8000 first (Python 3.13 compatible)
+    if config['DB_POOL_SIZE']:
+        return config['DB_POOL_SIZE']
+    size = config['WEB_THREADS']
+    if config['OUTBOX_IN_PROCESS']:
+        size += config['OUTBOX_WORKER_THREADS']
+    return size
+
+def engine_options(config, database_url):
+    """SQLALCHEMY_ENGINE_OPTIONS for the URL; in-memory SQLite keeps its own pool"""
+    if database_url.startswith('sqlite') and ':memory:' in database_url:
+        return {}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': pool_size(config),
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+def configure_database(app):
+    """Set the database URL and pool options before Flask-SQLAlchemy builds the engine"""
+    config = app.config
+    if not config.get('SQLALCHEMY_DATABASE_URI'):
+        database_url = get_database_url()
+        if database_url:
+            config['SQLALCHEMY_DATABASE_URI'] = database_url
+            print(f"✅ Using {database_url.split(':', 1)[0]}: {database_url[:20]}...")
+        else:
+            config['SQLALCHEMY_DATABASE_URI'] = SQLITE_FALLBACK
+            print("✅ Using SQLite fallback")
+
+    options = engine_options(config, config['SQLALCHEMY_DATABASE_URI'])
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    if config.get('DATABASE_REPLICA_URL'):
+        replica_url = normalize_database_url(config['DATABASE_REPLICA_URL'])
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA] = dict(engine_options(config, replica_url), url=replica_url)
+        config['SQLALCHEMY_BINDS'] = binds
+        print("✅ Routing read-only pages to the replica database")
+
+def release_startup_connections(engine):
+    """
+    Close the pooled connections opened while the app was created
+    With gunicorn --preload the app is created before the workers fork, and
+    a connection shared by two processes corrupts both sides' sessions.
+    """
+    if isinstance(engine.pool, QueuePool):
+        engine.dispose()
+
+def dispose_after_fork(app):
+    """
+    Drop the pooled connections a forked worker inherited from its parent
+    close=False leaves the sockets alone, as the parent still owns them.
+    """
+    from app import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+def time_queries(engine):
+    """
+    Stamp every statement's start time on its execution context
+    The metrics, slow query log and query budget listeners share this one
+    before_cursor_execute hook and read context._query_started afterwards.
+    """
+    if not event.contains(engine, 'before_cursor_execute', _query_started):
+        event.listen(engine, 'before_cursor_execute', _query_started)
+
+def _pool_state(pool):
+    if not isinstance(pool, QueuePool):
+        return {}
+    return {
+        'pool_size': pool.size(), 'max_overflow': pool._max_overflow, 'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(), 'overflow': max(pool.overflow(), 0),
+    }
+
+def pool_stats(engine, replica=None):
+    """
+    Return this process's checkout counters with the pool's current state
+    The counters cover every engine; with a replica its pool state and
+    routing counters are reported under 'replica'.
+    """
+    with stats_lock:
+        result = dict(stats)
+    result.update(_pool_state(engine.pool))
+    if replica is not None:
+        with replica_lock:
+            result['replica'] = dict(replica_state, **_pool_state(replica.pool))
+    return result
+
+# Read replica routing
+REPLICA = 'replica'  # bind key of the replica engine
+
+# Per-process replica health and routing counters
+replica_state = {'healthy': True, 'failed_at': None, 'error': None, 'reads': 0, 'fallbacks': 0}
+replica_lock = threading.Lock()
+
+def _replica_failed(error):
+    with replica_lock:
+        replica_state.update(healthy=False, failed_at=time.time(), error=str(error).splitlines()[0])
+        replica_state['fallbacks'] += 1
+
+def _replica_usable(retry_seconds):
+    with replica_lock:
+        if replica_state['healthy']:
+            return True
+        # Try an unhealthy replica again once the retry interval has passed
+        return time.time() - replica_state['failed_at'] >= retry_seconds
+
+class RoutingSession(Session):
+    """
+    A session that reads from the replica when the request allows it
+    Flushes and INSERT/UPDATE/DELETE statements always use the primary. The
+    first replica read of a session checks out its connection, so an
+    unreachable replica is noticed before the query and the primary is
+    used instead.
+    """
+
+    _replica_connected = None
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and (clause is None or isinstance(clause, Select)) \
+                and has_request_context() and g.get('use_replica'):
+            replica = self._db.engines.get(REPLICA)
+            if replica is not None and self._connect_replica(replica):
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _connect_replica(self, replica):
+        if self._replica_connected is None:
             try:
-                import pg8000
-                print("✅ Using pg8000 PostgreSQL driver")
-            except ImportError:
-                print("⚠️ pg8000 not available, trying psycopg2")
-                try:
-                    import psycopg2
-                    print("✅ Using psycopg2 PostgreSQL driver")
-                except ImportError:
-                    print("❌ No PostgreSQL drivers available, falling back to SQLite")
-                    database_url = 'sqlite:///roomsy.db'
-        
-        engine = create_engine(database_url, echo=False)
-        return engine
-        
-    except Exception as e:
-        print(f"❌ Failed to create database engine: {e}")
-        print("Falling back to SQLite")
-        return create_engine('sqlite:///roomsy.db', echo=False)
+                self.connection(bind_arguments={'bind': replica})
+                self._replica_connected = True
+                with replica_lock:
+                    replica_state.update(healthy=True, error=None)
+                    replica_state['reads'] += 1
+            except DBAPIError as e:
+                self._replica_connected = False
+                _replica_failed(e)
+        return self._replica_connected
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _remember_write(session, flush_context):
+    if has_request_context():
+        g.database_wrote = True
+
+def init_replica(app):
+    """Route read-only endpoints to the replica and keep writers on the primary"""
+    config = app.config
+    if not config.get('DATABASE_REPLICA_URL'):
+        return
+
+    @app.before_request
+    def choose_database():
+        g.use_replica = (
+            request.method in ('GET', 'HEAD')
+            and request.endpoint in config['REPLICA_ENDPOINTS']
+            and session.get('primary_until', 0) < time.time()
+            and _replica_usable(config['REPLICA_RETRY_SECONDS'])
+        )
+
+    @app.after_request
+    def stick_to_primary(response):
+        # Read-your-writes: this visitor's next pages come from the primary until the replica catches up.
+        # Any successful unsafe request counts as a write, since Core statements (the bulk import,
+        # reserve_dates, COPY) never flush the session.
+        wrote = request.method not in ('GET', 'HEAD') and response.status_code < 400
+        if wrote or g.get('database_wrote'):
+            session['primary_until'] = time.time() + config['REPLICA_STICKY_SECONDS']
+        return response
@@ -0,0 +1,85 @@
+"""
+Versioned schema migrations for Roomsy
+Each migration module exposes version, description and upgrade(connection).
+Applied versions are recorded in the schema_migrations table.
+"""
+
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.migrations import (
+    v001_initial_schema, v002_search_index, v003_hot_query_indexes, v004_email_outbox,
+    v005_availability_calendar, v006_apartment_images
+)
+
+MIGRATIONS = [
+    v001_initial_schema,
+    v002_search_index,
+    v003_hot_query_indexes,
+    v004_email_outbox,
+    v005_availability_calendar,
+    v006_apartment_images,
+]
+
+HISTORY_DDL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description VARCHAR(200) NOT NULL,
+    applied_at TIMESTAMP NOT NULL
+)
+"""
+
+def applied_versions(engine):
+    """Return the set of migration versions already applied"""
+    with engine.begin() as connection:
+        connection.exec_driver_sql(HISTORY_DDL)
+        rows = connection.execute(text("SELECT version FROM schema_migrations"))
+        return {row.version for row in rows}
+
+def pending_migrations(engine):
+    """Return the migrations that still need to run, in order"""
+    applied = applied_versions(engine)
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+def _record(engine, migration):
+    try:
+        with engine.begin() as connection:
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) "
+                     "VALUES (:version, :description, :applied_at)"),
+                {'version': migration.version, 'description': migration.description,
+                 'applied_at': datetime.utcnow()}
+            )
+    except IntegrityError:
+        # Another process applied the same migration at the same time
+        pass
+
+def upgrade(engine, log=print):
+    """
+    Apply every pending migration in order
+    Migrations marked transactional = False (e.g. CREATE INDEX CONCURRENTLY)
+    run on an autocommit connection. Returns the versions that were applied.
+    """
+    applied = []
+    for migration in pending_migrations(engine):
+        log(f"⏳ Applying migration {migration.version:03d}: {migration.description}")
+        if getattr(migration, 'transactional', True):
+            with engine.begin() as connection:
+                migration.upgrade(connection)
+        else:
+            with engine.connect() as connection:
+                migration.upgrade(connection.execution_options(isolation_level='AUTOCOMMIT'))
+        _record(engine, migration)
+        applied.append(migration.version)
+    return applied
+
+def rebuild_schema(engine, metadata, log=print):
+    """Drop every table the migrations manage and migrate from scratch"""
+    from app.utils.search import drop_search_index
+
+    with engine.begin() as connection:
+        drop_search_index(connection)
+        metadata.drop_all(connection)
+        connection.exec_driver_sql("DROP TABLE IF EXISTS schema_migrations")
+    return upgrade(engine, log=log)
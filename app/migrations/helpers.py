@@ -0,0 +1,39 @@
+"""
+Shared helpers for writing idempotent migrations
+"""
+
+from sqlalchemy import inspect, text
+
+def column_exists(connection, table_name, column_name):
+    """Check whether a column is already present, for additive migrations"""
+    columns = inspect(connection).get_columns(table_name)
+    return any(column['name'] == column_name for column in columns)
+
+def add_column(connection, table_name, column):
+    """Add a column to an existing table unless it is already there"""
+    if column_exists(connection, table_name, column.name):
+        return
+    column_type = column.type.compile(dialect=connection.dialect)
+    connection.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}")
+
+def create_index(connection, name, table_name, columns, using=None):
+    """
+    Create an index if it does not exist yet
+    On PostgreSQL the index is built CONCURRENTLY so writes are not blocked;
+    the connection must then be in autocommit mode. `using` picks the
+    PostgreSQL index method (e.g. 'gin').
+    """
+    if connection.dialect.name == 'postgresql':
+        # A failed concurrent build leaves an invalid index behind; rebuild it
+        invalid = connection.execute(text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {'name': name}).first()
+        if invalid:
+            connection.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        connection.exec_driver_sql(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table_name}"
+            f"{f' USING {using}' if using else ''} ({columns})"
+        )
+    else:
+        connection.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {table_name} ({columns})")
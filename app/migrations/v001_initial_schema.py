@@ -0,0 +1,71 @@
+"""
+Create the original user, apartment, apartment_image and booking tables
+The tables are spelled out as they were at this version rather than taken
+from the models, so later migrations always find the schema they expect.
+"""
+
+from sqlalchemy import Boolean, Column, Date, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, Text
+
+version = 1
+description = 'Initial schema'
+
+metadata = MetaData()
+
+Table(
+    'user', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(80), unique=True, nullable=False),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('password_hash', String(128)),
+    Column('is_owner', Boolean),
+    Column('created_at', DateTime),
+)
+
+Table(
+    'apartment', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(200), nullable=False),
+    Column('description', Text, nullable=False),
+    Column('address', String(500), nullable=False),
+    Column('city', String(100), nullable=False),
+    Column('state', String(100), nullable=False),
+    Column('zip_code', String(20), nullable=False),
+    Column('price_per_month', Float, nullable=False),
+    Column('min_contract_duration', Integer, nullable=False),
+    Column('bedrooms', Integer, nullable=False),
+    Column('bathrooms', Integer, nullable=False),
+    Column('area_sqft', Integer, nullable=False),
+    Column('is_available', Boolean),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Column('owner_id', Integer, ForeignKey('user.id'), nullable=False),
+)
+
+Table(
+    'apartment_image', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('filename', String(255), nullable=False),
+    Column('caption', String(200)),
+    Column('is_primary', Boolean),
+    Column('created_at', DateTime),
+    Column('apartment_id', Integer, ForeignKey('apartment.id'), nullable=False),
+)
+
+Table(
+    'booking', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('start_date', Date, nullable=False),
+    Column('end_date', Date, nullable=False),
+    Column('total_amount', Float, nullable=False),
+    Column('deposit_amount', Float, nullable=False),
+    Column('deposit_paid', Boolean),
+    Column('full_payment_paid', Boolean),
+    Column('status', String(20)),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('apartment_id', Integer, ForeignKey('apartment.id'), nullable=False),
+)
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
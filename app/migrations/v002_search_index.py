@@ -0,0 +1,13 @@
+"""
+Full-text search index over apartment title, description and address
+Runs outside a transaction: on PostgreSQL the search_vector column is added
+without a table rewrite, filled in short batches and indexed CONCURRENTLY.
+"""
+
+version = 2
+description = 'Apartment full-text search index'
+transactional = False
+
+def upgrade(connection):
+    from app.utils.search import init_search_index
+    init_search_index(connection)
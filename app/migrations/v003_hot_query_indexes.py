@@ -0,0 +1,20 @@
+"""Secondary indexes for the listing, search, dashboard and booking queries"""
+
+from app.migrations.helpers import create_index
+
+version = 3
+description = 'Indexes for hot listing and booking queries'
+transactional = False
+
+INDEXES = [
+    ('ix_apartment_available_price', 'apartment', 'is_available, price_per_month'),
+    ('ix_apartment_available_created', 'apartment', 'is_available, created_at, id'),
+    ('ix_apartment_city_lower', 'apartment', 'lower(city)'),
+    ('ix_apartment_owner_id', 'apartment', 'owner_id'),
+    ('ix_booking_user_created', 'booking', 'user_id, created_at'),
+    ('ix_booking_apartment_id', 'booking', 'apartment_id'),
+]
+
+def upgrade(connection):
+    for name, table_name, columns in INDEXES:
+        create_index(connection, name, table_name, columns)
@@ -0,0 +1,27 @@
+"""Outbox table for asynchronous email delivery"""
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text
+
+version = 4
+description = 'Email outbox'
+
+metadata = MetaData()
+
+outbox_email = Table(
+    'outbox_email', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('sender', String(120)),
+    Column('recipient', String(120), nullable=False),
+    Column('subject', String(200), nullable=False),
+    Column('body', Text, nullable=False),
+    Column('status', String(20)),
+    Column('attempts', Integer),
+    Column('next_attempt_at', DateTime),
+    Column('last_error', Text),
+    Column('created_at', DateTime),
+    Column('sent_at', DateTime),
+    Index('ix_outbox_email_status_next_attempt', 'status', 'next_attempt_at'),
+)
+
+def upgrade(connection):
+    outbox_email.create(connection, checkfirst=True)
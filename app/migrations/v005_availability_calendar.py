@@ -0,0 +1,23 @@
+"""Per-apartment booked-night bitmaps, backfilled from existing bookings"""
+
+from sqlalchemy import Column, Date, ForeignKey, Integer, MetaData, Table
+
+version = 5
+description = 'Apartment availability calendar'
+
+metadata = MetaData()
+
+Table('apartment', metadata, Column('id', Integer, primary_key=True))  # only the foreign key target
+
+apartment_calendar = Table(
+    'apartment_calendar', metadata,
+    Column('apartment_id', Integer, ForeignKey('apartment.id'), primary_key=True),
+    Column('month', Date, primary_key=True),
+    Column('booked_days', Integer, nullable=False),
+)
+
+def upgrade(connection):
+    from app.utils.availability import rebuild_calendar
+
+    apartment_calendar.create(connection, checkfirst=True)
+    rebuild_calendar(connection)
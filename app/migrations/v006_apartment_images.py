@@ -0,0 +1,23 @@
+"""Content-hashed apartment images with resized variants"""
+
+from sqlalchemy import JSON, Column, String
+from app.migrations.helpers import add_column, create_index
+
+version = 6
+description = 'Apartment image pipeline'
+transactional = False
+
+COLUMNS = [
+    ('apartment', Column('card_image', String(255))),
+    ('apartment_image', Column('content_hash', String(64))),
+    ('apartment_image', Column('status', String(20))),
+    ('apartment_image', Column('variants', JSON)),
+]
+
+def upgrade(connection):
+    for table_name, column in COLUMNS:
+        add_column(connection, table_name, column)
+
+    # Images uploaded before the pipeline have no variants to wait for
+    connection.exec_driver_sql("UPDATE apartment_image SET status = 'ready' WHERE status IS NULL")
+    create_index(connection, 'ix_apartment_image_apartment_id', 'apartment_image', 'apartment_id')
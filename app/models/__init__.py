@@ -1,3 +1,5 @@
 from app.models.user import User
 from app.models.apartment import Apartment
 from app.models.booking import Booking
+from app.models.outbox import OutboxEmail
+from app.models.availability import ApartmentCalendar
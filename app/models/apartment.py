@@ -15,6 +15,7 @@ class Apartment(db.Model):
     bathrooms = db.Column(db.Integer, nullable=False)
     area_sqft = db.Column(db.Integer, nullable=False)
     is_available = db.Column(db.Boolean, default=True)
+    card_image = db.Column(db.String(255))  # card-size variant of the primary image
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -24,19 +25,35 @@ class Apartment(db.Model):
     # Relationships
     images = db.relationship('ApartmentImage', backref='apartment', lazy=True, cascade='all, delete-orphan')
     bookings = db.relationship('Booking', backref='apartment', lazy=True)
+    calendar = db.relationship('ApartmentCalendar', backref='apartment', lazy=True, cascade='all, delete-orphan')
+    
+    # Indexes for the listing, search and owner dashboard queries
+    __table_args__ = (
+        db.Index('ix_apartment_available_price', 'is_available', 'price_per_month'),
+        db.Index('ix_apartment_available_created', 'is_available', 'created_at', 'id'),
+        db.Index('ix_apartment_city_lower', db.func.lower(city)),
+        db.Index('ix_apartment_owner_id', 'owner_id'),
+    )
     
     def __repr__(self):
         return f'<Apartment {self.title}>'
 
 class ApartmentImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)  # relative to IMAGE_FOLDER
     caption = db.Column(db.String(200))
     is_primary = db.Column(db.Boolean, default=False)
+    content_hash = db.Column(db.String(64))  # SHA-256 of the original upload
+    status = db.Column(db.String(20), default='pending')  # pending, ready, failed
+    variants = db.Column(db.JSON)  # size name -> resized file, relative to IMAGE_FOLDER
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Foreign Keys
     apartment_id = db.Column(db.Integer, db.ForeignKey('apartment.id'), nullable=False)
     
+    __table_args__ = (
+        db.Index('ix_apartment_image_apartment_id', 'apartment_id'),
+    )
+    
     def __repr__(self):
         return f'<ApartmentImage {self.filename}>'
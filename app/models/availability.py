@@ -0,0 +1,10 @@
+from app import db
+
+class ApartmentCalendar(db.Model):
+    """Booked nights of one apartment in one month, stored as a day bitmap"""
+    apartment_id = db.Column(db.Integer, db.ForeignKey('apartment.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    booked_days = db.Column(db.Integer, nullable=False, default=0)  # bit n set = day n + 1 is booked
+    
+    def __repr__(self):
+        return f'<ApartmentCalendar {self.apartment_id} {self.month:%Y-%m}>'
@@ -17,6 +17,12 @@ class Booking(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     apartment_id = db.Column(db.Integer, db.ForeignKey('apartment.id'), nullable=False)
     
+    # Indexes for "my bookings" and the owner dashboard
+    __table_args__ = (
+        db.Index('ix_booking_user_created', 'user_id', 'created_at'),
+        db.Index('ix_booking_apartment_id', 'apartment_id'),
+    )
+    
     def __repr__(self):
         return f'<Booking {self.id}>'
     
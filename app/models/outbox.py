@@ -0,0 +1,24 @@
+from app import db
+from datetime import datetime
+
+class OutboxEmail(db.Model):
+    """An email waiting to be delivered by the outbox worker"""
+    id = db.Column(db.Integer, primary_key=True)
+    sender = db.Column(db.String(120))
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    
+    # The worker claims due messages by status and next attempt time
+    __table_args__ = (
+        db.Index('ix_outbox_email_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+    
+    def __repr__(self):
+        return f'<OutboxEmail {self.id} {self.status}>'
@@ -0,0 +1,129 @@
+"""
+Read-only JSON API for apartment listings (version 1)
+Endpoints select only the requested columns (?fields=id,title,...) instead
+of loading whole Apartment objects, page with the same keyset cursors as
+the HTML pages and are encoded with orjson when it is installed.
+"""
+
+import json
+from flask import Blueprint, current_app, request
+from app import db
+from app.models.apartment import Apartment
+from app.utils.images import image_url
+from app.utils.pagination import keyset_paginate
+from app.utils.search import apply_search_filters
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Fields clients may request, mapped to the columns they are read from
+API_FIELDS = {
+    name: getattr(Apartment, name) for name in (
+        'id', 'title', 'description', 'address', 'city', 'state', 'zip_code', 'price_per_month',
+        'min_contract_duration', 'bedrooms', 'bathrooms', 'area_sqft', 'is_available',
+        'card_image', 'created_at', 'updated_at'
+    )
+}
+
+LISTING_FIELDS = ['id', 'title', 'city', 'state', 'price_per_month', 'bedrooms', 'bathrooms', 'area_sqft',
+                  'card_image']
+DETAIL_FIELDS = list(API_FIELDS)
+
+class APIError(Exception):
+    """An error reported to the client as a JSON body"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def dumps(payload):
+    """Encode a payload as JSON bytes, using orjson when available"""
+    try:
+        import orjson
+    except ImportError:
+        return json.dumps(payload, default=lambda value: value.isoformat()).encode()
+    return orjson.dumps(payload)
+
+def json_response(payload, status=200):
+    """A JSON response that clients and proxies may cache and revalidate"""
+    response = current_app.response_class(dumps(payload), status=status, mimetype='application/json')
+    if status == 200:
+        response.add_etag()
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config['API_MAX_AGE']
+        response = response.make_conditional(request)
+    return response
+
+@api_bp.errorhandler(APIError)
+def api_error(error):
+    return json_response({'error': error.message}, error.status)
+
+def requested_fields(default):
+    """Parse ?fields= into a list of known field names"""
+    fields = request.args.get('fields')
+    if not fields:
+        return default
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in API_FIELDS]
+    if unknown:
+        raise APIError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(API_FIELDS)}")
+    return list(dict.fromkeys(names))
+
+def serialize(fields, values):
+    """Turn one projected row into a dict, resolving image paths into URLs"""
+    item = dict(zip(fields, values))
+    if item.get('card_image'):
+        item['card_image'] = image_url(item['card_image'])
+    return item
+
+def page_size():
+    config = current_app.config
+    per_page = request.args.get('per_page', config['API_PAGE_SIZE'], type=int)
+    return max(1, min(per_page, config['API_MAX_PAGE_SIZE']))
+
+def page_payload(fields, page):
+    items = [serialize(fields, values if len(fields) > 1 else (values,)) for values in page.items]
+    payload = {'data': items, 'next_cursor': page.next_cursor, 'prev_cursor': page.prev_cursor}
+    if page.total is not None:
+        payload['total'] = page.total
+        payload['total_capped'] = page.total_capped
+    return payload
+
+def projected(fields):
+    """A query over just the requested columns of available apartments"""
+    return db.session.query(*[API_FIELDS[name] for name in fields]).filter(Apartment.is_available == True)
+
+@api_bp.route('/apartments')
+def apartments():
+    fields = requested_fields(LISTING_FIELDS)
+    page = keyset_paginate(
+        projected(fields),
+        [(Apartment.created_at, True), (Apartment.id, True)],
+        cursor=request.args.get('cursor'), per_page=page_size()
+    )
+    return json_response(page_payload(fields, page))
+
+@api_bp.route('/apartments/<int:apartment_id>')
+def apartment(apartment_id):
+    fields = requested_fields(DETAIL_FIELDS)
+    values = db.session.query(*[API_FIELDS[name] for name in fields]).filter(
+        Apartment.id == apartment_id
+    ).first()
+    if values is None:
+        raise APIError('Apartment not found', 404)
+    return json_response({'data': serialize(fields, values)})
+
+@api_bp.route('/search')
+def search():
+    fields = requested_fields(LISTING_FIELDS)
+    query, order_by, params, errors = apply_search_filters(projected(fields), request.args)
+    if errors:
+        raise APIError(' '.join(errors))
+
+    page = keyset_paginate(
+        query, order_by, cursor=request.args.get('cursor'), per_page=page_size(),
+        count_limit=current_app.config['SEARCH_COUNT_LIMIT']
+    )
+    payload = page_payload(fields, page)
+    payload['sort'] = params['sort']
+    return json_response(payload)
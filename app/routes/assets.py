@@ -0,0 +1,39 @@
+"""
+Serving of fingerprinted static assets built by `flask build-assets`
+The best pre-compressed copy the client accepts is sent (brotli, then gzip),
+with a year-long immutable cache header since the name changes with the bytes.
+"""
+
+import mimetypes
+import os
+from flask import Blueprint, abort, current_app, request, send_from_directory
+from werkzeug.security import safe_join
+from app.utils.assets import dist_folder
+
+assets_bp = Blueprint('assets', __name__, url_prefix='/assets')
+
+# Content-Encoding value and file suffix, in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+@assets_bp.route('/<path:filename>')
+def asset_file(filename):
+    folder = dist_folder(current_app.static_folder)
+    path = safe_join(folder, filename)
+    if path is None or filename.endswith(('.br', '.gz', 'manifest.json')) or not os.path.isfile(path):
+        abort(404)
+    
+    served, encoding = filename, None
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] > 0 and os.path.isfile(path + suffix):
+            served, encoding = filename + suffix, name
+            break
+    
+    max_age = current_app.config['ASSETS_MAX_AGE']
+    response = send_from_directory(folder, served, conditional=True, max_age=max_age,
+                                   mimetype=mimetypes.guess_type(filename)[0])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -1,10 +1,15 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app.models.apartment import Apartment
 from app.models.booking import Booking
-from app import db, mail
-from flask_mail import Message
-from datetime import datetime, timedelta
+from app import db
+from app.utils.availability import DatesUnavailable, is_available, release_dates, reserve_dates
+from app.utils.cache import invalidate_apartment
+from app.utils.outbox import enqueue_email
+from app.utils.query_budget import query_budget
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
+from datetime import datetime
 import math
 
 booking_bp = Blueprint('booking', __name__, url_prefix='/booking')
@@ -61,6 +66,10 @@ def book_apartment(apartment_id):
             flash(message, 'error')
             return render_template('booking/book.html', apartment=apartment)
         
+        if not is_available(apartment.id, start_date, end_date):
+            flash('This apartment is already booked for some of those dates.', 'error')
+            return render_template('booking/book.html', apartment=apartment)
+        
         # Calculate duration and total amount
         duration_months = math.ceil((end_date - start_date).days / 30)
         total_amount = apartment.price_per_month * duration_months
@@ -78,14 +87,23 @@ def book_apartment(apartment_id):
             )
             
             db.session.add(booking)
-            db.session.commit()
+            db.session.flush()
+            
+            # Hold the nights; fails if a concurrent booking took any of them
+            reserve_dates(apartment.id, start_date, end_date)
             
-            # Send confirmation email
-            send_booking_confirmation(booking)
+            # Queue the confirmation email in the same transaction as the booking
+            queue_booking_confirmation(booking)
+            db.session.commit()
+            invalidate_apartment(apartment.id, apartment.updated_at)
             
             flash('Booking created successfully! Please complete the deposit payment.', 'success')
             return redirect(url_for('booking.payment', booking_id=booking.id))
             
+        except DatesUnavailable:
+            db.session.rollback()
+            flash('This apartment is already booked for some of those dates.', 'error')
+            return render_template('booking/book.html', apartment=apartment)
         except Exception as e:
             db.session.rollback()
             flash('An error occurred while creating the booking. Please try again.', 'error')
@@ -104,7 +122,7 @@ def payment(booking_id):
     
     return render_template('booking/payment.html', booking=booking)
 
-@booking_bp.route('/confirm/<int:booking_id>')
+@booking_bp.route('/confirm/<int:booking_id>', methods=['POST'])
 @login_required
 def confirm_booking(booking_id):
     booking = Booking.query.get_or_404(booking_id)
@@ -113,15 +131,27 @@ def confirm_booking(booking_id):
         flash('Access denied.', 'error')
         return redirect(url_for('main.index'))
     
+    if booking.status == 'cancelled':
+        flash('This booking has been cancelled.', 'error')
+        return redirect(url_for('booking.my_bookings'))
+    
     # In a real application, this would integrate with a payment gateway
     # For now, we'll simulate payment confirmation
     try:
-        booking.deposit_paid = True
-        booking.status = 'confirmed'
-        db.session.commit()
+        # Only the request that moves the booking out of pending confirms it and sends the email
+        confirmed = db.session.execute(
+            update(Booking).where(Booking.id == booking.id, Booking.status == 'pending')
+            .values(status='confirmed', deposit_paid=True)
+        ).rowcount == 1
+        if not confirmed:
+            db.session.rollback()
+            flash('This booking is already confirmed.', 'info')
+            return redirect(url_for('booking.my_bookings'))
         
-        # Send confirmation email
-        send_booking_confirmation(booking)
+        # Queue the confirmation email in the same transaction as the payment
+        queue_booking_confirmation(booking)
+        db.session.commit()
+        invalidate_apartment(booking.apartment_id, booking.apartment.updated_at)
         
         flash('Payment confirmed! Your booking is now active.', 'success')
         return redirect(url_for('main.index'))
@@ -131,22 +161,45 @@ def confirm_booking(booking_id):
         flash('An error occurred while confirming the payment. Please try again.', 'error')
         return redirect(url_for('booking.payment', booking_id=booking.id))
 
+@booking_bp.route('/cancel/<int:booking_id>', methods=['POST'])
+@login_required
+def cancel_booking(booking_id):
+    booking = Booking.query.get_or_404(booking_id)
+    
+    if booking.user_id != current_user.id:
+        flash('Access denied.', 'error')
+        return redirect(url_for('main.index'))
+    
+    if booking.status not in ('pending', 'confirmed'):
+        flash('Only pending or confirmed bookings can be cancelled.', 'error')
+        return redirect(url_for('booking.my_bookings'))
+    
+    try:
+        booking.status = 'cancelled'
+        # Give the nights back to the apartment's calendar
+        release_dates(booking.apartment_id, booking.start_date, booking.end_date)
+        db.session.commit()
+        invalidate_apartment(booking.apartment_id, booking.apartment.updated_at)
+        
+        flash('Your booking has been cancelled.', 'info')
+    except Exception as e:
+        db.session.rollback()
+        flash('An error occurred while cancelling the booking. Please try again.', 'error')
+    
+    return redirect(url_for('booking.my_bookings'))
+
 @booking_bp.route('/my-bookings')
+@query_budget(queries=4, lazy_loads=0)
 @login_required
 def my_bookings():
-    bookings = Booking.query.filter_by(user_id=current_user.id).order_by(Booking.created_at.desc()).all()
+    bookings = Booking.query.options(joinedload(Booking.apartment)).filter_by(
+        user_id=current_user.id
+    ).order_by(Booking.created_at.desc()).all()
     return render_template('booking/my_bookings.html', bookings=bookings)
 
-def send_booking_confirmation(booking):
-    """Send booking confirmation email"""
-    try:
-        msg = Message(
-            subject=f'Booking Confirmation - {booking.apartment.title}',
-            sender=current_app.config['MAIL_USERNAME'],
-            recipients=[booking.user.email]
-        )
-        
-        msg.body = f'''
+def queue_booking_confirmation(booking):
+    """Queue a booking confirmation email for the outbox worker"""
+    body = f'''
         Dear {booking.user.username},
         
         Your booking has been confirmed!
@@ -163,8 +216,9 @@ def send_booking_confirmation(booking):
         Best regards,
         The Roomsy Team
         '''
-        
-        mail.send(msg)
-    except Exception as e:
-        # Log error but don't fail the booking
-        current_app.logger.error(f'Failed to send email: {e}')
+    
+    return enqueue_email(
+        recipient=booking.user.email,
+        subject=f'Booking Confirmation - {booking.apartment.title}',
+        body=body
+    )
@@ -1,14 +1,41 @@
-from flask import Blueprint, jsonify
+import hmac
+import ipaddress
+from datetime import datetime
+from functools import wraps
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+from sqlalchemy import text
 from app import db
 
 health_bp = Blueprint('health', __name__)
 
+def _monitoring_allowed():
+    config = current_app.config
+    token = config.get('MONITORING_TOKEN')
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer ') and hmac.compare_digest(header[7:].encode(), token.encode()):
+        return True
+    try:
+        address = ipaddress.ip_address(request.remote_addr or '')
+    except ValueError:
+        return False
+    networks = [network.strip() for network in (config.get('MONITORING_ALLOWED_IPS') or '').split(',')]
+    return any(address in ipaddress.ip_network(network, strict=False) for network in networks if network)
+
+def monitoring_only(view):
+    """Answer 403 unless the caller sends MONITORING_TOKEN or comes from MONITORING_ALLOWED_IPS"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _monitoring_allowed():
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
+
 @health_bp.route('/health')
 def health_check():
     """Health check endpoint for Render"""
     try:
         # Test database connection
-        db.session.execute('SELECT 1')
+        db.session.execute(text('SELECT 1'))
         db_status = 'healthy'
     except Exception as e:
         db_status = f'unhealthy: {str(e)}'
@@ -16,9 +43,63 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'database': db_status,
-        'timestamp': '2024-08-31T21:45:00Z'
+        'timestamp': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
     })
 
+@health_bp.route('/health/outbox')
+@monitoring_only
+def outbox_health():
+    """Email outbox queue depth and this process's delivery counters"""
+    from app.utils.outbox import queue_depth, stats, stats_lock
+    
+    with stats_lock:
+        delivered = dict(stats)
+    
+    return jsonify({
+        'queue': queue_depth(),
+        'worker': delivered
+    })
+
+@health_bp.route('/health/cache')
+@monitoring_only
+def cache_health():
+    """Response and fragment cache hit/miss counters for this process"""
+    from app.utils.cache import cache_stats
+    
+    return jsonify(cache_stats())
+
+@health_bp.route('/health/compression')
+@monitoring_only
+def compression_health():
+    """Bytes before and after response compression, per endpoint, for this process"""
+    from app.utils.compression import compression_stats
+    
+    return jsonify(compression_stats())
+
+@health_bp.route('/health/db-pool')
+@monitoring_only
+def db_pool_health():
+    """Connection pool state and checkout wait/overflow counters for this process"""
+    from app.database import REPLICA, pool_stats
+    
+    return jsonify(pool_stats(db.engine, db.engines.get(REPLICA)))
+
+@health_bp.route('/health/slow-queries')
+@monitoring_only
+def slow_queries_health():
+    """Statements over the slow query threshold in this process, by fingerprint"""
+    from app.utils.slow_queries import slow_query_stats
+    
+    return jsonify(slow_query_stats())
+
+@health_bp.route('/metrics')
+@monitoring_only
+def metrics():
+    """Request, SQL, template and pool metrics of every worker in the Prometheus text format"""
+    from app.utils.metrics import CONTENT_TYPE, render_metrics
+    
+    return Response(render_metrics(current_app._get_current_object()), content_type=CONTENT_TYPE)
+
 @health_bp.route('/')
 def root():
     """Root endpoint for health check"""
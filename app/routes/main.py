@@ -1,48 +1,60 @@
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, current_app, flash
 from app.models.apartment import Apartment
 from app.models.user import User
+from app.utils.cache import apartment_page_key, cached_page, listing_page_key
+from app.utils.conditional import conditional_response, not_modified, page_validators
+from app.utils.pagination import keyset_paginate
+from app.utils.search import apply_search_filters
 
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
+@cached_page(listing_page_key)
 def index():
-    page = request.args.get('page', 1, type=int)
-    apartments = Apartment.query.filter_by(is_available=True).paginate(
-        page=page, per_page=9, error_out=False
+    cursor = request.args.get('cursor')
+    apartments = keyset_paginate(
+        Apartment.query.filter_by(is_available=True),
+        [(Apartment.created_at, True), (Apartment.id, True)],
+        cursor=cursor, per_page=current_app.config['POSTS_PER_PAGE']
+    )
+    
+    validators = page_validators(apartments.items, apartments.next_cursor, apartments.prev_cursor)
+    return not_modified(validators) or conditional_response(
+        render_template('main/index.html', apartments=apartments), validators
     )
-    return render_template('main/index.html', apartments=apartments)
 
 @main_bp.route('/apartment/<int:apartment_id>')
+@cached_page(apartment_page_key)
 def apartment_detail(apartment_id):
     apartment = Apartment.query.get_or_404(apartment_id)
-    return render_template('main/apartment_detail.html', apartment=apartment)
+    
+    validators = page_validators([apartment])
+    return not_modified(validators) or conditional_response(
+        render_template('main/apartment_detail.html', apartment=apartment), validators
+    )
 
 @main_bp.route('/search')
 def search():
-    query = request.args.get('q', '')
-    city = request.args.get('city', '')
-    min_price = request.args.get('min_price', type=float)
-    max_price = request.args.get('max_price', type=float)
-    
-    apartments = Apartment.query.filter_by(is_available=True)
+    cursor = request.args.get('cursor')
     
-    if query:
-        apartments = apartments.filter(
-            Apartment.title.contains(query) | 
-            Apartment.description.contains(query) |
-            Apartment.address.contains(query)
-        )
-    
-    if city:
-        apartments = apartments.filter(Apartment.city.ilike(f'%{city}%'))
-    
-    if min_price is not None:
-        apartments = apartments.filter(Apartment.price_per_month >= min_price)
+    apartments, order_by, params, errors = apply_search_filters(
+        Apartment.query.filter_by(is_available=True), request.args
+    )
+    for error in errors:
+        flash(error, 'warning')
     
-    if max_price is not None:
-        apartments = apartments.filter(Apartment.price_per_month <= max_price)
+    apartments = keyset_paginate(
+        apartments, order_by, cursor=cursor,
+        per_page=current_app.config['SEARCH_RESULTS_PER_PAGE'],
+        count_limit=current_app.config['SEARCH_COUNT_LIMIT']
+    )
     
-    apartments = apartments.all()
+    # Filters to carry over into the pagination links
+    search_args = {key: value for key, value in request.args.items() if key != 'cursor' and value}
     
-    return render_template('main/search.html', apartments=apartments, 
-                         query=query, city=city, min_price=min_price, max_price=max_price)
+    validators = page_validators(apartments.items, apartments.next_cursor, apartments.prev_cursor,
+                                 apartments.total)
+    return not_modified(validators) or conditional_response(
+        render_template('main/search.html', apartments=apartments, search_args=search_args, **params),
+        validators
+    )
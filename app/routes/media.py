@@ -0,0 +1,44 @@
+"""
+Serving of uploaded apartment images
+Files are streamed with the WSGI server's file wrapper (gunicorn uses
+sendfile), or handed to the front-end server with X-Sendfile
+(USE_X_SENDFILE) or nginx's X-Accel-Redirect (MEDIA_ACCEL_REDIRECT).
+Range requests are honoured, and content-hashed files are cached forever.
+"""
+
+import mimetypes
+import os
+import re
+from flask import Blueprint, abort, current_app, send_from_directory
+from werkzeug.security import safe_join
+from app.utils.images import image_root
+
+media_bp = Blueprint('media', __name__, url_prefix='/media')
+
+# Originals and variants written by the image pipeline: ab/<sha256>[_<width>].<ext>
+HASHED_NAME = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{64}(?:_\d+)?\.(?:jpg|png|gif|webp)$')
+
+@media_bp.route('/<path:filename>')
+def media_file(filename):
+    config = current_app.config
+    immutable = HASHED_NAME.match(filename) is not None
+    max_age = config['MEDIA_MAX_AGE'] if immutable else config['MEDIA_MUTABLE_MAX_AGE']
+    
+    if config['MEDIA_ACCEL_REDIRECT']:
+        path = safe_join(image_root(), filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        # nginx serves the file from its internal location; we only send headers
+        response = current_app.response_class()
+        response.headers['X-Accel-Redirect'] = f"{config['MEDIA_ACCEL_REDIRECT'].rstrip('/')}/{filename}"
+        response.content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    else:
+        # conditional=True adds ETag/Last-Modified and answers Range and 304 requests
+        response = send_from_directory(image_root(), filename, conditional=True, max_age=max_age)
+    
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        # The name changes whenever the bytes do, so clients never need to revalidate
+        response.cache_control.immutable = True
+    return response
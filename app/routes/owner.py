@@ -1,24 +1,129 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, stream_with_context
 from flask_login import login_required, current_user
 from app.models.apartment import Apartment, ApartmentImage
 from app.models.booking import Booking
 from app import db
+from app.utils.cache import invalidate_apartment, invalidate_listings
+from app.utils.exports import EXPORT_FORMATS, booking_export_query, iter_export, stream_rows
+from app.utils.images import InvalidImage, add_apartment_image, set_primary_image
+from app.utils.listings import detect_format, import_apartments, iter_rows, validate_apartment
+from app.utils.pagination import keyset_paginate
+from app.utils.query_budget import query_budget
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import contains_eager, joinedload
+from datetime import date
+import csv
 import os
 from werkzeug.utils import secure_filename
 
 owner_bp = Blueprint('owner', __name__, url_prefix='/owner')
 
+BOOKING_STATUSES = ['pending', 'confirmed', 'cancelled', 'completed']
+
+def get_owner_stats(owner_id):
+    """
+    Compute the dashboard totals for an owner in the database
+    Returns a dict of apartment counts, booking counts by status, revenue,
+    deposits collected and outstanding, and today's occupancy rate.
+    """
+    total_apartments, available_apartments = db.session.query(
+        func.count(Apartment.id),
+        func.coalesce(func.sum(case((Apartment.is_available == True, 1), else_=0)), 0)
+    ).filter(Apartment.owner_id == owner_id).one()
+    
+    # One grouped pass over the owner's bookings gives the counts and money totals
+    rows = db.session.query(
+        Booking.status,
+        func.count(Booking.id),
+        func.coalesce(func.sum(Booking.total_amount), 0),
+        func.coalesce(func.sum(case((Booking.deposit_paid == True, Booking.deposit_amount), else_=0)), 0),
+        func.coalesce(func.sum(case((Booking.deposit_paid == False, Booking.deposit_amount), else_=0)), 0)
+    ).join(Booking.apartment).filter(Apartment.owner_id == owner_id).group_by(Booking.status).all()
+    
+    status_counts = {status: 0 for status in BOOKING_STATUSES}
+    revenue = deposits_collected = deposits_outstanding = 0
+    for status, count, total, collected, outstanding in rows:
+        status_counts[status] = status_counts.get(status, 0) + count
+        deposits_collected += collected
+        if status in ('confirmed', 'completed'):
+            revenue += total
+        if status != 'cancelled':
+            deposits_outstanding += outstanding
+    
+    today = date.today()
+    occupied = db.session.query(func.count(func.distinct(Booking.apartment_id))).join(
+        Booking.apartment
+    ).filter(
+        Apartment.owner_id == owner_id,
+        Booking.status == 'confirmed',
+        and_(Booking.start_date <= today, Booking.end_date > today)
+    ).scalar()
+    
+    return {
+        'total_apartments': total_apartments,
+        'available_apartments': available_apartments,
+        'total_bookings': sum(status_counts.values()),
+        'status_counts': status_counts,
+        'revenue': revenue,
+        'deposits_collected': deposits_collected,
+        'deposits_outstanding': deposits_outstanding,
+        'occupancy': (occupied / total_apartments * 100) if total_apartments else 0,
+    }
+
 @owner_bp.route('/dashboard')
+@query_budget(queries=6, lazy_loads=0)
 @login_required
 def dashboard():
     if not current_user.is_owner:
         flash('Access denied. Owner privileges required.', 'error')
         return redirect(url_for('main.index'))
     
-    apartments = Apartment.query.filter_by(owner_id=current_user.id).all()
-    bookings = Booking.query.join(Apartment).filter(Apartment.owner_id == current_user.id).all()
+    per_page = current_app.config['DASHBOARD_ROWS_PER_PAGE']
+    stats = get_owner_stats(current_user.id)
+    
+    apartments = keyset_paginate(
+        Apartment.query.filter_by(owner_id=current_user.id),
+        [(Apartment.created_at, True), (Apartment.id, True)],
+        cursor=request.args.get('apartments_cursor'), per_page=per_page
+    )
+    # The template shows each booking's apartment and tenant, so load them in the same query
+    bookings = keyset_paginate(
+        Booking.query.join(Booking.apartment).options(
+            contains_eager(Booking.apartment), joinedload(Booking.user)
+        ).filter(Apartment.owner_id == current_user.id),
+        [(Booking.created_at, True), (Booking.id, True)],
+        cursor=request.args.get('bookings_cursor'), per_page=per_page
+    )
+    
+    return render_template('owner/dashboard.html', stats=stats, apartments=apartments, bookings=bookings)
+
+@owner_bp.route('/bookings/export')
+@login_required
+def export_bookings():
+    if not current_user.is_owner:
+        flash('Access denied. Owner privileges required.', 'error')
+        return redirect(url_for('main.index'))
+    
+    format = request.args.get('format', 'csv')
+    if format not in EXPORT_FORMATS:
+        flash('Exports are available as CSV or NDJSON.', 'error')
+        return redirect(url_for('owner.dashboard'))
     
-    return render_template('owner/dashboard.html', apartments=apartments, bookings=bookings)
+    query = booking_export_query(
+        current_user.id,
+        start=request.args.get('from', type=date.fromisoformat),
+        end=request.args.get('to', type=date.fromisoformat),
+        statuses=[status for status in request.args.getlist('status') if status in BOOKING_STATUSES]
+    )
+    # Rows are fetched and encoded while the client downloads, inside the request context
+    rows = stream_rows(query, current_app.config['EXPORT_BATCH_SIZE'])
+    response = current_app.response_class(
+        stream_with_context(iter_export(rows, format)), mimetype=EXPORT_FORMATS[format]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename=bookings-{date.today().isoformat()}.{format}'
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
 
 @owner_bp.route('/apartment/new', methods=['GET', 'POST'])
 @login_required
@@ -28,106 +133,21 @@ def new_apartment():
         return redirect(url_for('main.index'))
     
     if request.method == 'POST':
-        # Get form data
-        title = request.form.get('title', '').strip()
-        description = request.form.get('description', '').strip()
-        address = request.form.get('address', '').strip()
-        city = request.form.get('city', '').strip()
-        state = request.form.get('state', '').strip()
-        zip_code = request.form.get('zip_code', '').strip()
-        price_per_month = request.form.get('price_per_month')
-        min_contract_duration = request.form.get('min_contract_duration')
-        bedrooms = request.form.get('bedrooms')
-        bathrooms = request.form.get('bathrooms')
-        area_sqft = request.form.get('area_sqft')
-        
-        # Validation
-        errors = []
-        
-        # Required field validation
-        if not title or len(title) < 5:
-            errors.append('Title is required and must be at least 5 characters')
-        
-        if not description or len(description) < 20:
-            errors.append('Description is required and must be at least 20 characters')
-        
-        if not address or len(address) < 5:
-            errors.append('Address is required and must be at least 5 characters')
-        
-        if not city or len(city) < 2:
-            errors.append('City is required and must be at least 2 characters')
-        
-        if not state or len(state) < 2:
-            errors.append('State is required and must be at least 2 characters')
-        
-        if not zip_code:
-            errors.append('ZIP code is required')
-        
-        # Numeric validation
-        try:
-            price_per_month = float(price_per_month)
-            if price_per_month < 100 or price_per_month > 10000:
-                errors.append('Price must be between $100 and $10,000')
-        except (ValueError, TypeError):
-            errors.append('Invalid price amount')
-        
-        try:
-            min_contract_duration = int(min_contract_duration)
-            if min_contract_duration < 1 or min_contract_duration > 60:
-                errors.append('Contract duration must be between 1 and 60 months')
-        except (ValueError, TypeError):
-            errors.append('Invalid contract duration')
-        
-        try:
-            bedrooms = int(bedrooms)
-            if bedrooms < 0 or bedrooms > 10:
-                errors.append('Number of bedrooms must be between 0 and 10')
-        except (ValueError, TypeError):
-            errors.append('Invalid number of bedrooms')
-        
-        try:
-            bathrooms = float(bathrooms)
-            if bathrooms < 0.5 or bathrooms > 10:
-                errors.append('Number of bathrooms must be between 0.5 and 10')
-        except (ValueError, TypeError):
-            errors.append('Invalid number of bathrooms')
-        
-        try:
-            area_sqft = int(area_sqft)
-            if area_sqft < 100 or area_sqft > 10000:
-                errors.append('Area must be between 100 and 10,000 square feet')
-        except (ValueError, TypeError):
-            errors.append('Invalid area')
+        values, errors = validate_apartment(request.form)
         
         # If there are validation errors, show them and return
         if errors:
             for error in errors:
                 flash(error, 'error')
-            return render_template('owner/new_apartment.html', 
-                                title=title, description=description, address=address,
-                                city=city, state=state, zip_code=zip_code,
-                                price_per_month=price_per_month, min_contract_duration=min_contract_duration,
-                                bedrooms=bedrooms, bathrooms=bathrooms, area_sqft=area_sqft)
+            return render_template('owner/new_apartment.html', **values)
         
         # Create apartment if all validation passes
         try:
-            apartment = Apartment(
-                title=title,
-                description=description,
-                address=address,
-                city=city,
-                state=state,
-                zip_code=zip_code,
-                price_per_month=price_per_month,
-                min_contract_duration=min_contract_duration,
-                bedrooms=bedrooms,
-                bathrooms=bathrooms,
-                area_sqft=area_sqft,
-                owner_id=current_user.id
-            )
+            apartment = Apartment(owner_id=current_user.id, **values)
             
             db.session.add(apartment)
             db.session.commit()
+            invalidate_listings()
             
             flash('Apartment listed successfully!', 'success')
             return redirect(url_for('owner.dashboard'))
@@ -135,14 +155,53 @@ def new_apartment():
         except Exception as e:
             db.session.rollback()
             flash('An error occurred while creating the apartment. Please try again.', 'error')
-            return render_template('owner/new_apartment.html', 
-                                title=title, description=description, address=address,
-                                city=city, state=state, zip_code=zip_code,
-                                price_per_month=price_per_month, min_contract_duration=min_contract_duration,
-                                bedrooms=bedrooms, bathrooms=bathrooms, area_sqft=area_sqft)
+            return render_template('owner/new_apartment.html', **values)
     
     return render_template('owner/new_apartment.html')
 
+@owner_bp.route('/apartments/import', methods=['GET', 'POST'])
+@login_required
+def bulk_import():
+    if not current_user.is_owner:
+        flash('Access denied. Owner privileges required.', 'error')
+        return redirect(url_for('main.index'))
+    
+    if request.method == 'POST':
+        file = request.files.get('file')
+        if not file or not file.filename:
+            flash('Please choose a CSV or NDJSON file to import.', 'error')
+            return redirect(url_for('owner.bulk_import'))
+        
+        # Keep the first rejected rows for the page; the rest are only counted
+        max_errors = current_app.config['IMPORT_MAX_ERRORS_SHOWN']
+        errors = []
+        
+        def on_error(line, messages):
+            if len(errors) < max_errors:
+                errors.append((line, messages))
+        
+        try:
+            summary = import_apartments(
+                iter_rows(file.stream, request.form.get('format') or detect_format(file.filename)),
+                current_user.id, current_app.config['IMPORT_CHUNK_SIZE'], on_error=on_error
+            )
+        except (UnicodeDecodeError, csv.Error) as e:
+            db.session.rollback()
+            flash(f'Could not read {file.filename}: {e}', 'error')
+            return redirect(url_for('owner.bulk_import'))
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Apartment import failed: {e}')
+            flash('An error occurred while importing. Rows before the error may have been imported.', 'error')
+            return redirect(url_for('owner.dashboard'))
+        
+        if summary['imported']:
+            invalidate_listings()
+            flash(f"{summary['imported']} apartment(s) imported.", 'success')
+        return render_template('owner/import.html', summary=summary, errors=errors, max_errors=max_errors)
+    
+    return render_template('owner/import.html')
+
 @owner_bp.route('/apartment/<int:apartment_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_apartment(apartment_id):
@@ -157,74 +216,7 @@ def edit_apartment(apartment_id):
         return redirect(url_for('owner.dashboard'))
     
     if request.method == 'POST':
-        # Similar validation as new_apartment
-        title = request.form.get('title', '').strip()
-        description = request.form.get('description', '').strip()
-        address = request.form.get('address', '').strip()
-        city = request.form.get('city', '').strip()
-        state = request.form.get('state', '').strip()
-        zip_code = request.form.get('zip_code', '').strip()
-        price_per_month = request.form.get('price_per_month')
-        min_contract_duration = request.form.get('min_contract_duration')
-        bedrooms = request.form.get('bedrooms')
-        bathrooms = request.form.get('bathrooms')
-        area_sqft = request.form.get('area_sqft')
-        
-        # Validation (same as above)
-        errors = []
-        
-        if not title or len(title) < 5:
-            errors.append('Title is required and must be at least 5 characters')
-        
-        if not description or len(description) < 20:
-            errors.append('Description is required and must be at least 20 characters')
-        
-        if not address or len(address) < 5:
-            errors.append('Address is required and must be at least 5 characters')
-        
-        if not city or len(city) < 2:
-            errors.append('City is required and must be at least 2 characters')
-        
-        if not state or len(state) < 2:
-            errors.append('State is required and must be at least 2 characters')
-        
-        if not zip_code:
-            errors.append('ZIP code is required')
-        
-        try:
-            price_per_month = float(price_per_month)
-            if price_per_month < 100 or price_per_month > 10000:
-                errors.append('Price must be between $100 and $10,000')
-        except (ValueError, TypeError):
-            errors.append('Invalid price amount')
-        
-        try:
-            min_contract_duration = int(min_contract_duration)
-            if min_contract_duration < 1 or min_contract_duration > 60:
-                errors.append('Contract duration must be between 1 and 60 months')
-        except (ValueError, TypeError):
-            errors.append('Invalid contract duration')
-        
-        try:
-            bedrooms = int(bedrooms)
-            if bedrooms < 0 or bedrooms > 10:
-                errors.append('Number of bedrooms must be between 0 and 10')
-        except (ValueError, TypeError):
-            errors.append('Invalid number of bedrooms')
-        
-        try:
-            bathrooms = float(bathrooms)
-            if bathrooms < 0.5 or bathrooms > 10:
-                errors.append('Number of bathrooms must be between 0.5 and 10')
-        except (ValueError, TypeError):
-            errors.append('Invalid number of bathrooms')
-        
-        try:
-            area_sqft = int(area_sqft)
-            if area_sqft < 100 or area_sqft > 10000:
-                errors.append('Area must be between 100 and 10,000 square feet')
-        except (ValueError, TypeError):
-            errors.append('Invalid area')
+        values, errors = validate_apartment(request.form)
         
         if errors:
             for error in errors:
@@ -232,21 +224,14 @@ def edit_apartment(apartment_id):
             return render_template('owner/edit_apartment.html', apartment=apartment)
         
         # Update apartment if validation passes
+        cached_version = apartment.updated_at
         try:
-            apartment.title = title
-            apartment.description = description
-            apartment.address = address
-            apartment.city = city
-            apartment.state = state
-            apartment.zip_code = zip_code
-            apartment.price_per_month = price_per_month
-            apartment.min_contract_duration = min_contract_duration
-            apartment.bedrooms = bedrooms
-            apartment.bathrooms = bathrooms
-            apartment.area_sqft = area_sqft
+            for name, value in values.items():
+                setattr(apartment, name, value)
             apartment.is_available = request.form.get('is_available') == 'on'
             
             db.session.commit()
+            invalidate_apartment(apartment.id, cached_version, listing=True)
             flash('Apartment updated successfully!', 'success')
             return redirect(url_for('owner.dashboard'))
             
@@ -270,12 +255,69 @@ def delete_apartment(apartment_id):
         flash('Access denied. You can only delete your own apartments.', 'error')
         return redirect(url_for('owner.dashboard'))
     
+    cached_version = apartment.updated_at
     try:
         db.session.delete(apartment)
         db.session.commit()
+        invalidate_apartment(apartment_id, cached_version, listing=True)
         flash('Apartment deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
         flash('An error occurred while deleting the apartment. Please try again.', 'error')
     
     return redirect(url_for('owner.dashboard'))
+
+@owner_bp.route('/apartment/<int:apartment_id>/images', methods=['GET', 'POST'])
+@login_required
+def apartment_images(apartment_id):
+    if not current_user.is_owner:
+        flash('Access denied. Owner privileges required.', 'error')
+        return redirect(url_for('main.index'))
+    
+    apartment = Apartment.query.get_or_404(apartment_id)
+    
+    if apartment.owner_id != current_user.id:
+        flash('Access denied. You can only manage images of your own apartments.', 'error')
+        return redirect(url_for('owner.dashboard'))
+    
+    if request.method == 'POST':
+        files = [file for file in request.files.getlist('images') if file.filename]
+        if not files:
+            flash('Please choose at least one image to upload.', 'error')
+        
+        uploaded = 0
+        for file in files:
+            try:
+                add_apartment_image(apartment, file)
+                uploaded += 1
+            except InvalidImage as e:
+                flash(str(e), 'error')
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f'Image upload failed: {e}')
+                flash(f'An error occurred while uploading {file.filename}. Please try again.', 'error')
+        
+        if uploaded:
+            flash(f'{uploaded} image(s) uploaded. Resized versions will appear shortly.', 'success')
+        return redirect(url_for('owner.apartment_images', apartment_id=apartment.id))
+    
+    images = ApartmentImage.query.filter_by(apartment_id=apartment.id).order_by(ApartmentImage.created_at).all()
+    return render_template('owner/images.html', apartment=apartment, images=images)
+
+@owner_bp.route('/apartment/<int:apartment_id>/images/<int:image_id>/primary', methods=['POST'])
+@login_required
+def primary_image(apartment_id, image_id):
+    image = ApartmentImage.query.filter_by(id=image_id, apartment_id=apartment_id).first_or_404()
+    
+    if not current_user.is_owner or image.apartment.owner_id != current_user.id:
+        flash('Access denied. You can only manage images of your own apartments.', 'error')
+        return redirect(url_for('owner.dashboard'))
+    
+    try:
+        set_primary_image(image)
+        flash('Primary image updated.', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash('An error occurred while updating the primary image. Please try again.', 'error')
+    
+    return redirect(url_for('owner.apartment_images', apartment_id=apartment_id))
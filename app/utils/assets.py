@@ -0,0 +1,87 @@
+"""
+Static asset pipeline
+`flask build-assets` copies the CSS and JavaScript under app/static into
+app/static/dist with content-hashed names, writes gzip and brotli copies next
+to them and records the mapping in dist/manifest.json. Templates link to
+assets with asset_url(), which falls back to the plain static file in debug
+mode (so edits show up without a rebuild) and when the assets are not built.
+
+Brotli output needs the `brotli` package; without it only gzip is written.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from flask import current_app, url_for
+
+ASSET_DIRECTORIES = ('css', 'js')
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json')
+
+def dist_folder(static_folder):
+    return os.path.join(static_folder, current_app.config['ASSETS_FOLDER'])
+
+def _compress_brotli(data):
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def build_assets(static_folder=None):
+    """
+    Fingerprint and pre-compress the static assets
+    Returns the manifest mapping source paths to hashed paths.
+    """
+    static_folder = static_folder or current_app.static_folder
+    output = dist_folder(static_folder)
+    manifest = {}
+
+    for directory in ASSET_DIRECTORIES:
+        for base, _, files in os.walk(os.path.join(static_folder, directory)):
+            for name in sorted(files):
+                source = os.path.join(base, name)
+                relative = os.path.relpath(source, static_folder).replace(os.sep, '/')
+                with open(source, 'rb') as f:
+                    data = f.read()
+
+                stem, extension = os.path.splitext(relative)
+                hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+                target = os.path.join(output, hashed)
+                _write(target, data)
+
+                if extension in COMPRESSIBLE:
+                    # mtime=0 keeps the .gz output identical between builds
+                    _write(target + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+                    compressed = _compress_brotli(data)
+                    if compressed is not None:
+                        _write(target + '.br', compressed)
+                manifest[relative] = hashed
+
+    _write(os.path.join(output, 'manifest.json'), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    current_app.extensions.pop('roomsy_assets', None)
+    return manifest
+
+def load_manifest():
+    """Return the build manifest, read once per process ({} if not built)"""
+    manifest = current_app.extensions.get('roomsy_assets')
+    if manifest is None:
+        try:
+            with open(os.path.join(dist_folder(current_app.static_folder), 'manifest.json')) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        current_app.extensions['roomsy_assets'] = manifest
+    return manifest
+
+def asset_url(filename):
+    """url_for('static', ...) for assets, resolving the fingerprinted name"""
+    hashed = None if current_app.debug else load_manifest().get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('assets.asset_file', filename=hashed)
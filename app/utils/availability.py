@@ -0,0 +1,159 @@
+"""
+Per-apartment availability engine
+Booked nights are kept in apartment_calendar as one row per apartment and
+month with a 31-bit day bitmap. Checking whether [start, end) is free reads
+the handful of month rows for that range through the primary key, and
+reservations set their bits with a conditional UPDATE so two overlapping
+bookings can never both succeed.
+"""
+
+from datetime import date, timedelta
+from sqlalchemy import and_, delete, exists, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.availability import ApartmentCalendar
+from app.models.booking import Booking
+
+# Bookings in these states hold their nights
+ACTIVE_STATUSES = ('pending', 'confirmed', 'completed')
+
+FULL_MONTH = (1 << 31) - 1
+
+class DatesUnavailable(ValueError):
+    """Raised when a booking overlaps nights that are already taken"""
+
+def _next_month(month):
+    return date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+def month_masks(start_date, end_date):
+    """
+    Split the nights [start_date, end_date) into (first-of-month, bitmap) pairs
+    """
+    masks = []
+    month = start_date.replace(day=1)
+    while month < end_date:
+        following = _next_month(month)
+        first = max(start_date, month)
+        last = min(end_date, following) - timedelta(days=1)
+        if first <= last:
+            # Bits (first.day - 1) .. (last.day - 1) inclusive
+            mask = ((1 << last.day) - 1) ^ ((1 << (first.day - 1)) - 1)
+            masks.append((month, mask))
+        month = following
+    return masks
+
+def is_available(apartment_id, start_date, end_date):
+    """Return True when none of the nights in [start_date, end_date) are booked"""
+    masks = dict(month_masks(start_date, end_date))
+    if not masks:
+        return True
+
+    calendar = ApartmentCalendar.__table__
+    rows = db.session.execute(
+        select(calendar.c.month, calendar.c.booked_days).where(
+            calendar.c.apartment_id == apartment_id,
+            calendar.c.month >= min(masks),
+            calendar.c.month <= max(masks)
+        )
+    )
+    return all(not (booked_days & masks.get(month, 0)) for month, booked_days in rows)
+
+def available_filter(apartment_id_column, start_date, end_date):
+    """
+    Return a WHERE clause that keeps apartments free for [start_date, end_date)
+    It is a NOT EXISTS over the calendar's primary key, so each candidate
+    apartment costs one short index range read.
+    """
+    masks = month_masks(start_date, end_date)
+    if not masks:
+        return True
+
+    calendar = ApartmentCalendar.__table__
+    clashes = or_(*(
+        and_(calendar.c.month == month, calendar.c.booked_days.op('&')(mask) != 0)
+        for month, mask in masks
+    ))
+    return ~exists().where(
+        calendar.c.apartment_id == apartment_id_column,
+        calendar.c.month >= masks[0][0],
+        calendar.c.month <= masks[-1][0],
+        clashes
+    )
+
+def reserve_dates(apartment_id, start_date, end_date):
+    """
+    Mark the nights [start_date, end_date) as booked in the current transaction
+    Raises DatesUnavailable if any night is already taken; the caller should
+    roll back, since months reserved before the clash stay marked.
+    """
+    calendar = ApartmentCalendar.__table__
+
+    for month, mask in month_masks(start_date, end_date):
+        key = and_(calendar.c.apartment_id == apartment_id, calendar.c.month == month)
+        for attempt in range(2):
+            # Only succeeds if none of the requested nights are set yet
+            result = db.session.execute(
+                update(calendar).where(key, calendar.c.booked_days.op('&')(mask) == 0).values(
+                    booked_days=calendar.c.booked_days.op('|')(mask)
+                )
+            )
+            if result.rowcount:
+                break
+
+            exists = db.session.execute(select(calendar.c.month).where(key)).first()
+            if exists:
+                raise DatesUnavailable(f'Apartment {apartment_id} is already booked in {month:%B %Y}')
+
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(calendar).values(
+                        apartment_id=apartment_id, month=month, booked_days=mask
+                    ))
+                break
+            except IntegrityError:
+                # Another booking created the month row first; retry the update
+                if attempt:
+                    raise DatesUnavailable(f'Apartment {apartment_id} is already booked in {month:%B %Y}')
+
+def release_dates(apartment_id, start_date, end_date):
+    """Free the nights [start_date, end_date), e.g. when a booking is cancelled"""
+    calendar = ApartmentCalendar.__table__
+
+    for month, mask in month_masks(start_date, end_date):
+        db.session.execute(
+            update(calendar).where(
+                calendar.c.apartment_id == apartment_id, calendar.c.month == month
+            ).values(booked_days=calendar.c.booked_days.op('&')(FULL_MONTH ^ mask))
+        )
+
+def rebuild_calendar(connection, apartment_id=None):
+    """
+    Recompute calendar rows from the active bookings
+    Used to backfill the table and to repair it; overlapping legacy bookings
+    are merged rather than rejected.
+    """
+    calendar = ApartmentCalendar.__table__
+    bookings = Booking.__table__
+
+    clear = delete(calendar)
+    query = select(bookings.c.apartment_id, bookings.c.start_date, bookings.c.end_date).where(
+        bookings.c.status.in_(ACTIVE_STATUSES)
+    )
+    if apartment_id is not None:
+        clear = clear.where(calendar.c.apartment_id == apartment_id)
+        query = query.where(bookings.c.apartment_id == apartment_id)
+
+    connection.execute(clear)
+
+    rows = {}
+    for booking_apartment_id, start_date, end_date in connection.execute(query):
+        for month, mask in month_masks(start_date, end_date):
+            key = (booking_apartment_id, month)
+            rows[key] = rows.get(key, 0) | mask
+
+    if rows:
+        connection.execute(insert(calendar), [
+            {'apartment_id': key[0], 'month': key[1], 'booked_days': mask}
+            for key, mask in rows.items()
+        ])
+    return len(rows)
@@ -0,0 +1,222 @@
+"""
+Response and fragment cache
+Rendered pages for anonymous visitors, and the apartment cards shared by
+every listing view, are stored in a pluggable backend: an in-process LRU by
+default, or Redis when several workers should share one cache
+(CACHE_BACKEND=redis). Apartment pages and cards are keyed on the
+apartment's updated_at and listing pages on a generation counter, and the
+routes that change apartments or bookings invalidate exactly the entries
+they affect.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, render_template, request, session
+from flask_login import current_user
+from markupsafe import Markup
+from app import db
+
+LISTING_GENERATION_KEY = 'listing:generation'
+
+# Headers kept with a cached page so hits still answer conditional requests
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+class LRUCache:
+    """A thread-safe in-process cache that evicts the least recently used entry"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def incr(self, key):
+        with self.lock:
+            value = int(self.entries.get(key, (0, None))[0]) + 1
+            # Counters never expire and are not evicted ahead of pages
+            self.entries[key] = (value, None)
+            self.entries.move_to_end(key)
+            return value
+
+class RedisCache:
+    """
+    Cache stored in Redis, shared by every worker
+    Any client with the redis-py get/set/delete/incr methods works, so tests
+    can pass a local stand-in instead of a server.
+    """
+
+    def __init__(self, client=None, url=None, prefix='roomsy:'):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, timeout=None):
+        self.client.set(self.prefix + key, value, ex=timeout)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+def create_cache_backend(config):
+    """Build the backend selected by CACHE_BACKEND"""
+    if config['CACHE_BACKEND'] == 'redis':
+        return RedisCache(url=config['CACHE_REDIS_URL'])
+    return LRUCache(config['CACHE_MAX_ENTRIES'])
+
+def init_cache(app, backend=None):
+    """Attach the response cache to the app (`backend` overrides the config)"""
+    app.extensions['roomsy_cache'] = backend or create_cache_backend(app.config)
+    app.extensions['roomsy_cache_stats'] = {
+        'pages': {'hits': 0, 'misses': 0},
+        'fragments': {'hits': 0, 'misses': 0},
+    }
+    app.add_template_global(apartment_card)
+
+def get_cache():
+    return current_app.extensions['roomsy_cache']
+
+def _encode(response):
+    header = {'status': response.status_code}
+    header.update({name: response.headers[name] for name in CACHED_HEADERS if name in response.headers})
+    return json.dumps(header).encode() + b'\n' + response.get_data()
+
+def _decode(value):
+    header, body = value.split(b'\n', 1)
+    header = json.loads(header)
+    response = make_response(body, header.pop('status'))
+    response.headers.update(header)
+    return response
+
+def cached_page(key_func):
+    """
+    Serve the view from the response cache for anonymous visitors
+    key_func receives the view arguments and returns the cache key, or None
+    to skip the cache. Place it directly under the route decorator.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pages for logged-in users or with pending flash messages are personal
+            if current_user.is_authenticated or '_flashes' in session:
+                return view(*args, **kwargs)
+
+            key = key_func(*args, **kwargs)
+            if key is None:
+                return view(*args, **kwargs)
+
+            cache = get_cache()
+            stats = current_app.extensions['roomsy_cache_stats']['pages']
+            value = cache.get(key)
+            if value is not None:
+                stats['hits'] += 1
+                response = _decode(value).make_conditional(request)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            stats['misses'] += 1
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not session.modified:
+                cache.set(key, _encode(response), current_app.config['CACHE_TIMEOUT'])
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+def _card_key(apartment_id, updated_at):
+    return f'fragment:card:{apartment_id}:{updated_at.isoformat()}'
+
+def apartment_card(apartment):
+    """
+    Render an apartment's listing card, reusing the cached copy if there is one
+    Available in templates as {{ apartment_card(apartment) }}; the index,
+    search and owner dashboard all share the same entries.
+    """
+    if apartment.updated_at is None:
+        return Markup(render_template('main/_apartment_card.html', apartment=apartment))
+
+    cache = get_cache()
+    stats = current_app.extensions['roomsy_cache_stats']['fragments']
+    key = _card_key(apartment.id, apartment.updated_at)
+    value = cache.get(key)
+    if value is not None:
+        stats['hits'] += 1
+        return Markup(value.decode())
+
+    stats['misses'] += 1
+    html = render_template('main/_apartment_card.html', apartment=apartment)
+    cache.set(key, html.encode(), current_app.config['CACHE_TIMEOUT'])
+    return Markup(html)
+
+def cache_stats():
+    """Return this process's page and fragment hit/miss counters"""
+    stats = current_app.extensions['roomsy_cache_stats']
+    return {name: dict(counters) for name, counters in stats.items()}
+
+def listing_generation():
+    """Return the current generation of the listing pages"""
+    return int(get_cache().get(LISTING_GENERATION_KEY) or 0)
+
+def listing_page_key():
+    """Cache key of the requested listing page"""
+    return f"page:index:{listing_generation()}:{request.args.get('cursor', '')}"
+
+def _apartment_key(apartment_id, updated_at):
+    return f'page:apartment:{apartment_id}:{updated_at.isoformat()}'
+
+def apartment_page_key(apartment_id):
+    """Cache key of an apartment's detail page, or None if it does not exist"""
+    from app.models.apartment import Apartment
+
+    updated_at = db.session.query(Apartment.updated_at).filter(Apartment.id == apartment_id).scalar()
+    if updated_at is None:
+        return None
+    return _apartment_key(apartment_id, updated_at)
+
+def invalidate_listings():
+    """Drop every cached listing page by moving to a new generation"""
+    get_cache().incr(LISTING_GENERATION_KEY)
+
+def invalidate_apartment(apartment_id, updated_at, listing=False):
+    """
+    Drop the cached detail page and card of an apartment
+    Pass the updated_at they were cached under (read it before editing);
+    set listing when the change also shows up on the listing pages.
+    """
+    if updated_at is not None:
+        get_cache().delete(_apartment_key(apartment_id, updated_at))
+        get_cache().delete(_card_key(apartment_id, updated_at))
+    if listing:
+        invalidate_listings()
@@ -0,0 +1,169 @@
+"""
+Streaming response compression
+A WSGI middleware that gzip- or brotli-compresses HTML, JSON and other text
+responses chunk by chunk as the app yields them, so streamed responses stay
+streamed. Small bodies, already-encoded responses and media are passed
+through untouched. Bytes before and after compression are counted per
+endpoint and reported at /health/compression.
+"""
+
+import threading
+import zlib
+from itertools import chain
+from flask import request
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_options_header
+from werkzeug.wsgi import ClosingIterator
+
+# Per-process compression counters by endpoint, read by /health/compression
+stats = {}
+stats_lock = threading.Lock()
+
+def _record(endpoint, bytes_in, bytes_out):
+    with stats_lock:
+        entry = stats.setdefault(endpoint, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0})
+        entry['responses'] += 1
+        entry['bytes_in'] += bytes_in
+        entry['bytes_out'] += bytes_out
+
+def compression_stats():
+    """Return this process's counters with the bytes saved per endpoint"""
+    with stats_lock:
+        return {
+            endpoint: dict(entry, bytes_saved=entry['bytes_in'] - entry['bytes_out'])
+            for endpoint, entry in stats.items()
+        }
+
+class _GzipStream:
+    def __init__(self, level):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def finish(self):
+        return self.compressor.flush()
+
+class _BrotliStream:
+    def __init__(self, quality):
+        import brotli
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def finish(self):
+        return self.compressor.finish()
+
+def _brotli_available():
+    try:
+        import brotli  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class CompressionMiddleware:
+    """Compress the wrapped WSGI app's responses according to the Flask app's config"""
+
+    def __init__(self, app, wsgi_app):
+        self.app = app
+        self.wsgi_app = wsgi_app
+        self.brotli = _brotli_available()
+
+    def _negotiate(self, environ):
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        if self.brotli and accepted['br'] > 0:
+            return 'br'
+        if accepted['gzip'] > 0:
+            return 'gzip'
+        return None
+
+    def _compressible(self, status, headers):
+        config = self.app.config
+        if not status.startswith('200') or 'Content-Encoding' in headers:
+            return False
+        if 'no-transform' in headers.get('Cache-Control', ''):
+            return False
+        mimetype = parse_options_header(headers.get('Content-Type', ''))[0]
+        return mimetype in config['COMPRESSION_MIMETYPES']
+
+    def __call__(self, environ, start_response):
+        config = self.app.config
+        encoding = self._negotiate(environ)
+        if not config['COMPRESSION_ENABLED'] or encoding is None or environ['REQUEST_METHOD'] == 'HEAD':
+            return self.wsgi_app(environ, start_response)
+
+        response = {'written': []}
+
+        def capture_start_response(status, headers, exc_info=None):
+            response.update(status=status, headers=headers, exc_info=exc_info)
+            return response['written'].append
+
+        app_iter = self.wsgi_app(environ, capture_start_response)
+        chunks = iter(app_iter)
+        close = getattr(app_iter, 'close', None)
+        head = response['written']
+        if 'status' not in response:
+            # start_response may be deferred until the first chunk
+            head.append(next(chunks, b''))
+
+        status, headers = response['status'], Headers(response['headers'])
+        if not self._compressible(status, headers):
+            start_response(status, headers.to_wsgi_list(), response['exc_info'])
+            return ClosingIterator(chain(head, chunks), close)
+
+        # Read ahead until the body is known to be worth compressing
+        min_size = config['COMPRESSION_MIN_SIZE']
+        length = headers.get('Content-Length', type=int)
+        buffered = sum(len(chunk) for chunk in head)
+        if length is None:
+            for chunk in chunks:
+                head.append(chunk)
+                buffered += len(chunk)
+                if buffered >= min_size:
+                    break
+            else:
+                length = buffered
+        if length is not None and length < min_size:
+            start_response(status, headers.to_wsgi_list(), response['exc_info'])
+            return ClosingIterator(chain(head, chunks), close)
+
+        if encoding == 'br':
+            compressor = _BrotliStream(config['COMPRESSION_BROTLI_QUALITY'])
+        else:
+            compressor = _GzipStream(config['COMPRESSION_LEVEL'])
+
+        headers.remove('Content-Length')
+        headers['Content-Encoding'] = encoding
+        vary = headers.get('Vary')
+        headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            # The encoded body is no longer byte-identical to the original
+            headers['ETag'] = f'W/{etag}'
+        start_response(status, headers.to_wsgi_list(), response['exc_info'])
+
+        endpoint = environ.get('roomsy.endpoint') or 'unmatched'
+        return ClosingIterator(self._compress(chain(head, chunks), compressor, endpoint), close)
+
+    def _compress(self, chunks, compressor, endpoint):
+        bytes_in = bytes_out = 0
+        for chunk in chunks:
+            bytes_in += len(chunk)
+            # zlib/brotli hold small chunks back until they have enough to emit
+            data = compressor.compress(chunk)
+            if data:
+                bytes_out += len(data)
+                yield data
+        data = compressor.finish()
+        bytes_out += len(data)
+        yield data
+        _record(endpoint, bytes_in, bytes_out)
+
+def init_compression(app):
+    """Wrap the app in the compression middleware"""
+    @app.before_request
+    def remember_endpoint():
+        request.environ['roomsy.endpoint'] = request.endpoint
+
+    app.wsgi_app = CompressionMiddleware(app, app.wsgi_app)
@@ -0,0 +1,53 @@
+"""
+HTTP conditional GET for apartment pages
+Views derive an ETag and Last-Modified from the rows they are about to
+render, answer 304 Not Modified before the template runs when the client's
+copy is still current, and otherwise attach the validators to the response.
+"""
+
+import hashlib
+from flask import make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+
+def page_validators(rows, *extra):
+    """
+    Return (etag, last_modified) for a page showing `rows`
+    Extra values (cursors, totals, ...) that change the page go into the ETag
+    too, and so does the user, since the navigation differs per login.
+    """
+    last_modified = max((row.updated_at for row in rows if row.updated_at), default=None)
+    user = current_user.get_id() if current_user.is_authenticated else 'anonymous'
+
+    parts = [user]
+    parts.extend(f'{row.id}:{row.updated_at.isoformat() if row.updated_at else ""}' for row in rows)
+    parts.extend(str(value) for value in extra)
+    etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    return etag, last_modified
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Let browsers and proxies keep the page but revalidate it on every use
+    response.cache_control.no_cache = True
+    if current_user.is_authenticated:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    return response
+
+def not_modified(validators):
+    """Return a 304 response if the client's copy is current, else None"""
+    etag, last_modified = validators
+    # A pending flash message is not part of the cached copy
+    if '_flashes' in session:
+        return None
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return _set_validators(make_response('', 304), etag, last_modified)
+
+def conditional_response(body, validators):
+    """Wrap a rendered page in a response carrying its ETag and Last-Modified"""
+    etag, last_modified = validators
+    return _set_validators(make_response(body), etag, last_modified)
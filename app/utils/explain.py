@@ -0,0 +1,142 @@
+"""
+Query plan inspection
+Runs EXPLAIN (EXPLAIN QUERY PLAN on SQLite) for the statements each route
+issues and reports any that fall back to a sequential scan of a table
+"""
+
+import re
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import db
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(.*)$')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+def explain_statement(connection, statement, parameters=()):
+    """Return the query plan of a DBAPI-level statement as a list of lines"""
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in rows]
+
+    rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    return [row[0] for row in rows]
+
+def sequential_scans(plan, dialect, tables):
+    """Return the tables from `tables` that the plan reads with a full scan"""
+    scanned = []
+    for line in plan:
+        if dialect == 'sqlite':
+            match = SQLITE_SCAN.match(line.strip())
+            # "SCAN t USING INDEX ..." walks an index and virtual tables bring their own
+            if match and 'USING' not in match.group(2) and 'VIRTUAL TABLE' not in match.group(2):
+                name = match.group(1)
+            else:
+                continue
+        else:
+            match = POSTGRES_SCAN.search(line)
+            if not match:
+                continue
+            name = match.group(1)
+        if name in tables and name not in scanned:
+            scanned.append(name)
+    return scanned
+
+@contextmanager
+def capture_statements(engine):
+    """Record every (statement, parameters) pair executed on the engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+def _route_checks():
+    """
+    Build the list of (description, url, user) GET requests that cover the
+    routes' read queries, using whatever rows exist in the database
+    """
+    from app.models.apartment import Apartment
+    from app.models.booking import Booking
+    from app.models.user import User
+
+    checks = [
+        ('main.index', '/', None),
+        ('main.search (keywords)', '/search?q=apartment', None),
+        ('main.search (city + price)', '/search?city=New+York&min_price=500&max_price=3000', None),
+        ('main.search (price sort)', '/search?sort=price_low', None),
+        ('main.search (dates)', '/search?check_in=2030-01-20&check_out=2030-02-10', None),
+        ('api.apartments', '/api/v1/apartments?fields=id,title,price_per_month', None),
+        ('api.search', '/api/v1/search?q=apartment&city=New+York', None),
+    ]
+
+    apartment = Apartment.query.order_by(Apartment.id).first()
+    if apartment:
+        checks.append(('main.apartment_detail', f'/apartment/{apartment.id}', None))
+        checks.append(('api.apartment', f'/api/v1/apartments/{apartment.id}', None))
+
+    owner = User.query.filter_by(is_owner=True).order_by(User.id).first()
+    if owner:
+        checks.append(('owner.dashboard', '/owner/dashboard', owner.id))
+        checks.append(('owner.export_bookings', '/owner/bookings/export?status=confirmed', owner.id))
+
+    booking = Booking.query.order_by(Booking.id).first()
+    tenant_id = booking.user_id if booking else None
+    if tenant_id is None:
+        tenant = User.query.filter_by(is_owner=False).order_by(User.id).first()
+        tenant_id = tenant.id if tenant else None
+    if tenant_id is not None:
+        checks.append(('booking.my_bookings', '/booking/my-bookings', tenant_id))
+        if apartment:
+            checks.append(('booking.book_apartment', f'/booking/{apartment.id}', tenant_id))
+    if booking:
+        checks.append(('booking.payment', f'/booking/payment/{booking.id}', booking.user_id))
+
+    return checks
+
+def check_route_plans(app):
+    """
+    Request every read-only route through the test client, EXPLAIN each
+    SELECT it ran and collect the ones that scan a whole table.
+    Returns a list of (route, statement, tables) problems; empty means pass.
+    """
+    problems = []
+
+    with app.app_context():
+        engine = db.engine
+        dialect = engine.dialect.name
+        tables = set(db.metadata.tables)
+        checks = _route_checks()
+        db.session.remove()
+
+    client = app.test_client()
+    for description, url, user_id in checks:
+        with client.session_transaction() as session:
+            session.clear()
+            if user_id is not None:
+                session['_user_id'] = str(user_id)
+                session['_fresh'] = True
+
+        with capture_statements(engine) as statements:
+            client.get(url)
+
+        seen = set()
+        with engine.connect() as connection:
+            if dialect == 'postgresql':
+                # Small tables make the planner prefer seq scans; only flag unavoidable ones
+                connection.exec_driver_sql("SET enable_seqscan = off")
+            for statement, parameters in statements:
+                if not statement.lstrip().upper().startswith('SELECT') or statement in seen:
+                    continue
+                seen.add(statement)
+                plan = explain_statement(connection, statement, parameters)
+                scanned = sequential_scans(plan, dialect, tables)
+                if scanned:
+                    problems.append((description, statement, scanned))
+
+    return problems
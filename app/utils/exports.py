@@ -0,0 +1,108 @@
+"""
+Streaming booking exports
+An owner's bookings are read with a server-side cursor (yield_per) and
+written out as CSV or NDJSON in fixed-size chunks while the client
+downloads, so an export of any length never holds the whole result set
+in the worker.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import select
+from app import db
+from app.models.apartment import Apartment
+from app.models.booking import Booking
+from app.models.user import User
+
+# Export columns: header name -> selected expression
+EXPORT_COLUMNS = {
+    'booking_id': Booking.id,
+    'created_at': Booking.created_at,
+    'apartment_id': Apartment.id,
+    'apartment': Apartment.title,
+    'city': Apartment.city,
+    'tenant': User.username,
+    'start_date': Booking.start_date,
+    'end_date': Booking.end_date,
+    'status': Booking.status,
+    'total_amount': Booking.total_amount,
+    'deposit_amount': Booking.deposit_amount,
+    'deposit_paid': Booking.deposit_paid,
+    'full_payment_paid': Booking.full_payment_paid,
+    'remaining_amount': Booking.total_amount - Booking.deposit_amount,
+}
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# A spreadsheet runs a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def booking_export_query(owner_id, start=None, end=None, statuses=None):
+    """
+    Select the export columns for an owner's bookings, oldest first
+    `start`/`end` keep bookings whose stay overlaps the range; `statuses`
+    limits the booking statuses included.
+    """
+    query = select(*[column.label(name) for name, column in EXPORT_COLUMNS.items()]).select_from(
+        Booking
+    ).join(Booking.apartment).join(Booking.user).where(Apartment.owner_id == owner_id)
+
+    if start:
+        query = query.where(Booking.end_date >= start)
+    if end:
+        query = query.where(Booking.start_date <= end)
+    if statuses:
+        query = query.where(Booking.status.in_(statuses))
+    return query.order_by(Booking.created_at, Booking.id)
+
+def stream_rows(query, batch_size=1000):
+    """Execute `query` with a server-side cursor and yield its rows in batches"""
+    result = db.session.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _csv_value(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def iter_export(rows, format='csv', chunk_size=64 * 1024):
+    """
+    Encode rows as CSV (with a header) or NDJSON, yielding ~chunk_size bytes at a time
+    CSV text that a spreadsheet would read as a formula (tenant names and
+    apartment titles are user input) is prefixed with a quote; NDJSON is
+    written as is.
+    """
+    buffer = io.StringIO()
+    if format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+
+        def write(row):
+            writer.writerow(map(_csv_value, row))
+    else:
+        names = list(EXPORT_COLUMNS)
+
+        def write(row):
+            buffer.write(json.dumps(dict(zip(names, map(_json_value, row)))))
+            buffer.write('\n')
+
+    for row in rows:
+        write(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
@@ -0,0 +1,251 @@
+"""
+Apartment image pipeline
+Uploads are copied to disk in chunks while being hashed and stored under
+their SHA-256, so re-uploading the same photo reuses the stored file.
+Thumbnails and responsive sizes are generated in a process pool off the
+request path; when they are ready the image is marked ready and, for the
+primary image, the card-size variant is recorded on the apartment.
+
+Resizing needs Pillow (`pip install Pillow`). Without it the original file
+is used for every size.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from datetime import datetime
+from functools import partial
+from flask import current_app, url_for
+from app import db
+from app.models.apartment import ApartmentImage
+
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of the formats we accept, mapped to the stored extension
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+]
+
+class InvalidImage(ValueError):
+    """Raised when an upload is not a supported image"""
+
+def image_root():
+    """Absolute directory holding originals and variants"""
+    return os.path.join(current_app.static_folder, current_app.config['IMAGE_FOLDER'])
+
+def image_url(path):
+    """URL of a stored image or variant (paths are relative to IMAGE_FOLDER)"""
+    return url_for('media.media_file', filename=path)
+
+def sniff_image_type(head):
+    """Return the file extension for the image format of `head`, or None"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+def _stored_path(content_hash, extension, suffix=''):
+    return f'{content_hash[:2]}/{content_hash}{suffix}.{extension}'
+
+def store_upload(file):
+    """
+    Copy an uploaded file into the content-addressed store
+    Werkzeug already spools large uploads to a temporary file; this copies it
+    in CHUNK_SIZE pieces, so memory use does not grow with the upload.
+    Returns (content_hash, path relative to IMAGE_FOLDER).
+    """
+    root = image_root()
+    os.makedirs(root, exist_ok=True)
+
+    digest = hashlib.sha256()
+    head = b''
+    handle, temp_path = tempfile.mkstemp(dir=root, suffix='.upload')
+    try:
+        with os.fdopen(handle, 'wb') as temp:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(head) < 16:
+                    head += chunk[:16]
+                digest.update(chunk)
+                temp.write(chunk)
+
+        extension = sniff_image_type(head)
+        if extension is None:
+            raise InvalidImage(f'{file.filename or "Upload"} is not a JPEG, PNG, GIF or WebP image')
+
+        content_hash = digest.hexdigest()
+        path = _stored_path(content_hash, extension)
+        destination = os.path.join(root, path)
+        if os.path.exists(destination):
+            # Same bytes were uploaded before; keep the stored copy
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.replace(temp_path, destination)
+        return content_hash, path
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def generate_variants(root, path, content_hash, sizes, quality):
+    """
+    Write a JPEG per size (longest side at most `width`) next to the original
+    Runs in a worker process, so it only touches the filesystem. Existing
+    variants of the same content are reused.
+    """
+    from PIL import Image, ImageOps
+
+    variants = {}
+    with Image.open(os.path.join(root, path)) as original:
+        original = ImageOps.exif_transpose(original).convert('RGB')
+        for name, width in sizes.items():
+            variant = _stored_path(content_hash, 'jpg', f'_{width}')
+            variant_file = os.path.join(root, variant)
+            if not os.path.exists(variant_file):
+                resized = original.copy()
+                resized.thumbnail((width, width))
+                resized.save(variant_file, 'JPEG', quality=quality, optimize=True, progressive=True)
+            variants[name] = variant
+    return variants
+
+_pool = {'pid': None, 'executor': None}
+_pool_lock = threading.Lock()
+
+def _executor():
+    # A pool created before a fork is unusable in the child, so keep one per process
+    from concurrent.futures import ProcessPoolExecutor  # multiprocessing is slow to import; only load it for uploads
+
+    with _pool_lock:
+        if _pool['pid'] != os.getpid():
+            _pool['executor'] = ProcessPoolExecutor(max_workers=current_app.config['IMAGE_WORKERS'])
+            _pool['pid'] = os.getpid()
+        return _pool['executor']
+
+def _pillow_available():
+    try:
+        import PIL  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def record_variants(image_id, variants=None, error=None):
+    """Store the finished variants and update the apartment's card image"""
+    from app.utils.cache import invalidate_apartment
+
+    image = db.session.get(ApartmentImage, image_id)
+    if image is None:
+        return
+    apartment = image.apartment
+
+    if error is not None:
+        image.status = 'failed'
+        current_app.logger.error(f'Could not process image {image_id}: {error}')
+    else:
+        image.status = 'ready'
+        image.variants = variants
+        if image.is_primary:
+            apartment.card_image = variants['card']
+
+    cached_version = apartment.updated_at
+    # Bump updated_at so cached cards, pages and ETags pick up the new image
+    apartment.updated_at = datetime.utcnow()
+    db.session.commit()
+    invalidate_apartment(apartment.id, cached_version, listing=image.is_primary)
+
+def _variants_done(app, image_id, future):
+    with app.app_context():
+        try:
+            error = future.exception()
+            record_variants(image_id, None if error else future.result(), error)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f'Could not record variants of image {image_id}: {e}')
+        finally:
+            db.session.remove()
+
+def process_image(image):
+    """
+    Generate the variants of a committed image off the request path
+    Returns the pool future, or None when the image was handled inline
+    (Pillow missing, IMAGE_WORKERS = 0, or the variants of this content
+    already exist).
+    """
+    config = current_app.config
+    sizes = config['IMAGE_SIZES']
+
+    if not _pillow_available():
+        # Serve the original at every size rather than leaving the image pending
+        record_variants(image.id, {name: image.filename for name in sizes})
+        return None
+
+    existing = ApartmentImage.query.filter(
+        ApartmentImage.content_hash == image.content_hash,
+        ApartmentImage.status == 'ready',
+        ApartmentImage.id != image.id
+    ).first()
+    if existing and existing.variants:
+        record_variants(image.id, dict(existing.variants))
+        return None
+
+    arguments = (image_root(), image.filename, image.content_hash, sizes, config['IMAGE_QUALITY'])
+    if not config['IMAGE_WORKERS']:
+        # No pool configured: resize within the request
+        try:
+            variants = generate_variants(*arguments)
+        except Exception as e:
+            record_variants(image.id, error=e)
+        else:
+            record_variants(image.id, variants)
+        return None
+
+    future = _executor().submit(generate_variants, *arguments)
+    future.add_done_callback(partial(_variants_done, current_app._get_current_object(), image.id))
+    return future
+
+def add_apartment_image(apartment, file):
+    """
+    Store an upload as an image of the apartment and queue its variants
+    Returns (image, future); a re-upload of one of the apartment's existing
+    images returns that image with no future.
+    """
+    content_hash, path = store_upload(file)
+
+    image = ApartmentImage.query.filter_by(apartment_id=apartment.id, content_hash=content_hash).first()
+    if image:
+        return image, None
+
+    has_primary = db.session.query(ApartmentImage.id).filter_by(
+        apartment_id=apartment.id, is_primary=True
+    ).first() is not None
+    image = ApartmentImage(
+        apartment_id=apartment.id, filename=path, content_hash=content_hash,
+        status='pending', is_primary=not has_primary
+    )
+    db.session.add(image)
+    db.session.commit()
+    return image, process_image(image)
+
+def set_primary_image(image):
+    """Make `image` the apartment's primary image and use it on listing cards"""
+    from app.utils.cache import invalidate_apartment
+
+    apartment = image.apartment
+    cached_version = apartment.updated_at
+
+    ApartmentImage.query.filter(
+        ApartmentImage.apartment_id == apartment.id, ApartmentImage.id != image.id
+    ).update({'is_primary': False})
+    image.is_primary = True
+    apartment.card_image = (image.variants or {}).get('card') if image.status == 'ready' else None
+    apartment.updated_at = datetime.utcnow()
+    db.session.commit()
+    invalidate_apartment(apartment.id, cached_version, listing=True)
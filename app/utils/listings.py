@@ -0,0 +1,212 @@
+"""
+Apartment listing validation and bulk import
+validate_apartment() holds the field rules of the owner forms; the importer
+streams CSV or NDJSON rows through the same rules and inserts the valid ones
+in chunks (executemany, or COPY on PostgreSQL), so memory use does not grow
+with the size of the file.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import JSON, Boolean, Integer, Numeric, insert
+from app import db
+from app.models.apartment import Apartment
+
+APARTMENT_FIELDS = [
+    'title', 'description', 'address', 'city', 'state', 'zip_code', 'price_per_month',
+    'min_contract_duration', 'bedrooms', 'bathrooms', 'area_sqft'
+]
+
+# Columns written by the importer, in COPY order
+IMPORT_COLUMNS = APARTMENT_FIELDS + ['is_available', 'owner_id', 'created_at', 'updated_at']
+
+def _text(data, name):
+    value = data.get(name)
+    return '' if value is None else str(value).strip()
+
+def _number(data, name, convert, low, high, range_error, invalid_error, errors):
+    value = data.get(name)
+    try:
+        value = convert(value)
+        if value < low or value > high:
+            errors.append(range_error)
+    except (ValueError, TypeError):
+        errors.append(invalid_error)
+    return value
+
+def validate_apartment(data):
+    """
+    Check apartment fields against the listing rules
+    `data` is any mapping of field name to value (form data, a CSV row, a
+    JSON object). Returns (values, errors); values holds the cleaned fields,
+    or the raw input for fields that could not be converted.
+    """
+    errors = []
+    values = {name: _text(data, name) for name in ('title', 'description', 'address', 'city', 'state', 'zip_code')}
+
+    if not values['title'] or len(values['title']) < 5:
+        errors.append('Title is required and must be at least 5 characters')
+
+    if not values['description'] or len(values['description']) < 20:
+        errors.append('Description is required and must be at least 20 characters')
+
+    if not values['address'] or len(values['address']) < 5:
+        errors.append('Address is required and must be at least 5 characters')
+
+    if not values['city'] or len(values['city']) < 2:
+        errors.append('City is required and must be at least 2 characters')
+
+    if not values['state'] or len(values['state']) < 2:
+        errors.append('State is required and must be at least 2 characters')
+
+    if not values['zip_code']:
+        errors.append('ZIP code is required')
+
+    values['price_per_month'] = _number(
+        data, 'price_per_month', float, 100, 10000,
+        'Price must be between $100 and $10,000', 'Invalid price amount', errors
+    )
+    values['min_contract_duration'] = _number(
+        data, 'min_contract_duration', int, 1, 60,
+        'Contract duration must be between 1 and 60 months', 'Invalid contract duration', errors
+    )
+    values['bedrooms'] = _number(
+        data, 'bedrooms', int, 0, 10,
+        'Number of bedrooms must be between 0 and 10', 'Invalid number of bedrooms', errors
+    )
+    values['bathrooms'] = _number(
+        data, 'bathrooms', int, 1, 10,
+        'Number of bathrooms must be between 1 and 10', 'Invalid number of bathrooms', errors
+    )
+    values['area_sqft'] = _number(
+        data, 'area_sqft', int, 100, 10000,
+        'Area must be between 100 and 10,000 square feet', 'Invalid area', errors
+    )
+    return values, errors
+
+def detect_format(filename):
+    """Guess the import format from a file name ('csv' or 'ndjson')"""
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+def iter_rows(stream, format='csv'):
+    """
+    Yield (line number, row dict) from a binary stream, one row at a time
+    Rows that cannot be parsed are yielded as (line number, error message).
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if format == 'csv' else None)
+
+    if format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, f'Invalid JSON: {e}'
+            continue
+        yield number, row if isinstance(row, dict) else 'Each line must be a JSON object'
+
+def _copy_value(value, column_type):
+    """One COPY CSV field in the text form PostgreSQL parses for the column's type"""
+    if value is None:
+        return ''  # unquoted empty field is NULL
+    if isinstance(column_type, Boolean):
+        text = 'true' if value else 'false'
+    elif isinstance(column_type, Integer):
+        if isinstance(value, str) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(f'{value!r} is not an integer')
+        text = str(int(value))
+    elif isinstance(column_type, Numeric):
+        text = repr(float(value))
+    elif isinstance(column_type, JSON) or isinstance(value, (dict, list)):
+        text = json.dumps(value)
+    elif isinstance(value, (date, datetime)):
+        text = value.isoformat()
+    else:
+        text = str(value)
+    # Always quoted, so an empty string stays an empty string
+    return '"' + text.replace('"', '""') + '"'
+
+def copy_csv(table, columns, rows):
+    """The COPY ... (FORMAT csv) input for row dicts, each value formatted for its column"""
+    types = [table.c[column].type for column in columns]
+    return ''.join(
+        ','.join(_copy_value(row[column], column_type) for column, column_type in zip(columns, types)) + '\n'
+        for row in rows
+    )
+
+def copy_rows(connection, table, columns, rows):
+    """
+    COPY row dicts into `table` on PostgreSQL; returns False if the driver cannot
+    Only pg8000 and psycopg2 expose COPY; callers fall back to executemany.
+    """
+    if connection.dialect.name != 'postgresql' or connection.dialect.driver not in ('pg8000', 'psycopg2'):
+        return False
+    driver = connection.dialect.driver
+    dbapi_connection = connection.connection.dbapi_connection
+
+    buffer = io.StringIO(copy_csv(table, columns, rows))
+
+    name = connection.dialect.identifier_preparer.format_table(table)
+    statement = f"COPY {name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = dbapi_connection.cursor()
+    try:
+        if driver == 'pg8000':
+            cursor.execute(statement, stream=buffer)
+        else:
+            cursor.copy_expert(statement, buffer)
+    finally:
+        cursor.close()
+    return True
+
+def _insert_chunk(rows):
+    connection = db.session.connection()
+    if not copy_rows(connection, Apartment.__table__, IMPORT_COLUMNS, rows):
+        # executemany; SQLAlchemy sends it as multi-row INSERT batches where supported
+        connection.execute(insert(Apartment.__table__), rows)
+    db.session.commit()
+
+def import_apartments(rows, owner_id, chunk_size=500, on_error=None):
+    """
+    Validate and insert (line number, row) pairs from iter_rows()
+    Valid rows are committed every chunk_size rows; on_error(line, errors)
+    is called for each rejected row. Returns a summary dict.
+    """
+    summary = {'rows': 0, 'imported': 0, 'failed': 0}
+    chunk = []
+
+    for line, row in rows:
+        summary['rows'] += 1
+        if isinstance(row, str):
+            values, errors = None, [row]
+        else:
+            values, errors = validate_apartment(row)
+
+        if errors:
+            summary['failed'] += 1
+            if on_error:
+                on_error(line, errors)
+            continue
+
+        now = datetime.utcnow()
+        values.update(is_available=True, owner_id=owner_id, created_at=now, updated_at=now)
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            _insert_chunk(chunk)
+            summary['imported'] += len(chunk)
+            chunk = []
+
+    if chunk:
+        _insert_chunk(chunk)
+        summary['imported'] += len(chunk)
+    return summary
@@ -0,0 +1,288 @@
+"""
+Request metrics in the Prometheus text format
+Each request records its latency, SQL statement count and database time by
+endpoint, templates record their render time, and requests in progress are
+kept as a gauge. /metrics renders these with the connection pool numbers.
+
+Every gunicorn worker keeps its own numbers. With METRICS_DIR set, workers
+write a snapshot there every METRICS_FLUSH_SECONDS and /metrics adds up the
+snapshots of all workers, so whichever worker answers the scrape reports the
+whole server. When a worker exits, the master folds its counters and
+histograms into archive.json and drops its gauges (mark_process_dead, called
+from gunicorn.conf.py), so totals never go backwards.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import before_render_template, current_app, g, has_app_context, request, template_rendered
+from sqlalchemy import event
+from app import db
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Name -> (type, help), in the order /metrics lists them
+METRICS = {
+    'roomsy_http_requests_total': ('counter', 'Requests handled, by endpoint, method and status'),
+    'roomsy_http_request_duration_seconds': ('histogram', 'Time to build the response, by endpoint'),
+    'roomsy_http_requests_in_flight': ('gauge', 'Requests being handled, by endpoint'),
+    'roomsy_db_queries_per_request': ('histogram', 'SQL statements executed per request, by endpoint'),
+    'roomsy_db_seconds_per_request': ('histogram', 'Time spent in SQL statements per request, by endpoint'),
+    'roomsy_template_render_seconds': ('histogram', 'Template render time, by template'),
+    'roomsy_db_pool_connections': ('gauge', 'Pooled database connections, by engine and state'),
+    'roomsy_db_pool_checkouts_total': ('counter', 'Connections handed out by the pools'),
+    'roomsy_db_pool_checkout_seconds_total': ('counter', 'Time spent waiting for pooled connections'),
+    'roomsy_db_pool_saturated_total': ('counter', 'Checkouts that found every connection in use'),
+    'roomsy_db_pool_timeouts_total': ('counter', 'Checkouts that gave up waiting for a connection'),
+}
+
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+# This process's metrics: (name, labels) -> value, or [bounds, counts, sum, count] for histograms
+counters = {}
+gauges = {}
+histograms = {}
+metrics_lock = threading.Lock()
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def _inc(name, labels, amount=1, values=counters):
+    key = _key(name, labels)
+    with metrics_lock:
+        values[key] = values.get(key, 0) + amount
+
+def _observe(name, labels, value, bounds):
+    key = _key(name, labels)
+    with metrics_lock:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [list(bounds), [0] * (len(bounds) + 1), 0.0, 0]
+        histogram[1][bisect_left(bounds, value)] += 1  # last slot is +Inf
+        histogram[2] += value
+        histogram[3] += 1
+
+# Collection
+
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'metrics_started' in g:
+        g.metrics_queries += 1
+        g.metrics_db_seconds += time.perf_counter() - context._query_started
+
+def _template_started(app, template, context, **extra):
+    g.setdefault('metrics_templates', []).append(time.perf_counter())
+
+def _template_finished(app, template, context, **extra):
+    started = g.get('metrics_templates')
+    if started:
+        _observe('roomsy_template_render_seconds', {'template': template.name or 'string'},
+                 time.perf_counter() - started.pop(), app.config['METRICS_LATENCY_BUCKETS'])
+
+def _start_request():
+    if request.endpoint == 'health.metrics':
+        return
+    _ensure_flusher()
+    g.metrics_started = time.perf_counter()
+    g.metrics_endpoint = request.endpoint or 'unmatched'
+    g.metrics_queries = 0
+    g.metrics_db_seconds = 0.0
+    _inc('roomsy_http_requests_in_flight', {'endpoint': g.metrics_endpoint}, values=gauges)
+
+def _remember_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+def _finish_request(error=None):
+    if 'metrics_started' not in g:
+        return
+    buckets = current_app.config['METRICS_LATENCY_BUCKETS']
+    endpoint = {'endpoint': g.metrics_endpoint}
+    status = 500 if error is not None else g.get('metrics_status', 500)
+    _inc('roomsy_http_requests_in_flight', endpoint, -1, values=gauges)
+    _inc('roomsy_http_requests_total', dict(endpoint, method=request.method, status=str(status)))
+    _observe('roomsy_http_request_duration_seconds', endpoint, time.perf_counter() - g.metrics_started, buckets)
+    _observe('roomsy_db_queries_per_request', endpoint, g.metrics_queries, QUERY_BUCKETS)
+    _observe('roomsy_db_seconds_per_request', endpoint, g.metrics_db_seconds, buckets)
+
+# Snapshots shared between processes
+
+def _pool_metrics(snapshot):
+    from app.database import REPLICA, pool_stats
+
+    stats = pool_stats(db.engine, db.engines.get(REPLICA))
+    for name, engine_stats in (('primary', stats), ('replica', stats.get('replica'))):
+        if engine_stats and 'checked_out' in engine_stats:
+            for state in ('checked_out', 'checked_in', 'overflow'):
+                snapshot['gauges'].append(['roomsy_db_pool_connections', [['engine', name], ['state', state]],
+                                           engine_stats[state]])
+    for counter, field in (('checkouts_total', 'checkouts'), ('checkout_seconds_total', 'checkout_seconds'),
+                           ('saturated_total', 'saturated'), ('timeouts_total', 'timeouts')):
+        snapshot['counters'].append([f'roomsy_db_pool_{counter}', [], stats[field]])
+
+def snapshot(app):
+    """This process's metrics as a JSON-serialisable dict"""
+    with metrics_lock:
+        result = {
+            'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+            'gauges': [[name, labels, value] for (name, labels), value in gauges.items()],
+            'histograms': [[name, labels] + [list(part) if isinstance(part, list) else part for part in histogram]
+                           for (name, labels), histogram in histograms.items()],
+        }
+    with app.app_context():
+        _pool_metrics(result)
+    return result
+
+def _merge(snapshots):
+    merged = {'counters': {}, 'gauges': {}, 'histograms': {}}
+    for data in snapshots:
+        for kind in ('counters', 'gauges'):
+            for name, labels, value in data.get(kind, []):
+                key = (name, tuple(map(tuple, labels)))
+                merged[kind][key] = merged[kind].get(key, 0) + value
+        for name, labels, bounds, counts, total, count in data.get('histograms', []):
+            key = (name, tuple(map(tuple, labels)))
+            if key not in merged['histograms']:
+                merged['histograms'][key] = [bounds, list(counts), total, count]
+            else:
+                histogram = merged['histograms'][key]
+                histogram[1] = [a + b for a, b in zip(histogram[1], counts)]
+                histogram[2] += total
+                histogram[3] += count
+    return merged
+
+def _flatten(merged):
+    return {
+        'counters': [[name, labels, value] for (name, labels), value in merged['counters'].items()],
+        'gauges': [[name, labels, value] for (name, labels), value in merged['gauges'].items()],
+        'histograms': [[name, labels] + histogram for (name, labels), histogram in merged['histograms'].items()],
+    }
+
+def _snapshot_path(directory, pid):
+    return os.path.join(directory, f'{pid}.json')
+
+def _write_json(path, data):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)  # readers never see a half-written file
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_snapshot(app):
+    """Write this process's snapshot into METRICS_DIR"""
+    directory = app.config.get('METRICS_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        _write_json(_snapshot_path(directory, os.getpid()), snapshot(app))
+
+def mark_process_dead(directory, pid):
+    """Fold an exited worker's counters and histograms into archive.json and drop its gauges"""
+    path = _snapshot_path(directory, pid)
+    if not os.path.exists(path):
+        return
+    archive_path = os.path.join(directory, 'archive.json')
+    dead = dict(_read_json(path), gauges=[])
+    _write_json(archive_path, _flatten(_merge([_read_json(archive_path), dead])))
+    os.remove(path)
+
+def reset_metrics_dir(directory):
+    """Start a server's run with an empty METRICS_DIR"""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+_flusher = {'pid': None}
+_flusher_lock = threading.Lock()
+
+def _ensure_flusher():
+    # One flushing thread per worker process, started by its first request
+    if not current_app.config.get('METRICS_DIR') or _flusher['pid'] == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher['pid'] == os.getpid():
+            return
+        _flusher['pid'] = os.getpid()
+        app = current_app._get_current_object()
+
+        def flush():
+            while True:
+                time.sleep(app.config['METRICS_FLUSH_SECONDS'])
+                try:
+                    write_snapshot(app)
+                except Exception as e:
+                    app.logger.warning(f'Could not write metrics snapshot: {e}')
+
+        threading.Thread(target=flush, name='metrics-flusher', daemon=True).start()
+
+# Exposition
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_metrics(app):
+    """All workers' metrics (just this process's without METRICS_DIR) in the text format"""
+    directory = app.config.get('METRICS_DIR')
+    if directory:
+        write_snapshot(app)
+        merged = _merge(_read_json(path) for path in sorted(glob.glob(os.path.join(directory, '*.json'))))
+    else:
+        merged = _merge([snapshot(app)])
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        values = merged['histograms' if kind == 'histogram' else kind + 's']
+        series = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            bounds, counts, total, count = value
+            cumulative = 0
+            for bound, bucket in zip(list(bounds) + [float('inf')], counts):
+                cumulative += bucket
+                lines.append(f'{name}_bucket{_labels(labels, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+def init_metrics(app):
+    """Instrument requests, SQL statements and templates when METRICS_ENABLED is set"""
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    from app.database import time_queries
+
+    with app.app_context():
+        for engine in db.engines.values():
+            time_queries(engine)
+            if not event.contains(engine, 'after_cursor_execute', _query_finished):
+                event.listen(engine, 'after_cursor_execute', _query_finished)
+
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+    app.before_request(_start_request)
+    app.after_request(_remember_status)
+    app.teardown_request(_finish_request)
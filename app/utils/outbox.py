@@ -0,0 +1,196 @@
+"""
+Asynchronous email delivery through the outbox table
+Routes queue emails in the same transaction as the change they describe; a
+pool of worker threads sends them in batches over one SMTP connection and
+retries failures with exponential backoff.
+
+To try it against a local SMTP stand-in:
+    python -m smtpd -n -c DebuggingServer localhost:1025
+    MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=false flask --app run outbox-worker
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import func, select, update
+from app import db, mail
+from app.models.outbox import OutboxEmail
+
+# Per-process delivery counters, read by /health/outbox
+stats = {'sent': 0, 'retried': 0, 'failed': 0, 'batches': 0}
+stats_lock = threading.Lock()
+
+def _count(name, amount=1):
+    with stats_lock:
+        stats[name] += amount
+
+def enqueue_email(recipient, subject, body, sender=None):
+    """
+    Queue an email for delivery
+    The row is added to the current session, so it is committed (or rolled
+    back) together with the caller's own changes.
+    """
+    email = OutboxEmail(
+        sender=sender or current_app.config.get('MAIL_DEFAULT_SENDER') or current_app.config['MAIL_USERNAME'],
+        recipient=recipient,
+        subject=subject,
+        body=body
+    )
+    db.session.add(email)
+    return email
+
+def claim_batch(batch_size):
+    """
+    Lease up to batch_size due emails to this worker
+    Claimed rows are leased until OUTBOX_LEASE_SECONDS from now; if a worker
+    dies mid-batch they become due again once the lease runs out. Each row
+    is taken with a conditional UPDATE that only matches while it is still
+    due, so two workers never claim the same email even where FOR UPDATE
+    SKIP LOCKED is not available (SQLite).
+    """
+    now = datetime.utcnow()
+    lease = timedelta(seconds=current_app.config['OUTBOX_LEASE_SECONDS'])
+    due = (OutboxEmail.status.in_(['pending', 'sending']), OutboxEmail.next_attempt_at <= now)
+
+    candidates = db.session.scalars(
+        select(OutboxEmail.id).where(*due).order_by(OutboxEmail.next_attempt_at, OutboxEmail.id)
+        .limit(batch_size).with_for_update(skip_locked=True)
+    ).all()
+
+    claimed = []
+    for email_id in candidates:
+        result = db.session.execute(
+            update(OutboxEmail).where(OutboxEmail.id == email_id, *due)
+            .values(status='sending', next_attempt_at=now + lease)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            claimed.append(email_id)
+    db.session.commit()
+
+    if not claimed:
+        return []
+    return OutboxEmail.query.filter(OutboxEmail.id.in_(claimed)).order_by(
+        OutboxEmail.next_attempt_at, OutboxEmail.id
+    ).populate_existing().all()
+
+def _schedule_retry(email, error):
+    config = current_app.config
+    email.attempts = (email.attempts or 0) + 1
+    email.last_error = str(error)[:1000]
+    if email.attempts >= config['OUTBOX_MAX_ATTEMPTS']:
+        email.status = 'failed'
+        _count('failed')
+        current_app.logger.error(f'Giving up on email {email.id} to {email.recipient}: {error}')
+    else:
+        delay = config['OUTBOX_RETRY_BASE_SECONDS'] * 2 ** (email.attempts - 1)
+        email.status = 'pending'
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        _count('retried')
+
+def send_batch(emails):
+    """Send the claimed emails over a single SMTP connection"""
+    try:
+        with mail.connect() as connection:
+            for email in emails:
+                try:
+                    connection.send(Message(
+                        subject=email.subject,
+                        sender=email.sender,
+                        recipients=[email.recipient],
+                        body=email.body
+                    ))
+                    email.status = 'sent'
+                    email.sent_at = datetime.utcnow()
+                    email.attempts = (email.attempts or 0) + 1
+                    _count('sent')
+                except Exception as e:
+                    _schedule_retry(email, e)
+    except Exception as e:
+        # Could not connect (or the connection dropped): retry whatever is left
+        for email in emails:
+            if email.status == 'sending':
+                _schedule_retry(email, e)
+    db.session.commit()
+    _count('batches')
+
+def process_batch(batch_size=None):
+    """Claim and send one batch; returns the number of emails handled"""
+    emails = claim_batch(batch_size or current_app.config['OUTBOX_BATCH_SIZE'])
+    if emails:
+        send_batch(emails)
+    return len(emails)
+
+def queue_depth():
+    """Return outbox counts by status plus the age of the oldest due email"""
+    depth = {'pending': 0, 'sending': 0, 'sent': 0, 'failed': 0}
+    for status, count in db.session.query(OutboxEmail.status, func.count(OutboxEmail.id)).group_by(
+        OutboxEmail.status
+    ):
+        depth[status] = count
+
+    oldest = db.session.query(func.min(OutboxEmail.next_attempt_at)).filter(
+        OutboxEmail.status == 'pending'
+    ).scalar()
+    depth['oldest_pending_seconds'] = (
+        max(0, (datetime.utcnow() - oldest).total_seconds()) if oldest else 0
+    )
+    return depth
+
+class OutboxWorker:
+    """A pool of threads draining the outbox until stopped"""
+
+    def __init__(self, app, threads=None, batch_size=None, poll_seconds=None):
+        self.app = app
+        self.threads = threads or app.config['OUTBOX_WORKER_THREADS']
+        self.batch_size = batch_size or app.config['OUTBOX_BATCH_SIZE']
+        self.poll_seconds = poll_seconds or app.config['OUTBOX_POLL_SECONDS']
+        self.stop_event = threading.Event()
+        self.pool = []
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            handled = 0
+            with self.app.app_context():
+                try:
+                    handled = process_batch(self.batch_size)
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.error(f'Outbox worker error: {e}')
+                finally:
+                    db.session.remove()
+            # Keep draining while there is a backlog, otherwise wait for new mail
+            if handled < self.batch_size:
+                self.stop_event.wait(self.poll_seconds)
+
+    def start(self):
+        for i in range(self.threads):
+            thread = threading.Thread(target=self._run, name=f'outbox-worker-{i}', daemon=True)
+            thread.start()
+            self.pool.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self.stop_event.set()
+        for thread in self.pool:
+            thread.join(timeout)
+
+_in_process_worker = {'pid': None, 'worker': None}
+_in_process_lock = threading.Lock()
+
+def init_outbox(app):
+    """Start an in-process worker in each web process when OUTBOX_IN_PROCESS is set"""
+    if not app.config['OUTBOX_IN_PROCESS']:
+        return
+
+    @app.before_request
+    def start_outbox_worker():
+        # Threads do not survive fork, so start one pool per worker process
+        if _in_process_worker['pid'] == os.getpid():
+            return
+        with _in_process_lock:
+            if _in_process_worker['pid'] != os.getpid():
+                _in_process_worker['pid'] = os.getpid()
+                _in_process_worker['worker'] = OutboxWorker(app).start()
@@ -0,0 +1,174 @@
+"""
+Keyset (cursor) pagination helpers
+Pages are fetched with a WHERE on the sort key instead of OFFSET, so every
+page costs the same no matter how deep it is
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import and_, func, literal, or_, select, tuple_
+from app import db
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move around it"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None, total_capped=False):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_capped = total_capped
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        raise ValueError('Unknown cursor value')
+    return value
+
+def encode_cursor(values, direction='next'):
+    """Encode sort-key values into an opaque URL-safe cursor"""
+    payload = {'v': [_encode_value(value) for value in values], 'd': direction}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def _value_fits(value, column):
+    """Whether a decoded cursor value has the Python type of its sort column"""
+    if value is None:
+        return True
+    try:
+        expected = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return True
+    if isinstance(value, bool) and expected is not bool:
+        return False
+    if expected is float:
+        return isinstance(value, (int, float))
+    if expected is date:
+        return isinstance(value, date) and not isinstance(value, datetime)
+    return isinstance(value, expected)
+
+def decode_cursor(cursor, order_by=None):
+    """
+    Decode a cursor produced by encode_cursor
+    Returns (values, direction), or (None, 'next') for a missing or bad cursor.
+    With order_by, the values must also match its columns in number and type.
+    """
+    if not cursor:
+        return None, 'next'
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(value) for value in payload['v']]
+        direction = payload.get('d', 'next')
+        if direction not in ('next', 'prev'):
+            raise ValueError('Unknown cursor direction')
+        if order_by is not None:
+            if len(values) != len(order_by):
+                raise ValueError('Cursor does not match the sort order')
+            if not all(_value_fits(value, column) for value, (column, _) in zip(values, order_by)):
+                raise TypeError('Cursor value does not match its column')
+        return values, direction
+    except (ValueError, TypeError, KeyError):
+        return None, 'next'
+
+def _seek_condition(order_by, values):
+    """Build the WHERE clause selecting rows that sort after the given key"""
+    directions = {descending for _, descending in order_by}
+    columns = [column for column, _ in order_by]
+
+    # A single row-value comparison lets the database seek straight into an index
+    if len(directions) == 1:
+        if directions.pop():
+            return tuple_(*columns) < tuple_(*values)
+        return tuple_(*columns) > tuple_(*values)
+
+    clauses = []
+    for i, (column, descending) in enumerate(order_by):
+        equal = [order_by[j][0] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+def count_capped(query, limit):
+    """
+    Count the rows of a query, stopping once more than limit rows are seen
+    Returns (count, capped)
+    """
+    limited = query.order_by(None).with_entities(literal(1)).limit(limit + 1).subquery()
+    count = db.session.execute(select(func.count()).select_from(limited)).scalar()
+    if count > limit:
+        return limit, True
+    return count, False
+
+def keyset_paginate(query, order_by, cursor=None, per_page=9, count_limit=None):
+    """
+    Paginate a query by its sort key.
+    order_by is a list of (column, descending) pairs and must end in a unique
+    column (usually the primary key) so the order is stable. When count_limit
+    is given, the first page also carries an approximate total capped at that
+    many rows. Queries over several columns yield one tuple per row.
+    """
+    values, direction = decode_cursor(cursor, order_by)
+
+    if direction == 'prev':
+        # Walk backwards from the cursor and flip the rows afterwards
+        seek_order = [(column, not descending) for column, descending in order_by]
+    else:
+        seek_order = order_by
+
+    labels = [column.label(f'_key{i}') for i, (column, _) in enumerate(order_by)]
+    paged = query.add_columns(*labels)
+    if values is not None:
+        paged = paged.filter(_seek_condition(seek_order, values))
+    paged = paged.order_by(*[
+        column.desc() if descending else column.asc() for column, descending in seek_order
+    ])
+
+    rows = paged.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    entities = len(query.column_descriptions)
+    items = [row[0] if entities == 1 else tuple(row[:entities]) for row in rows]
+    keys = [list(row[entities:]) for row in rows]
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if (direction == 'next' and more) or direction == 'prev':
+            next_cursor = encode_cursor(keys[-1], 'next')
+        if (direction == 'prev' and more) or (direction == 'next' and values is not None):
+            prev_cursor = encode_cursor(keys[0], 'prev')
+
+    total = None
+    total_capped = False
+    if count_limit is not None and values is None:
+        total, total_capped = count_capped(query, count_limit)
+
+    return KeysetPage(items, next_cursor, prev_cursor, total, total_capped)
@@ -0,0 +1,95 @@
+"""
+Per-request query budget and N+1 detector
+Counts SQL statements and ORM lazy loads for each request and reports routes
+that go over budget. Enabled in debug mode or with QUERY_BUDGET_ENABLED.
+"""
+
+from collections import Counter
+from functools import wraps
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in strict mode when a request breaks its query budget"""
+
+def query_budget(queries=None, lazy_loads=None):
+    """
+    Set the query budget for a view
+    Place it directly under the route decorator so it wraps the registered view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            return view(*args, **kwargs)
+        wrapper.query_budget = queries
+        wrapper.lazy_load_budget = lazy_loads
+        return wrapper
+    return decorator
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'query_count' in g:
+        g.query_count += 1
+
+def _count_lazy_load(orm_execute_state):
+    if not (has_app_context() and 'lazy_loads' in g):
+        return
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return
+    try:
+        relationship = orm_execute_state.loader_strategy_path[-1]
+        name = f'{relationship.parent.class_.__name__}.{relationship.key}'
+    except (AttributeError, IndexError, TypeError):
+        name = 'unknown relationship'
+    g.lazy_loads[name] += 1
+
+def _start_counting():
+    g.query_count = 0
+    g.lazy_loads = Counter()
+
+def _check_budget(response):
+    if 'query_count' not in g:
+        return response
+
+    config = current_app.config
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None) or config['QUERY_BUDGET_DEFAULT']
+    lazy_budget = getattr(view, 'lazy_load_budget', None)
+    lazy_total = sum(g.lazy_loads.values())
+
+    problems = []
+    if g.query_count > budget:
+        problems.append(f'{g.query_count} queries (budget {budget})')
+    if lazy_budget is not None and lazy_total > lazy_budget:
+        problems.append(f'{lazy_total} lazy loads (budget {lazy_budget})')
+    for name, count in g.lazy_loads.items():
+        if count >= config['QUERY_BUDGET_N_PLUS_ONE']:
+            problems.append(f'N+1: {name} lazy-loaded {count} times')
+
+    response.headers['X-Query-Count'] = str(g.query_count)
+    response.headers['X-Lazy-Load-Count'] = str(lazy_total)
+
+    if problems:
+        message = f'Query budget exceeded on {request.endpoint}: ' + '; '.join(problems)
+        if config['QUERY_BUDGET_STRICT']:
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning(message)
+
+    return response
+
+def init_query_budget(app):
+    """Install the query counters when the detector is enabled for this app"""
+    if not app.config.get('QUERY_BUDGET_ENABLED', app.debug):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, 'after_cursor_execute', _count_query):
+                event.listen(engine, 'after_cursor_execute', _count_query)
+
+    if not event.contains(Session, 'do_orm_execute', _count_lazy_load):
+        event.listen(Session, 'do_orm_execute', _count_lazy_load)
+
+    app.before_request(_start_counting)
+    app.after_request(_check_budget)
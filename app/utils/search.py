@@ -0,0 +1,273 @@
+"""
+Full-text search for apartment listings
+Uses FTS5 on SQLite and a tsvector/GIN index on PostgreSQL, falling back to LIKE
+"""
+
+import re
+from datetime import date
+from flask import current_app
+from sqlalchemy import cast, func, literal_column, or_, text
+from app import db
+from app.models.apartment import Apartment
+from app.utils.availability import available_filter
+
+SEARCH_SORTS = {
+    'newest': [(Apartment.created_at, True), (Apartment.id, True)],
+    'price_low': [(Apartment.price_per_month, False), (Apartment.id, False)],
+    'price_high': [(Apartment.price_per_month, True), (Apartment.id, True)],
+}
+
+# Relevance is paged on the score rounded to this many steps per unit: an
+# integer survives the cursor round trip exactly and ties fall back to the id
+RANK_STEPS = 1_000_000
+
+# PostgreSQL's 'english' stop words (tsearch_data/english.stop). to_tsvector and
+# to_tsquery drop these, so parse_search_terms drops them before building the
+# FTS5 query too and both engines match the same rows. Stemming still differs
+# slightly: FTS5 uses the Porter stemmer and PostgreSQL the Snowball english
+# one, which split a few words (e.g. "generously") differently. Prefix matching
+# hides most of that; ranks come from bm25 vs ts_rank and only agree in order
+# of magnitude.
+STOP_WORDS = frozenset("""
+    i me my myself we our ours ourselves you your yours yourself yourselves he him his himself she her hers
+    herself it its itself they them their theirs themselves what which who whom this that these those am is
+    are was were be been being have has had having do does did doing a an the and but if or because as until
+    while of at by for with about against between into through during before after above below to from up
+    down in out on off over under again further then once here there when where why how all any both each few
+    more most other some such no nor not only own same so than too very s t can will just don should now
+""".split())
+
+SQLITE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS apartment_fts USING fts5(
+        title, description, address,
+        content='apartment', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS apartment_fts_ai AFTER INSERT ON apartment BEGIN
+        INSERT INTO apartment_fts(rowid, title, description, address)
+        VALUES (new.id, new.title, new.description, new.address);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS apartment_fts_ad AFTER DELETE ON apartment BEGIN
+        INSERT INTO apartment_fts(apartment_fts, rowid, title, description, address)
+        VALUES ('delete', old.id, old.title, old.description, old.address);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS apartment_fts_au AFTER UPDATE OF title, description, address ON apartment BEGIN
+        INSERT INTO apartment_fts(apartment_fts, rowid, title, description, address)
+        VALUES ('delete', old.id, old.title, old.description, old.address);
+        INSERT INTO apartment_fts(rowid, title, description, address)
+        VALUES (new.id, new.title, new.description, new.address);
+    END
+    """,
+]
+
+# The weighted document vector, for a row (NEW. in the trigger) or the table (backfill)
+POSTGRES_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce({row}title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({row}address, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce({row}description, '')), 'C')"
+)
+
+# A plain nullable column kept up to date by a trigger: adding it does not
+# rewrite the table, unlike a GENERATED ... STORED column
+POSTGRES_FTS_DDL = [
+    "ALTER TABLE apartment ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    f"""
+    CREATE OR REPLACE FUNCTION apartment_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {POSTGRES_SEARCH_VECTOR.format(row='NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS apartment_search_vector_update ON apartment",
+    """
+    CREATE TRIGGER apartment_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, description, address ON apartment
+    FOR EACH ROW EXECUTE FUNCTION apartment_search_vector()
+    """,
+]
+
+POSTGRES_BACKFILL = f"""
+    UPDATE apartment SET search_vector = {POSTGRES_SEARCH_VECTOR.format(row='')}
+    WHERE id IN (SELECT id FROM apartment WHERE search_vector IS NULL ORDER BY id LIMIT :batch)
+"""
+
+BACKFILL_BATCH = 5000  # rows per UPDATE, so row locks are held briefly
+
+def init_search_index(connection):
+    """
+    Create the full-text index for the connection's database.
+    The index is maintained by the database itself (triggers on SQLite, a
+    trigger-filled column on PostgreSQL), so every write to the apartment
+    table, including the owner create/edit/delete routes, keeps it in sync.
+    On PostgreSQL the GIN index is built CONCURRENTLY, so the connection must
+    be in autocommit mode. Returns the name of the search backend that is now
+    available.
+    """
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'apartment_fts'"
+        )).first()
+        for statement in SQLITE_FTS_DDL:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            # Index rows that were written before the FTS table existed
+            connection.exec_driver_sql("INSERT INTO apartment_fts(apartment_fts) VALUES ('rebuild')")
+        return 'fts5'
+
+    if dialect == 'postgresql':
+        for statement in POSTGRES_FTS_DDL:
+            connection.exec_driver_sql(statement)
+        from app.migrations.helpers import create_index
+
+        # Rows written before the trigger existed, in short batches
+        while connection.execute(text(POSTGRES_BACKFILL), {'batch': BACKFILL_BATCH}).rowcount:
+            pass
+        create_index(connection, 'ix_apartment_search_vector', 'apartment', 'search_vector', using='gin')
+        return 'tsvector'
+
+    return 'like'
+
+def drop_search_index(connection):
+    """Remove the full-text index structures, e.g. before rebuilding the schema"""
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        for trigger in ('apartment_fts_ai', 'apartment_fts_ad', 'apartment_fts_au'):
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS apartment_fts")
+    elif dialect == 'postgresql':
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS apartment_search_vector_update ON apartment")
+        connection.exec_driver_sql("DROP FUNCTION IF EXISTS apartment_search_vector()")
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ix_apartment_search_vector")
+
+def detect_search_backend(connection):
+    """Work out which search backend the database supports"""
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        found = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'apartment_fts'"
+        )).first()
+        return 'fts5' if found else 'like'
+
+    if dialect == 'postgresql':
+        found = connection.execute(text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'apartment' AND column_name = 'search_vector'"
+        )).first()
+        return 'tsvector' if found else 'like'
+
+    return 'like'
+
+def get_search_backend():
+    """Return the cached search backend for the current app"""
+    backend = current_app.extensions.get('roomsy_search')
+    if backend is None:
+        try:
+            backend = detect_search_backend(db.session.connection())
+        except Exception as e:
+            current_app.logger.error(f'Could not detect search backend: {e}')
+            backend = 'like'
+        current_app.extensions['roomsy_search'] = backend
+    return backend
+
+def parse_search_terms(query):
+    """Split a user query into lowercase search terms"""
+    terms = re.findall(r'\w+', query.lower())
+    return [term for term in terms if term not in STOP_WORDS]
+
+def search_apartments(apartments, query):
+    """
+    Restrict an Apartment query to rows matching the search text.
+    Every term must match (as a prefix) in the title, description or address.
+    Returns the filtered query and a rank expression where lower values are
+    more relevant, or None when results cannot be ranked.
+    """
+    terms = parse_search_terms(query)
+    if not terms:
+        return apartments, None
+
+    backend = get_search_backend()
+
+    if backend == 'fts5':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        matches = text(
+            "SELECT rowid AS apartment_id, bm25(apartment_fts, 10.0, 1.0, 5.0) AS rank "
+            "FROM apartment_fts WHERE apartment_fts MATCH :match"
+        ).bindparams(match=match).columns(apartment_id=db.Integer, rank=db.Float).subquery('fts')
+        apartments = apartments.join(matches, matches.c.apartment_id == Apartment.id)
+        return apartments, matches.c.rank
+
+    if backend == 'tsvector':
+        ts_query = func.to_tsquery('english', ' & '.join(f'{term}:*' for term in terms))
+        search_vector = literal_column('apartment.search_vector')
+        apartments = apartments.filter(search_vector.op('@@')(ts_query))
+        return apartments, -func.ts_rank(search_vector, ts_query)
+
+    for term in terms:
+        apartments = apartments.filter(or_(
+            Apartment.title.contains(term),
+            Apartment.description.contains(term),
+            Apartment.address.contains(term)
+        ))
+    return apartments, None
+
+def apply_search_filters(apartments, args):
+    """
+    Apply the search parameters shared by the search page and the JSON API
+    `apartments` may select whole Apartment rows or just some of its columns.
+    Returns (query, order_by, params, errors): order_by suits keyset_paginate,
+    params holds the parsed values and errors lists ignored parameters.
+    """
+    params = {
+        'query': args.get('q', ''),
+        'city': args.get('city', ''),
+        'min_price': args.get('min_price', type=float),
+        'max_price': args.get('max_price', type=float),
+        'check_in': args.get('check_in', type=date.fromisoformat),
+        'check_out': args.get('check_out', type=date.fromisoformat),
+        'sort': args.get('sort', ''),
+    }
+    errors = []
+    rank = None
+
+    if params['query']:
+        apartments, rank = search_apartments(apartments, params['query'])
+
+    if params['city']:
+        # Case-insensitive match on the whole city name so ix_apartment_city_lower is used
+        apartments = apartments.filter(func.lower(Apartment.city) == params['city'].strip().lower())
+
+    if params['min_price'] is not None:
+        apartments = apartments.filter(Apartment.price_per_month >= params['min_price'])
+
+    if params['max_price'] is not None:
+        apartments = apartments.filter(Apartment.price_per_month <= params['max_price'])
+
+    check_in, check_out = params['check_in'], params['check_out']
+    if check_in and check_out:
+        if check_out > check_in:
+            apartments = apartments.filter(available_filter(Apartment.id, check_in, check_out))
+        else:
+            errors.append('Check-out must be after check-in.')
+
+    # Most relevant matches first when searching by keyword, unless a sort was chosen
+    if params['sort'] in SEARCH_SORTS:
+        order_by = SEARCH_SORTS[params['sort']]
+    elif rank is not None:
+        params['sort'] = 'relevance'
+        order_by = [(cast(func.round(rank * RANK_STEPS), db.Integer), False), (Apartment.id, False)]
+    else:
+        params['sort'] = 'newest'
+        order_by = SEARCH_SORTS['newest']
+
+    return apartments, order_by, params, errors
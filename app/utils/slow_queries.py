@@ -0,0 +1,188 @@
+"""
+Slow query log
+Statements that take longer than SLOW_QUERY_THRESHOLD_MS are written to a
+rotating file as JSON lines: the statement, the shapes (not the values) of
+its parameters, the route that ran it and how long it took. Each process
+writes a file of its own (the pid goes before the extension), since
+RotatingFileHandler cannot rotate a file that other gunicorn workers are
+appending to. Statements are grouped by a fingerprint of their normalized
+SQL; the first time a fingerprint turns up in a process its EXPLAIN plan
+(EXPLAIN QUERY PLAN on SQLite) is captured as well, and per-fingerprint
+counters are reported at /health/slow-queries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from app import db
+from app.utils.explain import explain_statement
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\$\d+|\?')
+VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete')
+
+# Per-process counters by fingerprint, read by /health/slow-queries
+stats = {}
+stats_lock = threading.Lock()
+
+_engine_apps = weakref.WeakKeyDictionary()  # engine -> the app that owns it
+
+# Open log files by path, which includes the pid
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+def normalize_sql(statement):
+    """Replace literals and placeholders with ? and collapse IN lists and whitespace"""
+    sql = STRING_LITERAL.sub('?', statement)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    sql = PLACEHOLDER.sub('?', sql)
+    sql = VALUE_LIST.sub('(?+)', sql)
+    return ' '.join(sql.split())
+
+def fingerprint(statement):
+    """Short hash of the normalized statement; one per query shape"""
+    return hashlib.sha1(normalize_sql(statement).lower().encode()).hexdigest()[:16]
+
+def _shape(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, (str, bytes)):
+        return f'{type(value).__name__}({len(value)})'
+    return type(value).__name__
+
+def parameter_shapes(parameters, executemany=False):
+    """Types (and string lengths) of the bound parameters, never their values"""
+    if executemany:
+        rows = list(parameters)
+        return {'rows': len(rows), 'row': parameter_shapes(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: _shape(value) for name, value in parameters.items()}
+    return [_shape(value) for value in parameters or ()]
+
+def log_path(app):
+    """This process's log file: SLOW_QUERY_LOG with the pid before the extension"""
+    path = app.config.get('SLOW_QUERY_LOG') or os.path.join(app.instance_path, 'slow_queries.log')
+    base, extension = os.path.splitext(os.path.abspath(path))
+    return f'{base}.{os.getpid()}{extension}'
+
+def _log_file(app):
+    config = app.config
+    path = log_path(app)
+    with _handlers_lock:
+        handler = _handlers.get(path)
+        if handler is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = _handlers[path] = RotatingFileHandler(
+                path, maxBytes=config['SLOW_QUERY_LOG_MAX_BYTES'], backupCount=config['SLOW_QUERY_LOG_BACKUPS'],
+                delay=True
+            )
+    return handler
+
+def _write(app, entry):
+    message = json.dumps(entry, default=str)
+    _log_file(app).handle(logging.LogRecord('roomsy.slow_queries', logging.INFO, __file__, 0, message, None, None))
+
+def _record(statement, parameters, executemany, milliseconds, max_fingerprints):
+    key = fingerprint(statement)
+    with stats_lock:
+        entry = stats.get(key)
+        first = entry is None
+        if first:
+            if len(stats) >= max_fingerprints:
+                return key, False
+            entry = stats[key] = {
+                'sql': normalize_sql(statement)[:500], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'routes': [],
+            }
+        entry['count'] += 1
+        entry['total_ms'] += milliseconds
+        entry['max_ms'] = max(entry['max_ms'], milliseconds)
+        route = request.endpoint if has_request_context() else None
+        if route and route not in entry['routes'] and len(entry['routes']) < 10:
+            entry['routes'].append(route)
+    return key, first
+
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_started', None)
+    if started is None or conn.info.get('explaining'):
+        return
+    milliseconds = (time.perf_counter() - started) * 1000
+    app = _engine_apps.get(conn.engine)
+    if app is None or milliseconds < app.config['SLOW_QUERY_THRESHOLD_MS']:
+        return
+
+    key, first = _record(statement, parameters, executemany, milliseconds, app.config['SLOW_QUERY_MAX_FINGERPRINTS'])
+    entry = {
+        'time': datetime.utcnow().isoformat(timespec='milliseconds') + 'Z',
+        'fingerprint': key,
+        'duration_ms': round(milliseconds, 2),
+        'route': request.endpoint if has_request_context() else None,
+        'method': request.method if has_request_context() else None,
+        'path': request.path if has_request_context() else None,
+        'statement': statement,
+        'parameters': parameter_shapes(parameters, executemany),
+    }
+    explain = first and not executemany and statement.lstrip().split(None, 1)[0].lower() in EXPLAINABLE
+    if explain and has_app_context():
+        # EXPLAIN once the app context ends, on a connection of its own
+        g.setdefault('slow_query_plans', []).append((entry, statement, parameters))
+    else:
+        _write(app, entry)
+
+def _explain_pending(error=None):
+    pending = g.pop('slow_query_plans', None)
+    if not pending:
+        return
+    try:
+        with db.engine.connect() as connection:
+            connection.info['explaining'] = True
+            try:
+                for entry, statement, parameters in pending:
+                    try:
+                        entry['plan'] = explain_statement(connection, statement, parameters)
+                    except Exception as e:
+                        entry['plan_error'] = str(e).splitlines()[0]
+                        connection.rollback()
+            finally:
+                connection.info.pop('explaining', None)
+    except Exception as e:
+        for entry, statement, parameters in pending:
+            entry.setdefault('plan_error', str(e).splitlines()[0])
+    for entry, statement, parameters in pending:
+        _write(current_app, entry)
+
+def slow_query_stats():
+    """Return this process's slow statements by fingerprint, slowest total first"""
+    with stats_lock:
+        entries = {
+            key: dict(entry, routes=list(entry['routes']), total_ms=round(entry['total_ms'], 2),
+                      max_ms=round(entry['max_ms'], 2))
+            for key, entry in stats.items()
+        }
+    return dict(sorted(entries.items(), key=lambda item: item[1]['total_ms'], reverse=True))
+
+def init_slow_query_log(app):
+    """Time every statement and log the slow ones when SLOW_QUERY_LOG_ENABLED is set"""
+    if not app.config['SLOW_QUERY_LOG_ENABLED']:
+        return
+
+    from app.database import time_queries
+
+    with app.app_context():
+        for engine in db.engines.values():
+            _engine_apps[engine] = app
+            time_queries(engine)
+            if not event.contains(engine, 'after_cursor_execute', _query_finished):
+                event.listen(engine, 'after_cursor_execute', _query_finished)
+
+    app.teardown_appcontext(_explain_pending)
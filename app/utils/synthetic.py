@@ -0,0 +1,313 @@
+"""
+Seeded synthetic datasets for benchmarks
+generate_dataset() adds users, apartments, images and bookings whose values
+all derive from (seed, row index), so the same arguments produce the same
+data whatever the chunk size or number of workers. Generated users are
+named '<prefix>_owner_<n>' and '<prefix>_tenant_<n>'; a later run with
+larger counts only adds the rows that are still missing, and rows that were
+not generated are never modified. (Rows added by an earlier, smaller run
+keep the owners and tenants they picked among that run's accounts.)
+
+Cities follow a Zipf-like skew, rents a log-normal spread around each
+city's typical rent, and listings and stays get denser towards the present.
+An apartment's stays never overlap, and the availability calendar is
+written along with them.
+"""
+
+import hashlib
+import math
+import random
+import time as timer
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from flask import current_app
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.pool import NullPool
+from werkzeug.security import generate_password_hash
+from app.models.apartment import Apartment, ApartmentImage
+from app.models.availability import ApartmentCalendar
+from app.models.booking import Booking
+from app.models.user import User
+from app.utils.availability import ACTIVE_STATUSES, month_masks
+from app.utils.images import _stored_path
+from app.utils.listings import copy_rows
+
+# City, state, ZIP prefix and typical one-bedroom rent, most listings first
+CITIES = [
+    ('New York', 'NY', '100', 3200), ('Los Angeles', 'CA', '900', 2600), ('Chicago', 'IL', '606', 1900),
+    ('Houston', 'TX', '770', 1400), ('Miami', 'FL', '331', 2400), ('San Francisco', 'CA', '941', 3100),
+    ('Boston', 'MA', '021', 2900), ('Seattle', 'WA', '981', 2200), ('Austin', 'TX', '787', 1700),
+    ('Washington', 'DC', '200', 2400), ('Atlanta', 'GA', '303', 1700), ('Denver', 'CO', '802', 1800),
+    ('Philadelphia', 'PA', '191', 1700), ('San Diego', 'CA', '921', 2500), ('Dallas', 'TX', '752', 1500),
+    ('Phoenix', 'AZ', '850', 1400), ('Nashville', 'TN', '372', 1700), ('Portland', 'OR', '972', 1600),
+    ('Minneapolis', 'MN', '554', 1500), ('Las Vegas', 'NV', '891', 1400), ('Tampa', 'FL', '336', 1800),
+    ('Raleigh', 'NC', '276', 1400), ('Salt Lake City', 'UT', '841', 1400), ('Baltimore', 'MD', '212', 1400),
+    ('Pittsburgh', 'PA', '152', 1200), ('Columbus', 'OH', '432', 1100), ('Kansas City', 'MO', '641', 1100),
+    ('Sacramento', 'CA', '958', 1700), ('Detroit', 'MI', '482', 1100), ('Boise', 'ID', '837', 1300),
+]
+CITY_WEIGHTS = [1 / rank ** 1.1 for rank in range(1, len(CITIES) + 1)]
+CITY_CUM_WEIGHTS = [sum(CITY_WEIGHTS[:n + 1]) for n in range(len(CITIES))]
+
+BEDROOMS = (0, 1, 2, 3, 4, 5)
+BEDROOM_WEIGHTS = (10, 35, 30, 16, 6, 3)
+CONTRACT_MONTHS = (1, 3, 6, 6, 12, 12, 12, 24)
+EXTRA_MONTHS = (0, 0, 0, 1, 2, 3, 6, 12)  # stays beyond the minimum contract
+
+ADJECTIVES = ['Bright', 'Cozy', 'Modern', 'Spacious', 'Quiet', 'Sunny', 'Renovated', 'Charming',
+              'Luxury', 'Affordable', 'Stylish', 'Classic']
+KINDS = ['Apartment', 'Loft', 'Condo', 'Flat', 'Townhouse']
+PLACES = ['Downtown', 'Midtown', 'the Old Town', 'Riverside', 'the University District', 'Uptown',
+          'the Arts District', 'a Quiet Suburb', 'the Waterfront', 'the Financial District']
+FEATURES = ['hardwood floors', 'in-unit laundry', 'a private balcony', 'a renovated kitchen', 'central air',
+            'a gym in the building', 'covered parking', 'a rooftop terrace', 'large windows',
+            'a walk-in closet', 'a pet-friendly policy', 'a dishwasher']
+NEARBY = ['public transit', 'restaurants and cafes', 'grocery stores', 'parks', 'the university campus',
+          'shopping', 'the beach', 'downtown offices']
+STREETS = ['Main Street', 'Oak Avenue', 'Maple Drive', 'Park Road', 'Cedar Lane', 'Elm Street',
+           'Washington Avenue', 'Lake Shore Drive', 'Highland Avenue', 'Pine Street', 'Sunset Boulevard',
+           'Broadway']
+
+def _recent(rng, now, days):
+    # Uniform in sqrt: more rows the closer they are to `now`
+    return now - timedelta(days=days * (1 - math.sqrt(rng.random())), seconds=rng.randrange(86400))
+
+def _bulk_insert(connection, table, rows):
+    # COPY on PostgreSQL, executemany (multi-row INSERT batches) elsewhere
+    if rows and not copy_rows(connection, table, list(rows[0]), rows):
+        connection.execute(insert(table), rows)
+    return len(rows)
+
+def _id_array(connection, prefix, count):
+    """Map user index -> id for the generated users named '<prefix><n>'"""
+    ids = array('q', bytes(8 * count))
+    query = select(User.username, User.id).where(User.username.startswith(prefix, autoescape=True))
+    for username, user_id in connection.execute(query.execution_options(yield_per=10000)):
+        n = int(username[len(prefix):])
+        if n < count:
+            ids[n] = user_id
+    return ids
+
+class SyntheticDataset:
+    """
+    One seeded dataset: target sizes plus the helpers that generate its rows
+    Each row is generated from its own Random(seed, table, index), which is
+    what keeps chunks independent and the output reproducible.
+    """
+
+    def __init__(self, engine, seed=42, users=1000, apartments=200, images_per_apartment=3.0,
+                 owner_share=0.05, booking_density=0.6, history_years=3, as_of=None,
+                 image_sizes=None, chunk_size=1000, workers=4, prefix=None, password='password123', log=print):
+        self.seed = seed
+        self.prefix = prefix or f'gen{seed}'
+        self.owners = max(1, round(users * owner_share))
+        self.tenants = max(1, users - self.owners)
+        self.apartments = apartments
+        self.images_per_apartment = images_per_apartment
+        self.booking_density = min(max(booking_density, 0.01), 0.95)
+        self.history_days = int(history_years * 365)
+        self.today = as_of or date.today()
+        self.now = datetime.combine(self.today, time())
+        self.horizon = self.today + timedelta(days=180)  # bookings reach this far ahead
+        self.image_sizes = image_sizes or current_app.config['IMAGE_SIZES']
+        self.chunk_size = chunk_size
+        self.password = password
+        self.log = log
+
+        if engine.dialect.name == 'sqlite':
+            # SQLite has a single writer; parallel chunks would only wait on its lock
+            self.engine, self.workers, self.own_engine = engine, 1, False
+        else:
+            self.engine = create_engine(engine.url, poolclass=NullPool)
+            self.workers, self.own_engine = max(1, workers), True
+
+    def _parallel(self, first, last, work):
+        chunks = [(start, min(start + self.chunk_size, last)) for start in range(first, last, self.chunk_size)]
+        if self.workers == 1:
+            return [work(*chunk) for chunk in chunks]
+        with ThreadPoolExecutor(self.workers) as pool:
+            return list(pool.map(lambda chunk: work(*chunk), chunks))
+
+    # Users
+
+    def _users(self, role, first, last):
+        rows = []
+        for n in range(first, last):
+            rng = random.Random(f'{self.seed}:{role}:{n}')
+            username = f'{self.prefix}_{role}_{n}'
+            rows.append({
+                'username': username, 'email': f'{username}@example.com', 'password_hash': self.password_hash,
+                'is_owner': role == 'owner', 'created_at': _recent(rng, self.now, self.history_days),
+            })
+        with self.engine.begin() as connection:
+            return _bulk_insert(connection, User.__table__, rows)
+
+    # Apartments, their images and bookings
+
+    def _apartment(self, index):
+        """Return (apartment row, share of nights booked) for apartment `index`"""
+        rng = random.Random(f'{self.seed}:apartment:{index}')
+        city_index = rng.choices(range(len(CITIES)), cum_weights=CITY_CUM_WEIGHTS)[0]
+        city, state, zip_prefix, rent = CITIES[city_index]
+        bedrooms = rng.choices(BEDROOMS, weights=BEDROOM_WEIGHTS)[0]
+        typical = rent * (0.55 + 0.45 * max(bedrooms, 0.6))
+        price = min(max(round(typical * rng.lognormvariate(0, 0.25) / 25) * 25, 300), 10000)
+        kind = 'Studio' if bedrooms == 0 else rng.choice(KINDS)
+        adjective, place = rng.choice(ADJECTIVES), rng.choice(PLACES)
+        size = 'studio' if bedrooms == 0 else f'{bedrooms}-bedroom {kind.lower()}'
+
+        row = {
+            'title': f'{adjective} {kind} in {place}',
+            'description': (
+                f'{adjective} {size} in {place}, {city}. Features {", ".join(rng.sample(FEATURES, 3))}. '
+                f'Close to {rng.choice(NEARBY)} and {rng.choice(NEARBY)}.'
+            ),
+            'address': f'{rng.randint(1, 9999)} {rng.choice(STREETS)}',
+            'city': city,
+            'state': state,
+            'zip_code': f'{zip_prefix}{rng.randrange(100):02d}',
+            'price_per_month': float(price),
+            'min_contract_duration': rng.choice(CONTRACT_MONTHS),
+            'bedrooms': bedrooms,
+            'bathrooms': 1 if bedrooms <= 1 else rng.randint(1, bedrooms),
+            'area_sqft': min(max(int(rng.gauss(450 + 380 * bedrooms, 90)), 200), 6000),
+            'is_available': rng.random() < 0.92,
+            'card_image': None,
+            'owner_id': self.owner_ids[int(len(self.owner_ids) * rng.random() ** 2)],  # a few owners list a lot
+        }
+        row['created_at'] = row['updated_at'] = _recent(rng, self.now, self.history_days)
+
+        # Popular cities and below-typical rents stay booked for longer
+        popularity = (0.6 + 0.4 * CITY_WEIGHTS[city_index]) * min(typical / price, 1.5)
+        return row, min(max(self.booking_density * popularity, 0.02), 0.95)
+
+    def _images(self, index, apartment):
+        rng = random.Random(f'{self.seed}:images:{index}')
+        count = round(rng.triangular(0, 2 * self.images_per_apartment, self.images_per_apartment))
+        rows = []
+        for position in range(count):
+            content_hash = hashlib.sha256(f'{self.seed}:{index}:{position}'.encode()).hexdigest()
+            rows.append({
+                'filename': _stored_path(content_hash, 'jpg'), 'caption': None, 'is_primary': position == 0,
+                'content_hash': content_hash, 'status': 'ready',
+                'variants': {name: _stored_path(content_hash, 'jpg', f'_{width}') for name, width in self.image_sizes.items()},
+                'created_at': apartment['created_at'], 'apartment_id': None,
+            })
+        if rows:
+            apartment['card_image'] = rows[0]['variants'].get('card')
+        return rows
+
+    def _bookings(self, index, apartment, density):
+        rng = random.Random(f'{self.seed}:bookings:{index}')
+        listed = apartment['created_at'].date()
+        price = apartment['price_per_month']
+        rows = []
+        day = listed + timedelta(days=rng.randint(0, 45))
+        while True:
+            months = apartment['min_contract_duration'] + rng.choice(EXTRA_MONTHS)
+            gap = rng.expovariate(density / (30 * months * (1 - density)))
+            if day.month in (4, 5, 6, 7):
+                gap *= 0.6  # summer moves fill vacancies faster
+            start = day + timedelta(days=int(gap))
+            if start >= self.horizon:
+                return rows
+            end = start + timedelta(days=30 * months)
+
+            if end <= self.today:
+                status = 'cancelled' if rng.random() < 0.08 else 'completed'
+            elif start <= self.today:
+                status = 'confirmed'
+            else:
+                status = rng.choices(('confirmed', 'pending', 'cancelled'), weights=(6, 3, 1))[0]
+            booked = max(start - timedelta(days=rng.randint(3, 60)), listed)
+            created_at = datetime.combine(booked, time(rng.randrange(24), rng.randrange(60)))
+            total = price * months
+
+            rows.append({
+                'start_date': start, 'end_date': end, 'total_amount': total, 'deposit_amount': total * 0.2,
+                'deposit_paid': status in ('confirmed', 'completed'), 'full_payment_paid': status == 'completed',
+                'status': status, 'created_at': created_at, 'updated_at': created_at,
+                'user_id': self.tenant_ids[rng.randrange(len(self.tenant_ids))], 'apartment_id': None,
+            })
+            day = end
+
+    def _apartment_chunk(self, first, last):
+        apartments, images, bookings = [], [], []
+        for index in range(first, last):
+            apartment, density = self._apartment(index)
+            images.append(self._images(index, apartment))
+            bookings.append(self._bookings(index, apartment, density))
+            apartments.append(apartment)
+
+        with self.engine.begin() as connection:
+            ids = connection.scalars(
+                insert(Apartment.__table__).returning(Apartment.id, sort_by_parameter_order=True), apartments
+            ).all()
+            calendar = {}
+            for apartment_id, apartment_images, apartment_bookings in zip(ids, images, bookings):
+                for row in apartment_images + apartment_bookings:
+                    row['apartment_id'] = apartment_id
+                for row in apartment_bookings:
+                    if row['status'] in ACTIVE_STATUSES:
+                        for month, mask in month_masks(row['start_date'], row['end_date']):
+                            calendar[apartment_id, month] = calendar.get((apartment_id, month), 0) | mask
+
+            image_rows = [row for rows in images for row in rows]
+            booking_rows = [row for rows in bookings for row in rows]
+            _bulk_insert(connection, ApartmentImage.__table__, image_rows)
+            _bulk_insert(connection, Booking.__table__, booking_rows)
+            _bulk_insert(connection, ApartmentCalendar.__table__, [
+                {'apartment_id': key[0], 'month': key[1], 'booked_days': mask} for key, mask in calendar.items()
+            ])
+        return len(ids), len(image_rows), len(booking_rows)
+
+    # Running
+
+    def _phase(self, label, first, last, work):
+        if first >= last:
+            self.log(f"✅ {label}: {first} already generated")
+            return []
+        self.log(f"⏳ {label}: generating {last - first} ({first} already there)...")
+        started = timer.perf_counter()
+        results = self._parallel(first, last, work)
+        seconds = timer.perf_counter() - started
+        self.log(f"✅ {label}: {last - first} in {seconds:.1f}s ({(last - first) / max(seconds, 1e-9):.0f}/s)")
+        return results
+
+    def generate(self):
+        """Add the rows missing from this dataset; returns the number of rows inserted per table"""
+        self.password_hash = generate_password_hash(self.password)  # hashing is slow; every account shares one
+        owner_prefix, tenant_prefix = f'{self.prefix}_owner_', f'{self.prefix}_tenant_'
+        summary = {'users': 0, 'apartments': 0, 'images': 0, 'bookings': 0}
+
+        try:
+            for role, prefix, target in (('owner', owner_prefix, self.owners), ('tenant', tenant_prefix, self.tenants)):
+                with self.engine.connect() as connection:
+                    existing = connection.scalar(
+                        select(func.count()).select_from(User).where(User.username.startswith(prefix, autoescape=True))
+                    )
+                summary['users'] += sum(self._phase(f'{role.title()}s', existing, target, partial(self._users, role)))
+
+            with self.engine.connect() as connection:
+                self.owner_ids = _id_array(connection, owner_prefix, self.owners)
+                self.tenant_ids = _id_array(connection, tenant_prefix, self.tenants)
+                existing = connection.scalar(
+                    select(func.count()).select_from(Apartment).join(User, Apartment.owner_id == User.id)
+                    .where(User.username.startswith(owner_prefix, autoescape=True))
+                )
+            for apartments, images, bookings in self._phase('Apartments', existing, self.apartments, self._apartment_chunk):
+                summary['apartments'] += apartments
+                summary['images'] += images
+                summary['bookings'] += bookings
+        finally:
+            if self.own_engine:
+                self.engine.dispose()
+        return summary
+
+def generate_dataset(engine, **options):
+    """
+    Add a seeded synthetic dataset to the database behind `engine`
+    See SyntheticDataset for the options. Returns the rows inserted per table.
+    """
+    return SyntheticDataset(engine, **options).generate()
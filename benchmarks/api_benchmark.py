@@ -0,0 +1,113 @@
+"""
+Benchmark: JSON API versus the HTML listing and search pages
+
+Seeds an in-memory database with --apartments listings and requests each
+HTML page and its /api/v1 counterpart through the test client, reporting
+latency and the peak Python memory allocated per request.
+
+    python benchmarks/api_benchmark.py --apartments 2000 --requests 200
+
+The response cache is bypassed so every HTML request renders its template.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.apartment import Apartment
+from app.models.user import User
+from app.utils.cache import init_cache
+
+CITIES = ['New York', 'Boston', 'Chicago', 'Austin', 'Seattle', 'Denver', 'Miami', 'Portland']
+
+PAIRS = [
+    ('listing', '/', '/api/v1/apartments'),
+    ('search', '/search?city=Boston&min_price=800&max_price=2500',
+     '/api/v1/search?city=Boston&min_price=800&max_price=2500&fields=id,title,price_per_month'),
+    ('keywords', '/search?q=bright+river', '/api/v1/search?q=bright+river'),
+]
+
+class NoCache:
+    """Response-cache backend that never stores anything"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def incr(self, key):
+        return 0
+
+def seed(count):
+    owner = User(username='bench_owner', email='bench@example.com', is_owner=True)
+    owner.set_password('Password1!')
+    db.session.add(owner)
+    db.session.commit()
+
+    db.session.bulk_insert_mappings(Apartment, [
+        {
+            'title': f'Bright apartment {i} by the river', 'address': f'{i} Main Street',
+            'description': 'A bright and quiet apartment close to the river, shops and transit. ' * 3,
+            'city': CITIES[i % len(CITIES)], 'state': 'NA', 'zip_code': f'{10000 + i}',
+            'price_per_month': 500 + (i * 37) % 3000, 'min_contract_duration': 1 + i % 12,
+            'bedrooms': 1 + i % 4, 'bathrooms': 1 + i % 2, 'area_sqft': 400 + i % 1500,
+            'is_available': True, 'owner_id': owner.id,
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+def measure(client, url, requests):
+    client.get(url)  # warm up
+    latencies = []
+    peaks = []
+    size = 0
+    for _ in range(requests):
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.get(url)
+        latencies.append((time.perf_counter() - started) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+        size = len(response.data)
+    latencies.sort()
+    return {
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'peak_kb': statistics.median(peaks),
+        'bytes': size,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--apartments', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    app.config['QUERY_BUDGET_ENABLED'] = False
+    init_cache(app, NoCache())
+    with app.app_context():
+        seed(args.apartments)
+
+    client = app.test_client()
+    print(f"📊 {args.apartments} apartments, {args.requests} requests per route\n")
+    print(f"{'page':<10} {'route':<6} {'p50 ms':>8} {'p95 ms':>8} {'peak KB':>9} {'bytes':>8}")
+    for name, html_url, api_url in PAIRS:
+        for label, url in (('html', html_url), ('api', api_url)):
+            result = measure(client, url, args.requests)
+            print(f"{name:<10} {label:<6} {result['p50']:>8.2f} {result['p95']:>8.2f} "
+                  f"{result['peak_kb']:>9.0f} {result['bytes']:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+"""
+Load test: weighted traffic mixes against a running Roomsy server
+
+Virtual users run scenarios picked at random by weight: browsing the
+listing, searching, opening apartments, logging in, booking and paying for
+an apartment, and checking the owner dashboard. Each HTTP request is
+recorded under its Flask endpoint; the report gives req/s, latency
+percentiles and, when the server sends X-Query-Count, SQL queries per
+request.
+
+    python benchmarks/load_test.py --users 20 --duration 60
+    python benchmarks/load_test.py --mix browse=70,search=20,book=10
+    python benchmarks/load_test.py --database-url postgresql://localhost/roomsy_load
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --no-seed
+
+Without --url a local gunicorn (gunicorn.conf.py, production config) is
+started on a migrated and seeded database: a temporary SQLite file, or the
+--database-url given. The data comes from the seeded synthetic generator
+(app/utils/synthetic.py), so runs with the same --seed and sizes test the
+same dataset; its accounts are load_owner_<n> and load_tenant_<n> with the
+password LoadTest1!.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import date, timedelta
+from http.cookiejar import CookieJar
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = 'LoadTest1!'
+CITIES = ['New York', 'Boston', 'Chicago', 'Austin', 'Seattle', 'Denver', 'Miami', 'Portland']
+SEARCH_WORDS = ['bright', 'quiet', 'riverside', 'parking', 'studio', 'loft', 'balcony', 'downtown']
+
+DEFAULT_MIX = 'browse=40,search=25,detail=20,login=5,book=5,dashboard=5'
+
+CSRF_TOKEN = re.compile(r'name="csrf_token" value="([^"]+)"')
+NEXT_CURSOR = re.compile(r'[?&]cursor=([\w-]+)')
+PAYMENT_PATH = re.compile(r'/booking/payment/(\d+)')
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Record redirects as responses instead of following them"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class Recorder:
+    """Thread-safe per-endpoint samples of (latency ms, status, query count)"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def add(self, endpoint, latency, status, queries):
+        with self.lock:
+            self.samples[endpoint].append((latency, status, queries))
+
+class VirtualUser:
+    """One browser: a cookie jar plus the account it logs in with"""
+
+    def __init__(self, base_url, recorder, tenants, owners, apartment_ids):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.tenant = random.choice(tenants)
+        self.owner = random.choice(owners)
+        self.apartment_ids = apartment_ids
+        self.logged_in_as = None
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), NoRedirect)
+
+    def request(self, endpoint, path, data=None):
+        """Send one request and record it; returns (status, headers, body)"""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        started = time.perf_counter()
+        try:
+            with self.opener.open(self.base_url + path, body, timeout=30) as response:
+                status, headers, content = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            status, headers, content = e.code, e.headers, e.read()
+        except OSError:
+            status, headers, content = 0, {}, b''
+        latency = (time.perf_counter() - started) * 1000
+        queries = headers.get('X-Query-Count') if status else None
+        self.recorder.add(endpoint, latency, status, int(queries) if queries is not None else None)
+        return status, headers, content.decode('utf-8', 'replace')
+
+    def login(self, username):
+        if self.logged_in_as == username:
+            return True
+        if self.logged_in_as:
+            self.request('auth.logout', '/logout')
+        _, _, page = self.request('auth.login', '/login')
+        token = CSRF_TOKEN.search(page)
+        status, _, _ = self.request('auth.login', '/login', {
+            'csrf_token': token.group(1) if token else '', 'username': username, 'password': PASSWORD
+        })
+        self.logged_in_as = username if status == 302 else None
+        return self.logged_in_as is not None
+
+    # Scenarios
+
+    def browse(self):
+        _, _, page = self.request('main.index', '/')
+        cursor = NEXT_CURSOR.search(page)
+        if cursor and random.random() < 0.5:
+            self.request('main.index', f'/?cursor={cursor.group(1)}')
+
+    def search(self):
+        params = random.choice([
+            {'q': random.choice(SEARCH_WORDS)},
+            {'city': random.choice(CITIES), 'min_price': 800, 'max_price': 2500},
+            {'q': random.choice(SEARCH_WORDS), 'sort': 'price_low'},
+        ])
+        self.request('main.search', '/search?' + urllib.parse.urlencode(params))
+
+    def detail(self):
+        self.request('main.apartment_detail', f'/apartment/{random.choice(self.apartment_ids)}')
+
+    def login_flow(self):
+        self.logged_in_as = None
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), NoRedirect)
+        self.login(self.tenant)
+
+    def book(self):
+        if not self.login(self.tenant):
+            return
+        apartment_id = random.choice(self.apartment_ids)
+        _, _, page = self.request('booking.book_apartment', f'/booking/{apartment_id}')
+        token = CSRF_TOKEN.search(page)
+        start = date.today() + timedelta(days=random.randint(30, 3000))
+        status, headers, _ = self.request('booking.book_apartment', f'/booking/{apartment_id}', {
+            'csrf_token': token.group(1) if token else '',
+            'start_date': start.isoformat(),
+            'end_date': (start + timedelta(days=30 * random.randint(1, 6))).isoformat(),
+        })
+        booking = PAYMENT_PATH.search(headers.get('Location', '')) if status == 302 else None
+        if booking:
+            _, _, page = self.request('booking.payment', f'/booking/payment/{booking.group(1)}')
+            token = CSRF_TOKEN.search(page)
+            self.request('booking.confirm_booking', f'/booking/confirm/{booking.group(1)}',
+                         {'csrf_token': token.group(1) if token else ''})
+
+    def dashboard(self):
+        if self.login(self.owner):
+            self.request('owner.dashboard', '/owner/dashboard')
+
+SCENARIOS = {
+    'browse': VirtualUser.browse,
+    'search': VirtualUser.search,
+    'detail': VirtualUser.detail,
+    'login': VirtualUser.login_flow,
+    'book': VirtualUser.book,
+    'dashboard': VirtualUser.dashboard,
+}
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        try:
+            weights[name.strip()] = float(weight or 1)  # a bare name weighs 1
+        except ValueError:
+            raise SystemExit(f"Weight of {name.strip()!r} is not a number: {weight!r}")
+    return weights
+
+def seed(database_url, apartments, tenants, dataset_seed=42):
+    """Migrate and fill the database with a synthetic dataset; returns (tenant names, owner names, apartment ids)"""
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app, db
+    from app.migrations import upgrade
+    from app.utils.synthetic import generate_dataset
+
+    app = create_app('production')
+    with app.app_context():
+        upgrade(db.engine)
+        owners = max(1, apartments // 50)
+        generate_dataset(
+            db.engine, seed=dataset_seed, users=owners + tenants, apartments=apartments,
+            owner_share=owners / (owners + tenants), prefix='load', password=PASSWORD, log=lambda message: None
+        )
+        return accounts(db)
+
+def accounts(db):
+    """Read the seeded account names and apartment ids back from the database"""
+    from sqlalchemy import select
+    from app.models.apartment import Apartment
+    from app.models.user import User
+
+    users = db.session.execute(select(User.username, User.is_owner).where(User.username.like('load_%'))).all()
+    apartment_ids = db.session.scalars(select(Apartment.id).where(Apartment.is_available == True)).all()
+    return (
+        [name for name, is_owner in users if not is_owner],
+        [name for name, is_owner in users if is_owner],
+        apartment_ids,
+    )
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(database_url, workers, threads):
+    port = free_port()
+    environ = dict(
+        os.environ, DATABASE_URL=database_url, PORT=str(port), WEB_CONCURRENCY=str(workers),
+        WEB_THREADS=str(threads), FLASK_ENV='production', SESSION_COOKIE_SECURE='false',
+        QUERY_BUDGET_ENABLED='true'
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'run:app'], cwd=ROOT, env=environ,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(base_url + '/health', timeout=1).read()
+            return server, base_url
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit('❌ gunicorn did not start')
+
+def run(base_url, weights, users, duration, tenants, owners, apartment_ids):
+    recorder = Recorder()
+    deadline = time.time() + duration
+    names, values = list(weights), list(weights.values())
+
+    def user_loop():
+        user = VirtualUser(base_url, recorder, tenants, owners, apartment_ids)
+        while time.time() < deadline:
+            SCENARIOS[random.choices(names, values)[0]](user)
+
+    threads = [threading.Thread(target=user_loop) for _ in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.samples, time.perf_counter() - started
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def summarize(samples, elapsed):
+    rows = {}
+    for endpoint, entries in sorted(samples.items()):
+        if not entries:
+            continue
+        latencies = sorted(latency for latency, _, _ in entries)
+        queries = [count for _, _, count in entries if count is not None]
+        rows[endpoint] = {
+            'requests': len(entries),
+            'errors': sum(1 for _, status, _ in entries if status == 0 or status >= 500),
+            'rps': len(entries) / elapsed,
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1],
+            'queries': statistics.mean(queries) if queries else None,
+        }
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', help='Server to test (default: start a local gunicorn)')
+    parser.add_argument('--database-url', help='Database for the local server (default: temporary SQLite)')
+    parser.add_argument('--no-seed', action='store_true', help='Use the load_* accounts already in the database')
+    parser.add_argument('--apartments', type=int, default=1000)
+    parser.add_argument('--tenants', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42, help='seed of the synthetic dataset')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers for the local server')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker')
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='scenario=weight,... from: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+    weights = parse_mix(args.mix)
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+    if args.url and not args.no_seed and not args.database_url:
+        raise SystemExit('--url needs --database-url to seed, or --no-seed')
+    if args.no_seed:
+        os.environ['DATABASE_URL'] = database_url
+        from app import create_app, db
+        app = create_app('production')
+        with app.app_context():
+            tenants, owners, apartment_ids = accounts(db)
+    else:
+        print(f"⏳ Seeding {args.apartments} apartments and {args.tenants} tenants")
+        tenants, owners, apartment_ids = seed(database_url, args.apartments, args.tenants, args.seed)
+    if not (tenants and owners and apartment_ids):
+        raise SystemExit('❌ No load_* accounts or apartments in the database')
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server, base_url = start_server(database_url, args.workers, args.threads)
+        print(f"✅ gunicorn on {base_url} ({args.workers} workers x {args.threads} threads)")
+
+    try:
+        print(f"⏳ {args.users} users for {args.duration:g}s, mix {args.mix}")
+        samples, elapsed = run(base_url, weights, args.users, args.duration, tenants, owners, apartment_ids)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    rows = summarize(samples, elapsed)
+    total = sum(row['requests'] for row in rows.values())
+    print(f"\n📊 {total} requests in {elapsed:.1f}s = {total / elapsed:.1f} req/s\n")
+    print(f"{'endpoint':<26} {'reqs':>6} {'errors':>6} {'req/s':>7} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8} {'queries':>8}")
+    for endpoint, row in rows.items():
+        queries = f"{row['queries']:.1f}" if row['queries'] is not None else 'n/a'
+        print(f"{endpoint:<26} {row['requests']:>6} {row['errors']:>6} {row['rps']:>7.1f} {row['p50']:>8.1f} "
+              f"{row['p90']:>8.1f} {row['p99']:>8.1f} {row['max']:>8.1f} {queries:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'elapsed': elapsed, 'mix': weights, 'users': args.users, 'endpoints': rows}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
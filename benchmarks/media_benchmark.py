@@ -0,0 +1,128 @@
+"""
+Benchmark: uploaded images through /static versus /media
+
+Starts gunicorn on a free port (or uses --base-url), writes a
+content-hashed test image into app/static/uploads/images and requests it
+through both routes: full downloads, revalidations and byte ranges.
+
+    python benchmarks/media_benchmark.py --requests 2000 --concurrency 16
+
+Beyond raw throughput, compare the Cache-Control lines: /media marks hashed
+files immutable for a year, so repeat visitors do not ask for them at all.
+"""
+
+import argparse
+import hashlib
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE_FOLDER = os.path.join(ROOT, 'app', 'static', 'uploads', 'images')
+
+def write_test_image(size_kb):
+    data = os.urandom(size_kb * 1024)
+    content_hash = hashlib.sha256(data).hexdigest()
+    name = f'{content_hash[:2]}/{content_hash}_640.jpg'
+    path = os.path.join(IMAGE_FOLDER, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\xff\xd8\xff' + data[3:])
+    return name, path
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(workers):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning', 'app:create_app("testing")'],
+        cwd=ROOT, stdout=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process, f'http://127.0.0.1:{port}'
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+def fetch(base_url, path, headers):
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    started = time.perf_counter()
+    connection.request('GET', path, headers=headers)
+    response = connection.getresponse()
+    body = response.read()
+    elapsed = time.perf_counter() - started
+    connection.close()
+    return response.status, len(body), elapsed, dict(response.getheaders())
+
+def run(base_url, path, headers, requests, concurrency):
+    fetch(base_url, path, headers)  # warm up
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda _: fetch(base_url, path, headers), range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(result[2] * 1000 for result in results)
+    return {
+        'status': results[0][0],
+        'bytes': results[0][1],
+        'rps': requests / wall,
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'cache_control': results[0][3].get('Cache-Control', '-'),
+        'etag': results[0][3].get('ETag'),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--size-kb', type=int, default=200, help='size of the test image')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers to start')
+    parser.add_argument('--base-url', help='benchmark a running server instead of starting gunicorn')
+    args = parser.parse_args()
+
+    name, path = write_test_image(args.size_kb)
+    process = None
+    try:
+        if args.base_url:
+            base_url = args.base_url
+        else:
+            process, base_url = start_server(args.workers)
+
+        routes = [('static', f'/static/uploads/images/{name}'), ('media', f'/media/{name}')]
+        print(f"📊 {args.requests} requests, concurrency {args.concurrency}, {args.size_kb} KB image\n")
+        print(f"{'route':<8} {'scenario':<12} {'status':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8}  cache-control")
+        for label, url in routes:
+            etag = run(base_url, url, {}, 1, 1)['etag']
+            scenarios = [
+                ('full', {}),
+                ('revalidate', {'If-None-Match': etag} if etag else {}),
+                ('range 64KB', {'Range': 'bytes=0-65535'}),
+            ]
+            for scenario, headers in scenarios:
+                result = run(base_url, url, headers, args.requests, args.concurrency)
+                print(f"{label:<8} {scenario:<12} {result['status']:>6} {result['rps']:>9.0f} "
+                      f"{result['p50']:>8.2f} {result['p95']:>8.2f}  {result['cache_control']}")
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+        os.remove(path)
+
+if __name__ == '__main__':
+    main()
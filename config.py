@@ -3,34 +3,137 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTO_MIGRATE = True  # apply pending migrations in create_app (production runs `flask migrate` instead)
+    
+    # Database connection pool (see app/database.py); each web process opens up to
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so keep workers x that under the server's limit
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 1))  # request threads per web process
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))  # 0 = one per request/outbox thread
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 2))  # extra connections for bursts
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # replace connections older than this
+    DB_POOL_PRE_PING = True  # test connections on checkout so dropped ones are replaced
+    
+    # Read replica (see app/database.py); unset sends everything to the primary
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    REPLICA_ENDPOINTS = [
+        'main.index', 'main.search', 'main.apartment_detail', 'api.apartments', 'api.apartment', 'api.search',
+    ]
+    REPLICA_STICKY_SECONDS = 10  # a visitor's reads stay on the primary this long after their own write
+    REPLICA_RETRY_SECONDS = 30  # wait before trying an unreachable replica again
     
     # Mail settings
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
-    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', True)
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() == 'true'
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME', '')
     MAIL_PASSWORD = os.environ.get('MAIL_EMAIL_PASSWORD', '')
     
+    # Email outbox (see app/utils/outbox.py)
+    OUTBOX_IN_PROCESS = os.environ.get('OUTBOX_IN_PROCESS', 'false').lower() == 'true'
+    OUTBOX_WORKER_THREADS = int(os.environ.get('OUTBOX_WORKER_THREADS', 2))
+    OUTBOX_BATCH_SIZE = 50
+    OUTBOX_POLL_SECONDS = 5
+    OUTBOX_LEASE_SECONDS = 300  # claimed emails become due again after this
+    OUTBOX_MAX_ATTEMPTS = 5
+    OUTBOX_RETRY_BASE_SECONDS = 30  # doubled after every failed attempt
+    
     # File upload settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = 'app/static/uploads'
     
+    # Apartment images (see app/utils/images.py)
+    IMAGE_FOLDER = 'uploads/images'  # relative to app/static
+    IMAGE_SIZES = {'thumb': 320, 'card': 640, 'large': 1280}  # longest side in pixels
+    IMAGE_QUALITY = 82
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))  # resizing processes per web process, 0 = inline
+    
+    # Fingerprinted, pre-compressed CSS/JS (see app/utils/assets.py)
+    ASSETS_FOLDER = 'dist'  # relative to app/static
+    ASSETS_MAX_AGE = 365 * 24 * 3600
+    
+    # Response compression middleware (see app/utils/compression.py)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = 500  # bytes; smaller bodies are sent as-is
+    COMPRESSION_LEVEL = 6  # gzip, 1-9
+    COMPRESSION_BROTLI_QUALITY = 4  # brotli, 0-11; low enough for per-request use
+    COMPRESSION_MIMETYPES = [
+        'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript',
+        'application/javascript', 'application/json', 'application/x-ndjson', 'application/xml', 'image/svg+xml',
+    ]
+    
+    # Image serving under /media (see app/routes/media.py)
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'  # Apache / lighttpd
+    MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT')  # nginx internal location, e.g. /_media/
+    MEDIA_MAX_AGE = 365 * 24 * 3600  # content-hashed files
+    MEDIA_MUTABLE_MAX_AGE = 3600
+    
     # Pagination
     POSTS_PER_PAGE = 9
+    SEARCH_RESULTS_PER_PAGE = 20
+    SEARCH_COUNT_LIMIT = 1000  # result counts above this are shown as "1000+"
+    DASHBOARD_ROWS_PER_PAGE = 10
+    
+    # Response cache for anonymous pages (see app/utils/cache.py)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'lru')  # 'lru' or 'redis'
+    CACHE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_MAX_ENTRIES = 512  # LRU backend only
+    CACHE_TIMEOUT = 600  # seconds
+    
+    # JSON API (see app/routes/api.py)
+    API_PAGE_SIZE = 20
+    API_MAX_PAGE_SIZE = 100
+    API_MAX_AGE = 60  # seconds clients and proxies may reuse a response
+    
+    # Bulk apartment import and booking export (see app/utils/listings.py, app/utils/exports.py)
+    IMPORT_CHUNK_SIZE = 500  # rows per INSERT batch and commit
+    IMPORT_MAX_ERRORS_SHOWN = 100  # rejected rows listed on the owner import page
+    EXPORT_BATCH_SIZE = 1000  # booking rows fetched per server-side cursor round trip
+    
+    # Who may read /metrics and the /health/* details; /health and / stay public (see app/routes/health.py)
+    MONITORING_TOKEN = os.environ.get('MONITORING_TOKEN')  # sent as "Authorization: Bearer <token>"
+    MONITORING_ALLOWED_IPS = os.environ.get('MONITORING_ALLOWED_IPS', '127.0.0.1/32,::1/128')  # comma-separated networks
+    
+    # Request metrics at /metrics (see app/utils/metrics.py)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR')  # shared by the gunicorn workers; gunicorn.conf.py sets one
+    METRICS_FLUSH_SECONDS = 1  # how often each worker writes its snapshot there
+    METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+    
+    # Slow query log with EXPLAIN plans (see app/utils/slow_queries.py)
+    SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'true').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG')  # default instance/slow_queries.log; each process writes <name>.<pid>.log
+    SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024  # rotated at this size
+    SLOW_QUERY_LOG_BACKUPS = 5
+    SLOW_QUERY_MAX_FINGERPRINTS = 500  # distinct statements tracked per process
+    
+    # Query budget / N+1 detector (enabled in development and testing)
+    QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED', 'false').lower() == 'true'  # adds X-Query-Count
+    QUERY_BUDGET_STRICT = False  # raise instead of logging a warning
+    QUERY_BUDGET_DEFAULT = 20  # max SQL statements per request
+    QUERY_BUDGET_N_PLUS_ONE = 3  # lazy loads of one relationship that count as N+1
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    QUERY_BUDGET_ENABLED = True
 
 class ProductionConfig(Config):
     DEBUG = False
+    # Workers start without a schema round trip; migrations run once per deploy
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', 'false').lower() == 'true'
     # Production-specific settings
-    SESSION_COOKIE_SECURE = True
+    SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'true').lower() == 'true'  # false for HTTP load tests
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    IMAGE_WORKERS = 0  # the in-memory database is one connection shared by all threads
+    QUERY_BUDGET_ENABLED = True
+    QUERY_BUDGET_STRICT = True
 
 config = {
     'development': DevelopmentConfig,
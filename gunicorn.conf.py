@@ -0,0 +1,46 @@
+"""
+Gunicorn settings for Roomsy
+Run with `gunicorn -c gunicorn.conf.py run:app` after `flask --app run migrate`.
+
+The app is created once in the master and forked into the workers
+(preload_app), so workers start without importing or building it again;
+each worker then drops the database connections it inherited.
+"""
+
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('WEB_THREADS', 1))  # also sizes the database pool (see config.py)
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then; the jitter keeps them from restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+# Workers write their metrics snapshots here; /metrics adds them up (see app/utils/metrics.py)
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f'roomsy-metrics-{os.getpid()}'))
+
+def on_starting(server):
+    from app.utils.metrics import reset_metrics_dir
+    reset_metrics_dir(os.environ['METRICS_DIR'])
+
+def post_fork(server, worker):
+    if preload_app:
+        from run import app
+        from app.database import dispose_after_fork
+        dispose_after_fork(app)
+
+def worker_exit(server, worker):
+    from run import app
+    from app.utils.metrics import write_snapshot
+    write_snapshot(app)
+
+def child_exit(server, worker):
+    from app.utils.metrics import mark_process_dead
+    mark_process_dead(os.environ['METRICS_DIR'], worker.pid)
@@ -6,6 +6,7 @@ Handles database setup with error handling
 
 import os
 from app import create_app, db
+from app.migrations import upgrade
 
 def init_database():
     """Initialize database with error handling"""
@@ -14,8 +15,8 @@ def init_database():
         app = create_app()
         
         with app.app_context():
-            print("📊 Creating database tables...")
-            db.create_all()
+            print("📊 Applying database migrations...")
+            upgrade(db.engine)
             print("✅ Database tables created successfully!")
             
             # Try to create sample data
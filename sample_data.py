@@ -1,21 +1,34 @@
 #!/usr/bin/env python3
 """
 Sample data script for Roomsy application
-Run this script to populate the database with sample apartments and users
+Run this script to populate the database with sample apartments and users.
+Existing data is kept: the demo accounts are only added once, and the
+generated listings come from the seeded generator (app/utils/synthetic.py),
+which only adds what is missing. For benchmark-sized datasets use
+`flask --app run generate-data`.
 """
 
 from app import create_app, db
 from app.models.user import User
 from app.models.apartment import Apartment
+from app.migrations import upgrade
+from app.utils.synthetic import generate_dataset
 from werkzeug.security import generate_password_hash
 
-def create_sample_data():
+def create_sample_data(users=200, apartments=50):
     app = create_app()
     
     with app.app_context():
-        # Clear existing data
-        db.drop_all()
-        db.create_all()
+        upgrade(db.engine)
+        
+        print("Creating generated sample listings...")
+        # The generator writes image rows but no image files, so sample listings get none
+        generate_dataset(db.engine, seed=1, users=users, apartments=apartments, images_per_apartment=0,
+                         prefix='sample')
+        
+        if User.query.filter_by(username='john_owner').first():
+            print("Demo accounts already exist, keeping them")
+            return
         
         print("Creating sample users...")
         
@@ -140,6 +153,7 @@ def create_sample_data():
         print("Customers:")
         print(f"  - {customer1.username} (password: password123)")
         print(f"  - {customer2.username} (password: password123)")
+        print("Generated accounts: sample_owner_<n> and sample_tenant_<n> (password: password123)")
         print("\nSample Apartments:")
         print(f"  - {apartment1.title} - ${apartment1.price_per_month}/month")
         print(f"  - {apartment2.title} - ${apartment2.price_per_month}/month")
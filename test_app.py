@@ -4,6 +4,7 @@ Simple test script to verify the Roomsy application works correctly
 """
 
 import sys
+import traceback
 import os
 
 # Add the current directory to Python path
@@ -11,40 +12,930 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 def test_imports():
     """Test if all required modules can be imported"""
-    try:
-        from app import create_app, db
-        from app.models.user import User
-        from app.models.apartment import Apartment
-        from app.models.booking import Booking
-        print("✓ All imports successful")
-        return True
-    except ImportError as e:
-        print(f"✗ Import error: {e}")
-        return False
+    from app import create_app, db
+    from app.models.user import User
+    from app.models.apartment import Apartment
+    from app.models.booking import Booking
+    print("✓ All imports successful")
 
 def test_app_creation():
     """Test if the Flask app can be created"""
-    try:
-        from app import create_app
-        app = create_app()
-        print("✓ Flask app created successfully")
-        return True
-    except Exception as e:
-        print(f"✗ App creation error: {e}")
-        return False
+    from app import create_app
+    app = create_app()
+    print("✓ Flask app created successfully")
 
 def test_database_connection():
     """Test if database connection works"""
-    try:
-        from app import create_app, db
-        app = create_app()
+    from app import create_app, db
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print("✓ Database connection successful")
+
+def seed_test_data(db):
+    """Create an owner, a tenant, an apartment and a booking for route tests"""
+    from datetime import date
+    from app.models.user import User
+    from app.models.apartment import Apartment
+    from app.models.booking import Booking
+    
+    owner = User(username='test_owner', email='owner@example.com', is_owner=True)
+    owner.set_password('Password1!')
+    tenant = User(username='test_tenant', email='tenant@example.com', is_owner=False)
+    tenant.set_password('Password1!')
+    db.session.add_all([owner, tenant])
+    db.session.commit()
+    
+    apartment = Apartment(
+        title='Test Riverside Apartment', description='A bright apartment next to the river with a view.',
+        address='1 River Road', city='New York', state='NY', zip_code='10001',
+        price_per_month=1500.0, min_contract_duration=1, bedrooms=1, bathrooms=1,
+        area_sqft=600, owner_id=owner.id
+    )
+    db.session.add(apartment)
+    db.session.commit()
+    
+    booking = Booking(
+        start_date=date(2030, 1, 1), end_date=date(2030, 3, 1), total_amount=3000.0,
+        deposit_amount=600.0, user_id=tenant.id, apartment_id=apartment.id
+    )
+    db.session.add(booking)
+    db.session.commit()
+    return owner, tenant, apartment, booking
+
+def test_migrations():
+    """Test that each migration adds its own columns and together they build the models' schema"""
+    import os, tempfile
+    from sqlalchemy import create_engine, inspect
+    from app import create_app, db
+    from app.migrations import MIGRATIONS, upgrade
+    from app.migrations import v001_initial_schema
+    app = create_app('testing')
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'fresh.db')}")
+    
+    # The first version must not already contain what later versions add
+    with engine.begin() as connection:
+        v001_initial_schema.upgrade(connection)
+    columns = {column['name'] for column in inspect(engine).get_columns('apartment')}
+    assert 'card_image' not in columns, "v001 created a column that v006 adds"
+    
+    logged = []
+    assert upgrade(engine, log=logged.append) == [migration.version for migration in MIGRATIONS]
+    inspector = inspect(engine)
+    with engine.connect() as connection:
+        # Reflection skips expression indexes such as lower(city), so read them from the catalog
+        migrated_indexes = set(connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars())
+    with app.app_context():
+        for table in db.metadata.sorted_tables:
+            expected = {column.name for column in table.columns}
+            actual = {column['name'] for column in inspector.get_columns(table.name)}
+            assert actual == expected, f"{table.name}: migrated {sorted(actual)}, models {sorted(expected)}"
+            missing = {index.name for index in table.indexes} - migrated_indexes
+            assert not missing, f"{table.name} is missing indexes {missing}"
+    engine.dispose()
+    print("✓ Migrations build the models' schema step by step")
+
+def test_query_plans():
+    """Test that no route query falls back to a sequential scan"""
+    from app import create_app, db
+    from app.utils.explain import check_route_plans
+    app = create_app('testing')
+    with app.app_context():
+        seed_test_data(db)
+    problems = check_route_plans(app)
+    assert not problems, '; '.join(f"{route} scans {', '.join(tables)}" for route, statement, tables in problems)
+    print("✓ All route queries use indexes")
+
+def login_test_client(client, user_id):
+    """Log a user into a test client session"""
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+def test_query_budget():
+    """Test that the dashboard and my-bookings pages stay within their query budgets"""
+    from datetime import date
+    from app import create_app, db
+    from app.models.booking import Booking
+    app = create_app('testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        for year in range(2031, 2035):
+            db.session.add(Booking(
+                start_date=date(year, 1, 1), end_date=date(year, 3, 1), total_amount=3000.0,
+                deposit_amount=600.0, user_id=tenant.id, apartment_id=apartment.id
+            ))
+        db.session.commit()
+        owner_id, tenant_id = owner.id, tenant.id
+    
+    client = app.test_client()
+    for url, user_id in [('/owner/dashboard', owner_id), ('/booking/my-bookings', tenant_id)]:
+        login_test_client(client, user_id)
+        response = client.get(url)
+        lazy_loads = response.headers.get('X-Lazy-Load-Count')
+        assert response.status_code == 200 and lazy_loads == '0', \
+            f"{url} returned {response.status_code} with {lazy_loads} lazy loads"
+    print("✓ Routes stay within their query budgets")
+
+def test_email_outbox():
+    """Test that queued emails are delivered in one batch by the outbox worker"""
+    from app import create_app, db, mail
+    from datetime import datetime
+    from app.models.outbox import OutboxEmail
+    from app.utils.outbox import claim_batch, enqueue_email, process_batch, queue_depth
+    app = create_app('testing')
+    with app.app_context():
+        for i in range(3):
+            enqueue_email(f'tenant{i}@example.com', 'Booking Confirmation', 'Thanks!', sender='roomsy@example.com')
+        db.session.commit()
+        
+        # A second claim must not take rows another worker already leased
+        first, second = claim_batch(2), claim_batch(5)
+        assert len(first) == 2 and len(second) == 1 and not {e.id for e in first} & {e.id for e in second}, \
+            f"Overlapping claims: {[e.id for e in first]} and {[e.id for e in second]}"
+        OutboxEmail.query.update({'status': 'pending', 'next_attempt_at': datetime.utcnow()})
+        db.session.commit()
+        
+        with mail.record_messages() as outbox:
+            handled = process_batch()
+        
+        depth = queue_depth()
+        assert handled == 3 and len(outbox) == 3 and depth['sent'] == 3 and depth['pending'] == 0, \
+            f"Outbox sent {len(outbox)} of {handled} claimed emails, queue {depth}"
+    print("✓ Email outbox delivered queued messages")
+
+def test_booking_overlap():
+    """Test that overlapping bookings are rejected and cancelling frees the dates"""
+    from app import create_app, db
+    app = create_app('testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        tenant_id, apartment_id = tenant.id, apartment.id
+    
+    client = app.test_client()
+    login_test_client(client, tenant_id)
+    
+    def book(start_date, end_date):
+        response = client.post(f'/booking/{apartment_id}', data={'start_date': start_date, 'end_date': end_date})
+        return response.status_code == 302, response.headers.get('Location', '')
+    
+    created, location = book('2031-05-01', '2031-07-01')
+    overlapping, _ = book('2031-06-15', '2031-08-01')
+    adjacent, _ = book('2031-07-01', '2031-08-01')
+    assert created and not overlapping and adjacent, \
+        f"Expected created/rejected/created, got {created}/{not overlapping}/{adjacent}"
+    
+    cancel_url = f"/booking/cancel/{location.rsplit('/', 1)[1]}"
+    assert client.get(cancel_url).status_code == 405, "A GET request could cancel a booking"
+    still_taken, _ = book('2031-06-15', '2031-07-01')
+    client.post(cancel_url)
+    rebooked, _ = book('2031-06-15', '2031-07-01')
+    assert not still_taken and rebooked, "Cancelled dates were not released (or were released by a GET)"
+    print("✓ Overlapping bookings are rejected")
+
+def test_booking_confirmation():
+    """Test that confirming a booking takes a POST and queues one email however often it is sent"""
+    from app import create_app, db
+    from app.models.booking import Booking
+    from app.models.outbox import OutboxEmail
+    app = create_app('testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        tenant_id, booking_id = tenant.id, booking.id
+    
+    client = app.test_client()
+    login_test_client(client, tenant_id)
+    confirm_url = f'/booking/confirm/{booking_id}'
+    assert client.get(confirm_url).status_code == 405
+    first, again = client.post(confirm_url), client.post(confirm_url)
+    assert first.status_code == again.status_code == 302
+    assert again.headers['Location'].endswith('/booking/my-bookings'), again.headers['Location']
+    
+    with app.app_context():
+        booking = db.session.get(Booking, booking_id)
+        assert booking.status == 'confirmed' and booking.deposit_paid
+        assert OutboxEmail.query.count() == 1, "A repeated confirmation queued the email again"
+    print("✓ Booking confirmation is a POST that emails once")
+
+def test_full_text_search():
+    """Test prefix matching, stop words, AND across terms and relevance order in /search"""
+    import json
+    from app import create_app, db
+    from app.models.apartment import Apartment
+    from app.utils.search import get_search_backend, parse_search_terms
+    app = create_app('testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        # "loft" in the title outranks "loft" in the description
+        in_title = Apartment(
+            title='Sunny Loft', description='Top floor with skylights.', address='2 Mill Lane', city='Boston',
+            state='MA', zip_code='02110', price_per_month=2000.0, min_contract_duration=1, bedrooms=1,
+            bathrooms=1, area_sqft=700, owner_id=owner.id
+        )
+        in_description = Apartment(
+            title='Corner Unit', description='Converted loft space near the park.', address='3 Mill Lane',
+            city='Boston', state='MA', zip_code='02110', price_per_month=1800.0, min_contract_duration=1,
+            bedrooms=1, bathrooms=1, area_sqft=650, owner_id=owner.id
+        )
+        db.session.add_all([in_description, in_title])
+        db.session.commit()
+        ids = {'river': apartment.id, 'title': in_title.id, 'description': in_description.id}
+        assert get_search_backend() == 'fts5'
+        assert parse_search_terms('The loft, with a VIEW') == ['loft', 'view']
+        assert parse_search_terms('Very quiet, just off downtown') == ['quiet', 'downtown']  # PostgreSQL's list
+    
+    client = app.test_client()
+    
+    def search(query, **params):
+        payload = json.loads(client.get('/api/v1/search', query_string=dict(q=query, fields='id', **params)).data)
+        return [item['id'] for item in payload['data']], payload['sort']
+    
+    assert search('lof') == ([ids['title'], ids['description']], 'relevance')
+    assert search('riv') == ([ids['river']], 'relevance')
+    assert search('loft skylights') == ([ids['title']], 'relevance')
+    assert search('loft river') == ([], 'relevance')
+    everything, sort = search('the')  # only stop words: no keyword filter, newest first
+    assert sorted(everything) == sorted(ids.values()) and sort == 'newest'
+    assert search('loft', sort='price_low') == ([ids['description'], ids['title']], 'price_low')
+    print("✓ Full-text search matches prefixes and ranks by relevance")
+
+def test_date_search():
+    """Test that the check-in/check-out search filter hides booked apartments"""
+    from app import create_app, db
+    from app.utils.availability import rebuild_calendar
+    app = create_app('testing')
+    with app.app_context():
+        seed_test_data(db)
+        rebuild_calendar(db.session.connection())
+        db.session.commit()
+    
+    client = app.test_client()
+    booked = client.get('/search?check_in=2030-02-20&check_out=2030-03-05').get_data(as_text=True)
+    free = client.get('/search?check_in=2030-03-01&check_out=2030-03-05').get_data(as_text=True)
+    assert 'Test Riverside Apartment' not in booked, "A booked apartment was offered for its booked dates"
+    assert 'Test Riverside Apartment' in free, "A free apartment was hidden"
+    print("✓ Date search filters booked apartments")
+
+def test_relevance_pagination():
+    """Test that walking every page of a relevance search returns each match once"""
+    import json
+    from app import create_app, db
+    from app.models.apartment import Apartment
+    app = create_app('testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        for i in range(11):
+            # Repeat the term a varying number of times so several scores tie
+            db.session.add(Apartment(
+                title=f'Harbour flat {i}', description=' '.join(['harbour'] * (i % 3 + 1)) + ' views',
+                address=f'{i} Quay Street', city='Boston', state='MA', zip_code='02110',
+                price_per_month=1000.0 + i, min_contract_duration=1, bedrooms=1, bathrooms=1,
+                area_sqft=500, owner_id=owner.id
+            ))
+        db.session.commit()
+        expected = {a.id for a in Apartment.query.filter(Apartment.title.like('Harbour flat%'))}
+    
+    client = app.test_client()
+    seen, cursor, pages = [], None, 0
+    while True:
+        url = '/api/v1/search?q=harbour&fields=id&per_page=3' + (f'&cursor={cursor}' if cursor else '')
+        payload = json.loads(client.get(url).data)
+        assert payload['sort'] == 'relevance'
+        seen.extend(item['id'] for item in payload['data'])
+        pages += 1
+        cursor = payload['next_cursor']
+        if cursor is None:
+            break
+        assert pages < 10, "Relevance pagination never reached the last page"
+    
+    assert pages == 4, f"Expected 4 pages, got {pages}"
+    assert len(seen) == len(set(seen)), f"Ids repeated across pages: {seen}"
+    assert set(seen) == expected, f"Missing ids: {expected - set(seen)}"
+    print("✓ Relevance search pages through every match once")
+
+class LocalRedis:
+    """In-memory stand-in for the few redis-py methods the cache uses"""
+    def __init__(self):
+        self.data = {}
+    def get(self, key):
+        return self.data.get(key)
+    def set(self, key, value, ex=None):
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+    def delete(self, key):
+        self.data.pop(key, None)
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b'0')) + 1).encode()
+        return int(self.data[key])
+
+def test_response_cache():
+    """Test that anonymous pages are cached and invalidated by owner edits"""
+    from app import create_app, db
+    from app.utils.cache import RedisCache, init_cache
+    app = create_app('testing')
+    init_cache(app, RedisCache(client=LocalRedis()))
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        owner_id, apartment_id = owner.id, apartment.id
+    
+    anonymous = app.test_client()
+    url = f'/apartment/{apartment_id}'
+    cache_states = [anonymous.get(url).headers.get('X-Cache'), anonymous.get(url).headers.get('X-Cache'),
+                    anonymous.get('/').headers.get('X-Cache'), anonymous.get('/').headers.get('X-Cache')]
+    assert cache_states == ['MISS', 'HIT', 'MISS', 'HIT'], f"Unexpected cache states: {cache_states}"
+    
+    owner_client = app.test_client()
+    login_test_client(owner_client, owner_id)
+    owner_client.post(f'/owner/apartment/{apartment_id}/edit', data={
+        'title': 'Renamed Riverside Apartment', 'description': 'A bright apartment next to the river with a view.',
+        'address': '1 River Road', 'city': 'New York', 'state': 'NY', 'zip_code': '10001',
+        'price_per_month': '1500', 'min_contract_duration': '1', 'bedrooms': '1', 'bathrooms': '1',
+        'area_sqft': '600', 'is_available': 'on'
+    })
+    detail, listing = anonymous.get(url), anonymous.get('/')
+    assert (detail.headers.get('X-Cache') == 'MISS' and listing.headers.get('X-Cache') == 'MISS'
+            and 'Renamed Riverside Apartment' in listing.get_data(as_text=True)), \
+        "Edit did not invalidate the cached pages"
+    print("✓ Response cache works")
+
+def test_conditional_get():
+    """Test that unchanged pages answer 304 Not Modified"""
+    from app import create_app, db
+    app = create_app('testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        apartment_id = apartment.id
+    
+    client = app.test_client()
+    for url in ['/', f'/apartment/{apartment_id}', '/search?city=New+York']:
+        # Twice each so both the rendered and the response-cached copies are checked
+        for attempt in range(2):
+            first = client.get(url)
+            etag, last_modified = first.headers.get('ETag'), first.headers.get('Last-Modified')
+            by_etag = client.get(url, headers={'If-None-Match': etag})
+            by_date = client.get(url, headers={'If-Modified-Since': last_modified})
+            assert etag and by_etag.status_code == 304 and by_date.status_code == 304 and not by_etag.data, \
+                f"{url} did not answer 304 ({by_etag.status_code}, {by_date.status_code})"
+    print("✓ Conditional GET works")
+
+def test_fragment_cache():
+    """Test that apartment cards are rendered once and shared between views"""
+    from app import create_app, db
+    from app.utils.cache import cache_stats
+    app = create_app('testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        owner_id = owner.id
+    
+    client = app.test_client()
+    client.get('/')
+    client.get('/search?city=New+York')
+    login_test_client(client, owner_id)
+    client.get('/owner/dashboard')
+    
+    with app.app_context():
+        fragments = cache_stats()['fragments']
+    assert fragments == {'hits': 2, 'misses': 1}, f"Unexpected fragment cache counters: {fragments}"
+    print("✓ Apartment cards are fragment-cached")
+
+def test_image_upload():
+    """Test that uploads are stored by content hash and deduplicated"""
+    import base64, io, os, tempfile
+    from app import create_app, db
+    from app.models.apartment import Apartment, ApartmentImage
+    app = create_app('testing')
+    app.config['IMAGE_FOLDER'] = tempfile.mkdtemp()
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        owner_id, apartment_id = owner.id, apartment.id
+    
+    png = base64.b64decode('iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=')
+    client = app.test_client()
+    login_test_client(client, owner_id)
+    for name in ('first.png', 'copy.png'):
+        client.post(f'/owner/apartment/{apartment_id}/images', data={'images': (io.BytesIO(png), name)},
+                    content_type='multipart/form-data')
+    rejected = client.post(f'/owner/apartment/{apartment_id}/images', follow_redirects=True,
+                           data={'images': (io.BytesIO(b'not an image'), 'notes.png')},
+                           content_type='multipart/form-data')
+    
+    with app.app_context():
+        images = ApartmentImage.query.filter_by(apartment_id=apartment_id).all()
+        card_image = db.session.get(Apartment, apartment_id).card_image
+    
+    originals = [name for _, _, files in os.walk(app.config['IMAGE_FOLDER']) for name in files if name.endswith('.png')]
+    assert len(images) == 1 and len(originals) == 1 and images[0].status == 'ready' and card_image, \
+        f"Expected one ready image, got {[(image.status, image.filename) for image in images]}"
+    assert 'is not a JPEG, PNG, GIF or WebP image' in rejected.get_data(as_text=True), "A non-image upload was accepted"
+    primary_url = f'/owner/apartment/{apartment_id}/images/{images[0].id}/primary'
+    assert client.get(primary_url).status_code == 405 and client.post(primary_url).status_code == 302, \
+        "The primary image could be changed without a POST"
+    print("✓ Image uploads are content-addressed")
+
+def test_media_serving():
+    """Test byte ranges and immutable caching on /media"""
+    import os, tempfile
+    from app import create_app
+    app = create_app('testing')
+    app.config['IMAGE_FOLDER'] = tempfile.mkdtemp()
+    name = f"ab/{'ab' * 32}_640.jpg"
+    os.makedirs(os.path.join(app.config['IMAGE_FOLDER'], 'ab'))
+    with open(os.path.join(app.config['IMAGE_FOLDER'], name), 'wb') as f:
+        f.write(bytes(range(256)) * 4)
+    
+    client = app.test_client()
+    full = client.get(f'/media/{name}')
+    partial = client.get(f'/media/{name}', headers={'Range': 'bytes=10-19'})
+    missing = client.get('/media/../config.py')
+    assert full.status_code == 200 and 'immutable' in full.headers.get('Cache-Control', ''), \
+        f"Unexpected media response: {full.status_code} {full.headers.get('Cache-Control')}"
+    assert partial.status_code == 206 and partial.data == bytes(range(10, 20)) and missing.status_code == 404, \
+        f"Range or traversal handling failed: {partial.status_code}, {missing.status_code}"
+    print("✓ Media serving works")
+
+def test_asset_pipeline():
+    """Test fingerprinted asset URLs and pre-compressed responses"""
+    import gzip, re, shutil, tempfile
+    from app import create_app
+    from app.utils.assets import build_assets
+    app = create_app('testing')
+    static_folder = tempfile.mkdtemp()
+    for directory in ('css', 'js'):
+        shutil.copytree(f'{app.static_folder}/{directory}', f'{static_folder}/{directory}')
+    app.static_folder = static_folder
+    with app.app_context():
+        build_assets()
+    
+    client = app.test_client()
+    css_url = re.search(r'href="(/assets/css/style\.[0-9a-f]{12}\.css)"', client.get('/').get_data(as_text=True))
+    assert css_url, "base.html does not link the fingerprinted stylesheet"
+    
+    with open(f'{static_folder}/css/style.css', 'rb') as f:
+        original = f.read()
+    plain = client.get(css_url.group(1), headers={'Accept-Encoding': 'identity'})
+    gzipped = client.get(css_url.group(1), headers={'Accept-Encoding': 'gzip'})
+    assert (plain.data == original and gzipped.headers.get('Content-Encoding') == 'gzip'
+            and gzip.decompress(gzipped.data) == original and 'immutable' in gzipped.headers['Cache-Control']), \
+        "Asset responses do not match the source file"
+    print("✓ Asset pipeline works")
+
+def test_response_compression():
+    """Test that large text responses are compressed and small ones are not"""
+    import gzip
+    from app import create_app, db
+    from app.utils.compression import compression_stats
+    app = create_app('testing')
+    with app.app_context():
+        seed_test_data(db)
+    
+    client = app.test_client()
+    page = client.get('/search', headers={'Accept-Encoding': 'gzip'})
+    plain = client.get('/search', headers={'Accept-Encoding': 'identity'})
+    small = client.get('/health/cache', headers={'Accept-Encoding': 'gzip'})
+    assert page.headers.get('Content-Encoding') == 'gzip' and gzip.decompress(page.data) == plain.data, \
+        "Search page was not gzip-compressed correctly"
+    assert not small.headers.get('Content-Encoding') and 'Accept-Encoding' in page.headers.get('Vary', ''), \
+        "Compression headers are wrong"
+    saved = compression_stats().get('main.search', {}).get('bytes_saved', 0)
+    assert saved > 0, "Bytes saved were not recorded"
+    print(f"✓ Response compression works ({saved} bytes saved on search)")
+
+def test_json_api():
+    """Test sparse fieldsets, cursors and caching on the JSON API"""
+    import json
+    from app import create_app, db
+    from app.utils.pagination import encode_cursor
+    app = create_app('testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        apartment_id = apartment.id
+    
+    client = app.test_client()
+    listing = client.get('/api/v1/apartments?fields=id,title&per_page=1')
+    assert json.loads(listing.data)['data'] == [{'id': apartment_id, 'title': 'Test Riverside Apartment'}]
+    
+    revalidated = client.get('/api/v1/apartments?fields=id,title&per_page=1',
+                             headers={'If-None-Match': listing.headers['ETag']})
+    assert revalidated.status_code == 304
+    
+    search = json.loads(client.get('/api/v1/search?q=river&fields=id').data)
+    assert search['data'] == [{'id': apartment_id}] and search['total'] == 1, search
+    
+    # A crafted cursor gives the first page, not a database error
+    crafted = client.get(f"/api/v1/apartments?fields=id&cursor={encode_cursor([['not a date'], 'x'])}")
+    assert crafted.status_code == 200 and json.loads(crafted.data)['data'] == [{'id': apartment_id}]
+    
+    assert client.get('/api/v1/apartments?fields=password').status_code == 400
+    assert client.get('/api/v1/apartments/999999').status_code == 404
+    print("✓ JSON API works")
+
+def test_bulk_import():
+    """Test that CSV and NDJSON imports share the form rules and report bad rows"""
+    import io, json
+    from app import create_app, db
+    from app.models.apartment import Apartment
+    app = create_app('testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        owner_id = owner.id
+    
+    header = 'title,description,address,city,state,zip_code,price_per_month,min_contract_duration,bedrooms,bathrooms,area_sqft'
+    good = 'Imported Loft {},A bright loft imported in bulk from a file,{} Import Street,Portland,OR,97201,1800,12,2,1,900'
+    rows = [good.format(number, number) for number in range(5)]
+    rows.insert(2, 'Bad,Too short,1 St,X,OR,,50,0,20,0,10')
+    csv_file = '\n'.join([header] + rows).encode()
+    ndjson_file = b'{"title": "Imported Studio", "description": "A studio imported from an NDJSON file",' \
+                  b' "address": "9 Import Street", "city": "Portland", "state": "OR", "zip_code": "97201",' \
+                  b' "price_per_month": 1200, "min_contract_duration": 6, "bedrooms": 0, "bathrooms": 1,' \
+                  b' "area_sqft": 450}\nnot json\n'
+    
+    app.config['IMPORT_CHUNK_SIZE'] = 2
+    client = app.test_client()
+    login_test_client(client, owner_id)
+    csv_page = client.post('/owner/apartments/import', data={'file': (io.BytesIO(csv_file), 'listings.csv')},
+                           content_type='multipart/form-data').get_data(as_text=True)
+    ndjson_page = client.post('/owner/apartments/import', data={'file': (io.BytesIO(ndjson_file), 'listings.ndjson')},
+                              content_type='multipart/form-data').get_data(as_text=True)
+    
+    with app.app_context():
+        imported = Apartment.query.filter(Apartment.title.like('Imported%'), Apartment.owner_id == owner_id).count()
+    assert imported == 6, f"Expected 6 imported apartments, got {imported}"
+    assert 'Imported 5 of 6 rows' in csv_page and 'Price must be between $100 and $10,000' in csv_page, \
+        "CSV import summary or error report is wrong"
+    assert 'Imported 1 of 2 rows' in ndjson_page and 'Invalid JSON' in ndjson_page, \
+        "NDJSON import summary or error report is wrong"
+    print("✓ Bulk import validates and inserts rows in chunks")
+
+def test_copy_format():
+    """Test that COPY input formats every value the way PostgreSQL parses its column type"""
+    import csv, io, json, re
+    from datetime import date, datetime
+    from sqlalchemy import JSON, Boolean, Date, DateTime, Integer, Numeric
+    from app import create_app
+    from app.models.apartment import Apartment, ApartmentImage
+    from app.models.booking import Booking
+    from app.utils.listings import IMPORT_COLUMNS, copy_csv, validate_apartment
+    app = create_app('testing')
+    
+    listing = {
+        'title': 'Copied "Loft", top floor', 'description': 'A loft whose row goes through COPY on PostgreSQL',
+        'address': '5 Copy Street', 'city': 'Portland', 'state': 'OR', 'zip_code': '97201',
+        'price_per_month': '1800', 'min_contract_duration': '12', 'bedrooms': '2', 'bathrooms': '2',
+        'area_sqft': '900',
+    }
+    values, errors = validate_apartment(listing)
+    assert not errors and values['bathrooms'] == 2 and isinstance(values['bathrooms'], int)
+    assert validate_apartment(dict(listing, bathrooms='1.5'))[1] == ['Invalid number of bathrooms']
+    now = datetime(2031, 5, 1, 12, 30)
+    values.update(is_available=True, owner_id=7, created_at=now, updated_at=now)
+    
+    samples = [
+        (Apartment.__table__, IMPORT_COLUMNS, values),
+        (ApartmentImage.__table__, None, {
+            'filename': 'ab/abc.jpg', 'caption': '', 'is_primary': True, 'content_hash': 'abc', 'status': 'ready',
+            'variants': {'thumb': 'ab/abc_320.jpg'}, 'created_at': now, 'apartment_id': 3,
+        }),
+        (Booking.__table__, None, {
+            'start_date': date(2031, 6, 1), 'end_date': date(2031, 9, 1), 'total_amount': 5400.0,
+            'deposit_amount': 1080.0, 'deposit_paid': False, 'full_payment_paid': False, 'status': 'pending',
+            'created_at': now, 'updated_at': None, 'user_id': 4, 'apartment_id': 3,
+        }),
+    ]
+    parsers = [
+        (Boolean, lambda text: text in ('true', 'false')),
+        (Integer, lambda text: re.fullmatch(r'-?\d+', text) is not None),
+        (Numeric, lambda text: float(text) is not None),
+        (DateTime, lambda text: datetime.fromisoformat(text) is not None),
+        (Date, lambda text: date.fromisoformat(text) is not None),
+        (JSON, lambda text: json.loads(text) is not None),
+    ]
+    with app.app_context():
+        for table, columns, row in samples:
+            columns = columns or list(row)
+            text = copy_csv(table, columns, [row])
+            fields = next(csv.reader(io.StringIO(text)))
+            assert len(fields) == len(columns), text
+            for column, field in zip(columns, fields):
+                if row[column] is None:
+                    continue
+                for column_type, parses in parsers:
+                    if isinstance(table.c[column].type, column_type):
+                        assert parses(field), f"{table.name}.{column} got {field!r}"
+                        break
+            # NULL is an unquoted empty field, an empty string a quoted one
+            assert (',,' in text or text.endswith(',\n')) == (None in row.values())
+        assert ',"",' in copy_csv(ApartmentImage.__table__, list(samples[1][2]), [samples[1][2]])
+        try:
+            copy_csv(Apartment.__table__, IMPORT_COLUMNS, [dict(values, bathrooms=1.5)])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("A fractional value was accepted for an integer column")
+    print("✓ COPY input matches the column types")
+
+def test_booking_export():
+    """Test the streamed CSV/NDJSON export of an owner's bookings"""
+    import csv, io, json
+    from datetime import date
+    from app import create_app, db
+    from app.models.booking import Booking
+    app = create_app('testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        owner_id, booking_id = owner.id, booking.id
+        apartment.title = '=HYPERLINK("http://example.com", "Riverside")'
+        db.session.add_all([
+            Booking(start_date=date(2031, month, 1), end_date=date(2031, month, 28), total_amount=1500.0,
+                    deposit_amount=300.0, status='confirmed', user_id=tenant.id, apartment_id=apartment.id)
+            for month in range(1, 13)
+        ])
+        db.session.commit()
+    
+    app.config['EXPORT_BATCH_SIZE'] = 5
+    client = app.test_client()
+    login_test_client(client, owner_id)
+    response = client.get('/owner/bookings/export')
+    streamed = response.is_streamed
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert streamed and 'attachment' in response.headers.get('Content-Disposition', ''), \
+        "Export is not a streamed attachment"
+    assert len(rows) == 13 and rows[0]['booking_id'] == str(booking_id) and rows[0]['remaining_amount'] == '2400.0', \
+        f"Unexpected CSV export: {len(rows)} rows, first {rows[:1]}"
+    assert rows[0]['apartment'] == '\'=HYPERLINK("http://example.com", "Riverside")', \
+        "A formula in the CSV export was not escaped"
+    
+    filtered = client.get('/owner/bookings/export?format=ndjson&status=confirmed&from=2031-03-15&to=2031-05-10')
+    lines = [json.loads(line) for line in filtered.get_data(as_text=True).splitlines()]
+    assert [line['start_date'] for line in lines] == ['2031-03-01', '2031-04-01', '2031-05-01'], \
+        f"Date/status filters returned {[line['start_date'] for line in lines]}"
+    assert lines[0]['apartment'].startswith('=HYPERLINK('), "NDJSON values were escaped like CSV cells"
+    print("✓ Booking export streams CSV and NDJSON")
+
+def test_connection_pool():
+    """Test the pool options and checkout/saturation counters"""
+    import json, os, tempfile
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import TimeoutError as PoolTimeout
+    from app import create_app
+    from app.database import InstrumentedQueuePool, engine_options, pool_stats
+    app = create_app('testing')
+    
+    config = dict(app.config, WEB_THREADS=1, DB_POOL_SIZE=0, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=0.1)
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pool.db')}"
+    options = engine_options(config, url)
+    assert (options['poolclass'] is InstrumentedQueuePool and options['pool_size'] == 1
+            and not engine_options(config, 'sqlite:///:memory:')), \
+        f"Unexpected engine options: {options}"
+    
+    engine = create_engine(url, **options)
+    before = pool_stats(engine)
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+        try:
+            engine.connect()
+        except PoolTimeout:
+            pass
+        else:
+            raise AssertionError("A second checkout from a full pool did not time out")
+        during = pool_stats(engine)
+    after = pool_stats(engine)
+    engine.dispose()
+    
+    assert during['checked_out'] == 1 and after['checked_out'] == 0 and after['pool_size'] == 1, \
+        f"Pool state is wrong: {during}, {after}"
+    assert after['timeouts'] == before['timeouts'] + 1 and after['saturated'] == before['saturated'] + 1, \
+        f"Timeout or saturation was not counted: {before} -> {after}"
+    assert 'checkouts' in json.loads(app.test_client().get('/health/db-pool').data), \
+        "/health/db-pool does not report the counters"
+    print("✓ Connection pool is configured and instrumented")
+
+def test_replica_routing():
+    """Test read routing with two local databases standing in for primary and replica"""
+    import json, os, tempfile
+    from sqlalchemy import text
+    from config import TestingConfig, config
+    from app import create_app, db
+    from app.migrations import upgrade
+    directory = tempfile.mkdtemp()
+    
+    class ReplicaTestingConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, 'primary.db')}"
+        DATABASE_REPLICA_URL = f"sqlite:///{os.path.join(directory, 'replica.db')}"
+        QUERY_BUDGET_ENABLED = False
+    config['replica-testing'] = ReplicaTestingConfig
+    app = create_app('replica-testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        tenant_id, apartment_id = tenant.id, apartment.id
+        # The "replica" has the schema but lags behind: the apartment is not there yet
+        replica = db.engines['replica']
+        upgrade(replica)
+    
+    def titles(client):
+        return [item['title'] for item in json.loads(client.get('/api/v1/apartments?fields=title').data)['data']]
+    
+    anonymous = app.test_client()
+    assert titles(anonymous) == [], "Anonymous listing did not read from the replica"
+    
+    writer = app.test_client()
+    login_test_client(writer, tenant_id)
+    writer.post(f'/booking/{apartment_id}', data={'start_date': '2032-01-01', 'end_date': '2032-03-01'})
+    assert titles(writer) == ['Test Riverside Apartment'], "Reads after the visitor's own write did not use the primary"
+    
+    # Replica unreachable: reads fall back to the primary
+    app.config['REPLICA_RETRY_SECONDS'] = 3600
+    with app.app_context():
+        replica.dispose()
+    os.rename(os.path.join(directory, 'replica.db'), os.path.join(directory, 'moved.db'))
+    os.mkdir(os.path.join(directory, 'replica.db'))
+    fallback = titles(anonymous)
+    state = json.loads(anonymous.get('/health/db-pool').data)['replica']
+    assert fallback == ['Test Riverside Apartment'] and not state['healthy'] and state['fallbacks'], \
+        f"Unhealthy replica was not bypassed: {fallback}, {state}"
+    print("✓ Read-only pages use the replica with read-your-writes and fallback")
+
+def test_production_startup():
+    """Test that the production config boots without touching the database"""
+    import os, tempfile
+    from config import ProductionConfig, config
+    from app import create_app, db
+    
+    class StartupTestingConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}"
+    config['startup-testing'] = StartupTestingConfig
+    app = create_app('startup-testing')
+    with app.app_context():
+        pool = db.engine.pool
+        opened = pool.checkedin() + pool.checkedout()
+    assert not app.config['AUTO_MIGRATE'] and not opened, f"Production startup opened {opened} connections"
+    print("✓ Production startup skips schema work")
+
+def test_synthetic_data():
+    """Test that the seeded generator is reproducible, incremental and keeps the calendar in step"""
+    from datetime import date
+    from sqlalchemy import select
+    from app import create_app, db
+    from app.models.apartment import Apartment
+    from app.models.availability import ApartmentCalendar
+    from app.models.booking import Booking
+    from app.utils.availability import rebuild_calendar
+    from app.utils.synthetic import generate_dataset
+    options = dict(seed=7, users=60, apartments=40, as_of=date(2030, 6, 1), log=lambda message: None)
+    
+    datasets = []
+    for steps in ([dict(chunk_size=7)], [dict(chunk_size=100), dict(chunk_size=100)]):
+        app = create_app('testing')
         with app.app_context():
-            db.create_all()
-            print("✓ Database connection successful")
-            return True
-    except Exception as e:
-        print(f"✗ Database error: {e}")
-        return False
+            added = [generate_dataset(db.engine, **dict(options, **step)) for step in steps]
+            titles = db.session.execute(
+                select(Apartment.title, Apartment.price_per_month).order_by(Apartment.id)
+            ).all()
+            bookings = db.session.scalar(select(db.func.count()).select_from(Booking))
+            calendar = {(row.apartment_id, row.month): row.booked_days for row in ApartmentCalendar.query}
+            with db.engine.begin() as connection:
+                rebuild_calendar(connection)
+            rebuilt = {(row.apartment_id, row.month): row.booked_days for row in ApartmentCalendar.query}
+        datasets.append((titles, added, bookings, calendar == rebuilt))
+    
+    (titles, added, bookings, calendar_ok), (titles_again, added_again, _, calendar_again_ok) = datasets
+    assert titles == titles_again and len(titles) == 40, "The same seed and sizes did not produce the same apartments"
+    assert not added_again[1]['users'] and not added_again[1]['apartments'], \
+        f"A repeated run added rows again: {added_again[1]}"
+    assert bookings > 1 and calendar_ok and calendar_again_ok, \
+        "Generated bookings are missing or disagree with the availability calendar"
+    print("✓ Synthetic data is reproducible, incremental and consistent")
+
+def test_metrics():
+    """Test the /metrics endpoint and the merging of worker snapshots"""
+    import json, os, tempfile
+    from app import create_app, db
+    from app.utils import metrics
+    app = create_app('testing')
+    with app.app_context():
+        seed_test_data(db)
+    for values in (metrics.counters, metrics.gauges, metrics.histograms):
+        values.clear()  # earlier tests' requests were counted too
+    client = app.test_client()
+    client.get('/')
+    client.get('/search?q=riverside')
+    
+    app.config['MONITORING_TOKEN'] = 'scraper-token'
+    outside = {'REMOTE_ADDR': '203.0.113.7'}
+    denied = [path for path in ('/metrics', '/health/cache', '/health/db-pool')
+              if client.get(path, environ_base=outside).status_code != 403]
+    scraped = client.get('/metrics', environ_base=outside, headers={'Authorization': 'Bearer scraper-token'})
+    assert (not denied and scraped.status_code == 200
+            and client.get('/health', environ_base=outside).status_code == 200), \
+        f"Monitoring endpoints open to the public: {denied}, token scrape {scraped.status_code}"
+    
+    response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+    expected = [
+        'roomsy_http_requests_total{endpoint="main.search",method="GET",status="200"} 1',
+        'roomsy_http_request_duration_seconds_bucket{endpoint="main.index",le="+Inf"} 1',
+        'roomsy_http_requests_in_flight{endpoint="main.index"} 0',
+        'roomsy_db_queries_per_request_count{endpoint="main.search"} 1',
+        'roomsy_template_render_seconds_count{template="main/index.html"} 1',
+        'roomsy_db_pool_checkouts_total',
+    ]
+    missing = [line for line in expected if line not in text]
+    assert response.content_type.startswith('text/plain') and not missing, f"/metrics is missing {missing}"
+    
+    # Another worker's snapshot is added in; once it exits only its counters remain
+    app.config['METRICS_DIR'] = directory = tempfile.mkdtemp()
+    other = {
+        'counters': [['roomsy_http_requests_total', [['endpoint', 'main.search'], ['method', 'GET'], ['status', '200']], 4]],
+        'gauges': [['roomsy_http_requests_in_flight', [['endpoint', 'main.search']], 2]],
+        'histograms': [],
+    }
+    with open(os.path.join(directory, '999999.json'), 'w') as f:
+        json.dump(other, f)
+    merged = client.get('/metrics').get_data(as_text=True)
+    metrics.mark_process_dead(directory, 999999)
+    archived = client.get('/metrics').get_data(as_text=True)
+    assert 'status="200"} 5' in merged and 'roomsy_http_requests_in_flight{endpoint="main.search"} 2' in merged, \
+        "Worker snapshots were not added up"
+    assert 'status="200"} 5' in archived and 'roomsy_http_requests_in_flight{endpoint="main.search"} 0' in archived, \
+        "An exited worker's counters or gauges were not archived correctly"
+    print("✓ /metrics reports requests, SQL, templates and pools across workers")
+
+def test_slow_query_log():
+    """Test that slow statements are logged once with their plan and grouped by fingerprint"""
+    import json, os, re, tempfile
+    from app import create_app, db
+    from app.utils.slow_queries import fingerprint, log_path, parameter_shapes
+    app = create_app('testing')
+    with app.app_context():
+        owner, tenant, apartment, booking = seed_test_data(db)
+        owner_id = owner.id
+    
+    assert fingerprint("SELECT * FROM apartment WHERE id IN (1, 2, 3) AND city = 'Austin'") == \
+        fingerprint('SELECT * FROM apartment\nWHERE id IN (?, ?) AND city = ?'), \
+        "Statements differing only in literals got different fingerprints"
+    assert parameter_shapes(('secret', 42, None)) == ['str(6)', 'int', 'null'], "Parameter shapes are wrong"
+    
+    directory = tempfile.mkdtemp()
+    app.config.update(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG=os.path.join(directory, 'slow.log'))
+    client = app.test_client()
+    login_test_client(client, owner_id)
+    client.get('/owner/dashboard')
+    client.get('/owner/dashboard')
+    
+    # One file per process, so workers never rotate a file another is writing
+    assert os.listdir(directory) == [f'slow.{os.getpid()}.log'] == [os.path.basename(log_path(app))]
+    with open(log_path(app)) as f:
+        entries = [json.loads(line) for line in f]
+    dashboard = [entry for entry in entries if entry['route'] == 'owner.dashboard']
+    planned = [entry['fingerprint'] for entry in dashboard if 'plan' in entry]
+    assert dashboard and planned and len(planned) == len(set(planned)), \
+        "Slow statements were not logged with one plan per fingerprint"
+    shapes = [shape for entry in dashboard for shape in entry['parameters']]
+    assert shapes and all(re.fullmatch(r'\w+(\(\d+\))?', shape) for shape in shapes), \
+        "Parameter values leaked into the slow query log"
+    
+    assert client.get('/health/slow-queries', environ_base={'REMOTE_ADDR': '203.0.113.7'}).status_code == 403, \
+        "/health/slow-queries is open to the public"
+    report = client.get('/health/slow-queries').get_json()
+    assert any('owner.dashboard' in entry['routes'] and entry['count'] >= 2 for entry in report.values()), \
+        "/health/slow-queries does not group repeated statements"
+    print("✓ Slow query log records statements, routes and deduplicated plans")
+
+def test_load_test_helpers():
+    """Test the load test's mix parsing, percentiles and summaries without a server"""
+    import importlib.util, os
+    spec = importlib.util.spec_from_file_location(
+        'load_test', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'load_test.py')
+    )
+    load_test = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(load_test)
+    
+    assert load_test.parse_mix('browse=3, search,book=') == {'browse': 3.0, 'search': 1.0, 'book': 1.0}
+    assert set(load_test.parse_mix(load_test.DEFAULT_MIX)) <= set(load_test.SCENARIOS)
+    for bad in ('browse=2,teleport=1', 'browse=lots'):
+        try:
+            load_test.parse_mix(bad)
+        except SystemExit as e:
+            assert 'teleport' in str(e) or 'lots' in str(e), str(e)
+        else:
+            raise AssertionError(f"parse_mix accepted {bad!r}")
+    
+    values = list(range(1, 101))
+    assert load_test.percentile(values, 0.50) == 51
+    assert load_test.percentile(values, 0.99) == 100
+    assert load_test.percentile(values, 1.0) == 100
+    assert load_test.percentile([7], 0.9) == 7
+    assert load_test.percentile([], 0.5) is None
+    
+    recorder = load_test.Recorder()
+    for latency, status, queries in ((30.0, 200, 4), (10.0, 200, 2), (20.0, 500, None), (40.0, 0, None)):
+        recorder.add('main.index', latency, status, queries)
+    recorder.samples['main.search']  # an endpoint that never got a response
+    rows = load_test.summarize(recorder.samples, 2.0)
+    assert list(rows) == ['main.index'], rows
+    index = rows['main.index']
+    assert (index['requests'], index['errors'], index['rps']) == (4, 2, 2.0)
+    assert (index['p50'], index['max'], index['queries']) == (30.0, 40.0, 3)
+    assert load_test.summarize({}, 1.0) == {}
+    print("✓ Load test helpers parse mixes and summarize samples")
 
 def main():
     """Run all tests"""
@@ -54,7 +945,34 @@ def main():
     tests = [
         ("Import Test", test_imports),
         ("App Creation Test", test_app_creation),
-        ("Database Test", test_database_connection)
+        ("Database Test", test_database_connection),
+        ("Migrations Test", test_migrations),
+        ("Query Plan Test", test_query_plans),
+        ("Query Budget Test", test_query_budget),
+        ("Email Outbox Test", test_email_outbox),
+        ("Booking Overlap Test", test_booking_overlap),
+        ("Booking Confirmation Test", test_booking_confirmation),
+        ("Full-Text Search Test", test_full_text_search),
+        ("Date Search Test", test_date_search),
+        ("Relevance Pagination Test", test_relevance_pagination),
+        ("Response Cache Test", test_response_cache),
+        ("Conditional GET Test", test_conditional_get),
+        ("Fragment Cache Test", test_fragment_cache),
+        ("Image Upload Test", test_image_upload),
+        ("Media Serving Test", test_media_serving),
+        ("Asset Pipeline Test", test_asset_pipeline),
+        ("Response Compression Test", test_response_compression),
+        ("JSON API Test", test_json_api),
+        ("Bulk Import Test", test_bulk_import),
+        ("COPY Format Test", test_copy_format),
+        ("Booking Export Test", test_booking_export),
+        ("Connection Pool Test", test_connection_pool),
+        ("Replica Routing Test", test_replica_routing),
+        ("Production Startup Test", test_production_startup),
+        ("Synthetic Data Test", test_synthetic_data),
+        ("Metrics Test", test_metrics),
+        ("Slow Query Log Test", test_slow_query_log),
+        ("Load Test Helpers Test", test_load_test_helpers)
     ]
     
     passed = 0
@@ -62,10 +980,17 @@ def main():
     
     for test_name, test_func in tests:
         print(f"\nRunning {test_name}...")
-        if test_func():
-            passed += 1
-        else:
+        try:
+            test_func()
+        except Exception as e:
+            failed = traceback.extract_tb(e.__traceback__)[-1]
+            if isinstance(e, AssertionError):
+                print(f"✗ {str(e) or failed.line} (line {failed.lineno})")
+            else:
+                print(f"✗ {type(e).__name__}: {e} ({failed.filename}, line {failed.lineno})")
             print(f"✗ {test_name} failed")
+        else:
+            passed += 1
     
     print("\n" + "=" * 40)
     print(f"Tests passed: {passed}/{total}")